@@ -0,0 +1,136 @@
+"""
+Benchmark dict-based vs slotted-record representations of mapping results.
+
+Builds a synthetic corpus of mapped steps (default 10,000 steps, parsed from
+JSON as the transformer would receive them) and compares peak memory and
+time for:
+  - keeping the parsed dicts and re-defaulting keys on each access pass
+  - converting once to sop2atomic.models.sop_models records
+
+Usage (from project root, after `pip install -e .`):
+
+    python scripts/benchmark_models.py --steps 10000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from sop2atomic.models.sop_models import MappedStep
+
+CATEGORIES = ["Files & Folders", "Email Operations", "Excel Operations"]
+COMPONENTS = [("1,1", "OPEN_FOLDER"), ("4,4", "SET_EMAIL_RECIPIENTS"), ("3,2", "X")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=10_000)
+    parser.add_argument("--actions-per-step", type=int, default=3)
+    return parser.parse_args()
+
+
+def build_corpus_json(n_steps: int, actions_per_step: int) -> str:
+    """Serialise a synthetic transformer result, as returned by the LLM."""
+    steps = []
+    for i in range(n_steps):
+        actions = []
+        for j in range(actions_per_step):
+            cid, name = COMPONENTS[(i + j) % len(COMPONENTS)]
+            actions.append(
+                {
+                    "component_id": cid,
+                    "component_name": name,
+                    "category": CATEGORIES[(i + j) % len(CATEGORIES)],
+                    "parameters": {"path": f"X:\\\\Reports\\\\{i}", "mode": None},
+                }
+            )
+        steps.append(
+            {
+                "step_number": str(i + 1),
+                "original_action": f"Open report folder {i} and send it.",
+                "notes": "",
+                "atomic_actions": actions,
+            }
+        )
+    return json.dumps({"sop_id": "BENCH", "steps": steps})
+
+
+def dict_pass(steps: List[Dict[str, Any]]) -> int:
+    """Typical consumer pass over dicts, re-defaulting keys defensively."""
+    count = 0
+    for step in steps:
+        step.get("notes", "")
+        for action in step.get("atomic_actions", []) or []:
+            if action.get("component_name", "MISSING_COMPONENT") != "X":
+                count += len(action.get("parameters", {}) or {})
+    return count
+
+
+def record_pass(steps: List[MappedStep]) -> int:
+    """The same pass over records: attributes are guaranteed present."""
+    count = 0
+    for step in steps:
+        for action in step.atomic_actions:
+            if action.component_name != "X":
+                count += len(action.parameters)
+    return count
+
+
+def measure(build: Callable[[], Any]) -> Tuple[Any, float, int, int]:
+    """
+    Return (value, seconds, peak bytes, retained bytes) for building a
+    structure. Timing and memory tracing use separate runs, since
+    tracemalloc slows allocation down considerably.
+    """
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak, retained
+
+
+def main() -> None:
+    args = parse_args()
+    raw = build_corpus_json(args.steps, args.actions_per_step)
+
+    dict_steps, dict_build, dict_peak, dict_kept = measure(
+        lambda: json.loads(raw)["steps"]
+    )
+    started = time.perf_counter()
+    for _ in range(10):
+        dict_pass(dict_steps)
+    dict_scan = (time.perf_counter() - started) / 10
+    del dict_steps
+
+    records, rec_build, rec_peak, rec_kept = measure(
+        lambda: [MappedStep.from_dict(s) for s in json.loads(raw)["steps"]]
+    )
+    started = time.perf_counter()
+    for _ in range(10):
+        record_pass(records)
+    rec_scan = (time.perf_counter() - started) / 10
+
+    print(f"steps={args.steps} actions/step={args.actions_per_step}")
+    print(f"{'':8} {'build s':>9} {'scan s':>9} {'peak MB':>9} {'kept MB':>9}")
+    for label, build, scan, peak, kept in (
+        ("dicts", dict_build, dict_scan, dict_peak, dict_kept),
+        ("records", rec_build, rec_scan, rec_peak, rec_kept),
+    ):
+        print(
+            f"{label:8} {build:9.3f} {scan:9.4f} "
+            f"{peak / 1e6:9.1f} {kept / 1e6:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Parallelism analysis of transformer output.
+
+Turns the flat, ordered list of steps / atomic actions produced by
+SopToAtomicTransformer into an execution DAG:
+
+  - one node per atomic action, numbered "<step_number>.<k>"
+  - data dependencies: an action depends on the previous action touching
+    the same resource, where resources are derived from parameter values
+    (normalised paths and file names, email addresses, other literal
+    values); a path also depends on the last action on its parent folder
+  - state dependencies: actions of stateful categories (e-mail drafts,
+    clipboard, Excel/Word/UI sessions) run in order within that category
+  - MISSING_COMPONENT actions have unknown effects and act as barriers
+
+From the DAG it derives independent branches, earliest start times, the
+critical path and the theoretical speedup over serial execution, using
+per-component or per-category duration estimates.
+
+Every action only looks up the last user of each of its resources, so the
+analysis runs in linear time in the number of actions and parameters.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+
+# Category keywords whose actions share implicit application state
+DEFAULT_SERIAL_CATEGORY_KEYWORDS = (
+    "email",
+    "clipboard",
+    "excel",
+    "word",
+    "browser",
+    "ui",
+)
+
+# Seconds per action, matched by keyword in the category name
+DEFAULT_CATEGORY_DURATIONS = {
+    "files": 2.0,
+    "folder": 2.0,
+    "email": 5.0,
+    "excel": 8.0,
+    "word": 8.0,
+    "validation": 1.0,
+    "clipboard": 0.5,
+}
+DEFAULT_DURATION = 5.0
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_SEPARATORS_RE = re.compile(r"[\\/]+")
+
+
+def _resource_keys(value: Any) -> Iterable[Tuple[str, bool]]:
+    """
+    Yield (resource key, touches) pairs for one parameter value.
+
+    touches=False marks keys that are only looked up: a file depends on the
+    last action on its parent folder, but does not make sibling files
+    depend on it.
+    """
+    if value is None or isinstance(value, bool):
+        return
+    text = str(value).strip()
+    if not text:
+        return
+
+    emails = _EMAIL_RE.findall(text)
+    if emails:
+        for email in emails:
+            yield "email:" + email.lower(), True
+        return
+
+    lowered = text.lower()
+    if _SEPARATORS_RE.search(lowered):
+        path = _SEPARATORS_RE.sub("/", lowered).rstrip("/")
+        yield "path:" + path, True
+        parent, _, name = path.rpartition("/")
+        if parent:
+            yield "path:" + parent, False
+        if "." in name:
+            yield "file:" + name, True
+        return
+
+    if "." in lowered and " " not in lowered:
+        yield "file:" + lowered, True
+        return
+
+    # Flags, counts and other tiny literals would create false dependencies
+    if len(lowered) >= 3 and not lowered.isdigit():
+        yield "value:" + lowered, True
+
+
+def _is_serial(category: str, keywords: Iterable[str]) -> bool:
+    words = set(re.findall(r"[a-z]+", category.lower()))
+    return any(k in words or k.rstrip("s") + "s" in words for k in keywords)
+
+
+def _estimate_duration(
+    action: Dict[str, Any],
+    durations: Dict[str, float],
+    category_durations: Dict[str, float],
+    default: float,
+) -> float:
+    name = action.get("component_name") or ""
+    if name in durations:
+        return float(durations[name])
+    category = (action.get("category") or "").lower()
+    for keyword, seconds in category_durations.items():
+        if keyword in category:
+            return float(seconds)
+    return default
+
+
+def build_execution_dag(
+    result: Dict[str, Any],
+    durations: Optional[Dict[str, float]] = None,
+    category_durations: Optional[Dict[str, float]] = None,
+    default_duration: float = DEFAULT_DURATION,
+    serial_category_keywords: Iterable[str] = DEFAULT_SERIAL_CATEGORY_KEYWORDS,
+) -> Dict[str, Any]:
+    """
+    Build the execution DAG of a transformer result.
+
+    Args:
+        result: dict in the schema returned by SopToAtomicTransformer.
+        durations: seconds per action keyed by component_name (overrides).
+        category_durations: seconds per action keyed by a keyword of the
+                            category name (default DEFAULT_CATEGORY_DURATIONS).
+        default_duration: seconds for actions matching nothing above.
+        serial_category_keywords: categories containing one of these words
+                                  keep their actions in order.
+
+    Returns:
+        {
+          "sop_id": ...,
+          "nodes": [{"id", "step_number", "component_name", "category",
+                     "duration_s", "depends_on", "earliest_start_s"}],
+          "branches": [[node ids], ...],   # independent sub-graphs
+          "critical_path": [node ids],
+          "critical_path_s": float,
+          "total_duration_s": float,       # serial execution time
+          "theoretical_speedup": float,
+        }
+    """
+    durations = durations or {}
+    if category_durations is None:
+        category_durations = DEFAULT_CATEGORY_DURATIONS
+    keywords = tuple(serial_category_keywords)
+
+    nodes: List[Dict[str, Any]] = []
+    preds: List[Set[int]] = []
+    last_user: Dict[str, int] = {}
+    last_barrier: Optional[int] = None
+    since_barrier: List[int] = []
+
+    for step in result.get("steps", []) or []:
+        step_number = str(step.get("step_number", ""))
+        for k, action in enumerate(step.get("atomic_actions", []) or [], start=1):
+            index = len(nodes)
+            depends: Set[int] = set()
+            name = action.get("component_name") or MISSING_COMPONENT
+            category = action.get("category") or ""
+
+            if name == MISSING_COMPONENT:
+                # Unknown effects: wait for everything since the last barrier
+                depends.update(since_barrier)
+                if last_barrier is not None:
+                    depends.add(last_barrier)
+                last_barrier = index
+                since_barrier = []
+            else:
+                if last_barrier is not None:
+                    depends.add(last_barrier)
+
+                keys: List[Tuple[str, bool]] = []
+                for value in (action.get("parameters") or {}).values():
+                    keys.extend(_resource_keys(value))
+                if name.startswith("CLIPBOARD_"):
+                    keys.append(("state:clipboard", True))
+                if category and _is_serial(category, keywords):
+                    keys.append(("state:" + category.lower(), True))
+
+                for key, touches in keys:
+                    previous = last_user.get(key)
+                    if previous is not None:
+                        depends.add(previous)
+                    if touches:
+                        last_user[key] = index
+                since_barrier.append(index)
+
+            nodes.append(
+                {
+                    "id": f"{step_number}.{k}",
+                    "step_number": step_number,
+                    "component_name": name,
+                    "category": action.get("category"),
+                    "duration_s": _estimate_duration(
+                        action, durations, category_durations, default_duration
+                    ),
+                }
+            )
+            preds.append(depends)
+
+    # Earliest finish times in index order (edges always point backwards)
+    finish: List[float] = []
+    best_pred: List[Optional[int]] = []
+    for index, node in enumerate(nodes):
+        start, best = 0.0, None
+        for p in preds[index]:
+            if finish[p] > start:
+                start, best = finish[p], p
+        node["earliest_start_s"] = start
+        node["depends_on"] = [nodes[p]["id"] for p in sorted(preds[index])]
+        finish.append(start + node["duration_s"])
+        best_pred.append(best)
+
+    critical_path: List[str] = []
+    critical_s = 0.0
+    if nodes:
+        cursor: Optional[int] = max(range(len(nodes)), key=finish.__getitem__)
+        critical_s = finish[cursor]
+        while cursor is not None:
+            critical_path.append(nodes[cursor]["id"])
+            cursor = best_pred[cursor]
+        critical_path.reverse()
+
+    total_s = sum(node["duration_s"] for node in nodes)
+    return {
+        "sop_id": result.get("sop_id"),
+        "nodes": nodes,
+        "branches": _branches(nodes, preds),
+        "critical_path": critical_path,
+        "critical_path_s": critical_s,
+        "total_duration_s": total_s,
+        "theoretical_speedup": round(total_s / critical_s, 3) if critical_s else 1.0,
+    }
+
+
+def _branches(nodes: List[Dict[str, Any]], preds: List[Set[int]]) -> List[List[str]]:
+    """Weakly connected components of the DAG, as lists of node ids."""
+    parent = list(range(len(nodes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for index, depends in enumerate(preds):
+        for p in depends:
+            root_a, root_b = find(index), find(p)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[int, List[str]] = {}
+    for index, node in enumerate(nodes):
+        groups.setdefault(find(index), []).append(node["id"])
+    return list(groups.values())
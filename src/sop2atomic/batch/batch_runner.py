@@ -0,0 +1,255 @@
+"""
+Batch SOP → Atomic mapping with cross-SOP step deduplication.
+
+Workflow for a batch of parsed SOPs:
+  - cluster near-duplicate steps across all SOPs (see step_dedup)
+  - map one representative per multi-member cluster, in dedicated requests
+    of at most dedup_chunk_steps steps each
+  - map the remaining, unique steps with one request per SOP, or with
+    several small SOPs packed into one request (pack_token_budget)
+  - fan representative mappings back out to every instance, re-extracting
+    differing parameter values, and reassemble each SOP in step order
+
+Each SOP result has the same schema as SopToAtomicTransformer.transform().
+
+The parsed SOPs are held as SopDocument records for the whole batch (see
+models.sop_models); they are turned back into dicts only for the
+transformer requests.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from sop2atomic.batch.step_dedup import adapt_mapped_step, cluster_texts
+from sop2atomic.catalogue.atomic_catalogue_loader import catalogue_fingerprint
+from sop2atomic.models.sop_models import SopDocument, SopStep
+
+# sop_card used for the synthetic SOP holding cluster representatives
+DEDUP_SOP_CARD = {"SCHRODERS_ID": "BATCH_DEDUP"}
+
+
+def _step_text(step: SopStep) -> str:
+    return f"{step.action} {step.notes}"
+
+
+def _step_key(step: SopStep, fingerprint: str) -> str:
+    """Checkpoint key of a step mapping: its text and the catalogue."""
+    return hashlib.sha256(
+        json.dumps([step.action, step.notes, fingerprint]).encode("utf-8")
+    ).hexdigest()
+
+
+def _as_document(sop: Union[SopDocument, Dict[str, Any]]) -> SopDocument:
+    return sop if isinstance(sop, SopDocument) else SopDocument.from_dict(sop)
+
+
+def run_batch(
+    sops: List[Union[SopDocument, Dict[str, Any]]],
+    catalogue: List[Dict[str, Any]],
+    transformer: Any,
+    dedup: bool = True,
+    threshold: float = 0.8,
+    chunk_store: Optional[Any] = None,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    on_error: Optional[Callable[[int, Exception], None]] = None,
+    pack_token_budget: Optional[int] = None,
+    dedup_chunk_steps: int = 50,
+) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Map a batch of parsed SOPs.
+
+    Args:
+        sops: parsed SOPs, as SopDocument records or as the dicts returned
+              by parse_sop_document().
+        catalogue: atomic components from the catalogue loader.
+        transformer: any object with transform(sop_data, catalogue), e.g.
+                     SopToAtomicTransformer or CascadeTransformer.
+        dedup: cluster near-duplicate steps and map them once per batch.
+        threshold: similarity threshold passed to cluster_texts().
+        chunk_store: optional object with get(key) / put(key, value) used to
+                     checkpoint the mapping of every clustered step, keyed by
+                     the hash of its text and the catalogue (see run_journal).
+        on_result: called with (sop_index, result) as soon as each SOP is
+                   complete, e.g. to persist it.
+        on_error: if given, any exception raised while mapping a SOP is
+                  reported here (its result is None) instead of aborting the
+                  whole batch.
+        pack_token_budget: if set and the transformer supports it, pack
+                  several SOPs' remaining steps into shared requests of up to
+                  this many estimated prompt tokens (see
+                  SopToAtomicTransformer.transform_packed()).
+        dedup_chunk_steps: maximum cluster representatives per dedicated
+                  request.
+
+    Returns:
+        (results, report): one result dict per input SOP (same order), and
+        a report with dedup ratio and LLM calls saved.
+
+    Raises:
+        RuntimeError: if a per-SOP request fails and no on_error is given.
+    """
+    if dedup_chunk_steps < 1:
+        raise ValueError("dedup_chunk_steps must be at least 1")
+
+    # 1) Flatten steps and find clusters spanning at least two instances
+    documents = [_as_document(sop) for sop in sops]
+    occurrences: List[Tuple[int, SopStep]] = [
+        (sop_index, step)
+        for sop_index, document in enumerate(documents)
+        for step in document.steps
+    ]
+    clusters: List[List[int]] = []
+    if dedup and occurrences:
+        clusters = [
+            members
+            for members in cluster_texts(
+                [_step_text(step) for _, step in occurrences], threshold=threshold
+            )
+            if len(members) > 1
+        ]
+
+    # 2) Dedicated requests for the cluster representatives, in chunks of at
+    #    most dedup_chunk_steps steps so that a large corpus never produces a
+    #    single oversized prompt. Mappings are checkpointed per step text, so
+    #    a resumed batch (fewer pending SOPs, different chunks) still finds
+    #    them; a cluster is mapped from any member already checkpointed.
+    fingerprint = catalogue_fingerprint(catalogue) if clusters else ""
+    mapped_clusters: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+    unmapped: List[int] = []
+    for c, members in enumerate(clusters):
+        if chunk_store is not None:
+            for index in members:
+                checkpoint = chunk_store.get(
+                    _step_key(occurrences[index][1], fingerprint)
+                )
+                if checkpoint is not None:
+                    mapped_clusters[c] = (index, checkpoint)
+                    break
+        if c not in mapped_clusters:
+            unmapped.append(c)
+
+    dedup_calls = 0
+    dedup_chunks_failed = 0
+    for chunk_start in range(0, len(unmapped), dedup_chunk_steps):
+        chunk = unmapped[chunk_start : chunk_start + dedup_chunk_steps]
+        representatives = {
+            "sop_card": dict(DEDUP_SOP_CARD),
+            "steps": [
+                SopStep(
+                    str(k + 1),
+                    occurrences[clusters[c][0]][1].action,
+                    occurrences[clusters[c][0]][1].notes,
+                ).to_dict()
+                for k, c in enumerate(chunk)
+            ],
+        }
+        dedup_calls += 1
+        try:
+            mapped = transformer.transform(representatives, catalogue)
+        except Exception:
+            # Any failure (API, network, bad JSON): fall back to mapping
+            # these steps inside their own SOP requests
+            dedup_chunks_failed += 1
+            continue
+        by_number = {s["step_number"]: s for s in mapped.get("steps", [])}
+        for k, c in enumerate(chunk):
+            if str(k + 1) in by_number:
+                mapped_clusters[c] = (clusters[c][0], by_number[str(k + 1)])
+
+    shared: Dict[int, Dict[str, Any]] = {}
+    checkpointed = set()
+    for c, (rep_index, rep_step) in mapped_clusters.items():
+        rep_text = _step_text(occurrences[rep_index][1])
+        for index in clusters[c]:
+            step = occurrences[index][1]
+            adapted = adapt_mapped_step(rep_step, rep_text, step.to_dict())
+            # Instances that cannot be adapted safely keep their own request
+            if adapted is None:
+                continue
+            shared[index] = adapted
+            key = _step_key(step, fingerprint)
+            if chunk_store is not None and key not in checkpointed:
+                checkpointed.add(key)
+                chunk_store.put(key, adapted)
+
+    # 3) Per-SOP requests for the steps not covered by a cluster mapping
+    covered: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    for index, mapped_step in shared.items():
+        sop_index = occurrences[index][0]
+        covered.setdefault(sop_index, {})[mapped_step["step_number"]] = mapped_step
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(sops)
+
+    def finish(sop_index: int, result: Dict[str, Any]) -> None:
+        """Merge cluster-mapped steps into a SOP result, in step order."""
+        by_number = {s["step_number"]: s for s in result["steps"]}
+        by_number.update(covered.get(sop_index, {}))
+        ordered = [
+            by_number.pop(s.step_number)
+            for s in documents[sop_index].steps
+            if s.step_number in by_number
+        ]
+        result["steps"] = ordered + list(by_number.values())
+        results[sop_index] = result
+        if on_result is not None:
+            on_result(sop_index, result)
+
+    requests: List[Tuple[int, Dict[str, Any]]] = []
+    for sop_index, document in enumerate(documents):
+        from_clusters = covered.get(sop_index, {})
+        remaining = [s for s in document.steps if s.step_number not in from_clusters]
+        if remaining or not document.steps:
+            requests.append(
+                (sop_index, SopDocument(document.sop_card, remaining).to_dict())
+            )
+        else:
+            finish(sop_index, {"sop_id": document.sop_id, "steps": []})
+
+    transform_packed = getattr(transformer, "transform_packed", None)
+    if pack_token_budget and transform_packed is not None and len(requests) > 1:
+        transform_packed(
+            [sub_sop for _, sub_sop in requests],
+            catalogue,
+            token_budget=pack_token_budget,
+            on_result=lambda i, result: finish(requests[i][0], result),
+            on_error=(
+                (lambda i, exc: on_error(requests[i][0], exc))
+                if on_error is not None
+                else None
+            ),
+        )
+        sop_calls = transformer.last_pack_report["llm_calls"]
+    else:
+        sop_calls = 0
+        for sop_index, sub_sop in requests:
+            sop_calls += 1
+            try:
+                result = transformer.transform(sub_sop, catalogue)
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                on_error(sop_index, exc)
+                continue
+            finish(sop_index, result)
+
+    # 4) Report
+    steps_total = len(occurrences)
+    unique_mappings = steps_total - sum(len(m) for m in clusters) + len(clusters)
+    llm_calls = dedup_calls + sop_calls
+    report = {
+        "sops": len(sops),
+        "steps_total": steps_total,
+        "clusters": len(clusters),
+        "dedup_requests": dedup_calls,
+        "dedup_requests_failed": dedup_chunks_failed,
+        "steps_from_clusters": len(shared),
+        "unique_step_mappings": unique_mappings,
+        "step_mappings_saved": steps_total - unique_mappings,
+        "dedup_ratio": (
+            round(1 - unique_mappings / steps_total, 3) if steps_total else 0.0
+        ),
+        "llm_calls": llm_calls,
+        "llm_calls_saved": len(sops) - llm_calls,
+    }
+    return results, report
@@ -0,0 +1,217 @@
+"""
+Incremental re-mapping of stored results after a catalogue change.
+
+Instead of re-running every SOP through the LLM when the catalogue changes,
+only the steps found by find_affected_steps() are sent again; all other
+mapped steps are kept as they are. Each updated result is written as a new
+mapping version next to the previous one:
+
+    out/<stem>.json        version 1 (as written by `sop2atomic batch`)
+    out/<stem>.v2.json     first re-mapping
+    out/<stem>.v3.json     ...
+
+Previous versions are never modified, and every version has the same schema
+as a transformer result. The fingerprint of the catalogue a re-mapping was
+made against is recorded in a sidecar file next to it:
+
+    out/<stem>.v2.meta.json  {"catalogue_fingerprint": ...}
+
+so running the same remap again skips SOPs whose latest version already
+reflects the new catalogue instead of writing yet another version.
+"""
+
+import copy
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sop2atomic.catalogue.atomic_catalogue_loader import catalogue_fingerprint
+from sop2atomic.catalogue.catalogue_diff import (
+    diff_catalogues,
+    find_affected_steps,
+    is_empty_diff,
+)
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.parser.sop_parser import parse_sop_document
+from sop2atomic.utils.file_utils import write_json_atomic
+
+
+def mapping_versions(results_dir: str, stem: str) -> List[Tuple[int, str]]:
+    """Return the (version, path) pairs of a SOP's stored results, oldest first."""
+    pattern = re.compile(rf"^{re.escape(stem)}(?:\.v(\d+))?\.json$")
+    versions = []
+    if os.path.isdir(results_dir):
+        for name in os.listdir(results_dir):
+            match = pattern.match(name)
+            if match:
+                version = int(match.group(1) or 1)
+                versions.append((version, os.path.join(results_dir, name)))
+    return sorted(versions)
+
+
+def version_meta_path(results_dir: str, stem: str, version: int) -> str:
+    """Return the sidecar file of a written mapping version."""
+    return os.path.join(results_dir, f"{stem}.v{version}.meta.json")
+
+
+def _read_meta(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def remap_steps(
+    result: Dict[str, Any],
+    sop_data: Dict[str, Any],
+    catalogue: List[Dict[str, Any]],
+    transformer: Any,
+    step_numbers: List[str],
+) -> Dict[str, Any]:
+    """
+    Re-transform the given steps and merge them into a copy of result.
+
+    Args:
+        result: stored result of the SOP (left untouched).
+        sop_data: parsed SOP.
+        catalogue: catalogue to map against.
+        transformer: object with transform(sop_data, catalogue).
+        step_numbers: steps to re-map.
+
+    Returns:
+        The merged result, steps in SOP order.
+    """
+    wanted = set(step_numbers)
+    source_steps = sop_data.get("steps", []) or []
+    partial_sop = {
+        "sop_card": sop_data.get("sop_card", {}),
+        "steps": [s for s in source_steps if str(s.get("step_number", "")) in wanted],
+    }
+    remapped = transformer.transform(partial_sop, catalogue)
+
+    merged = copy.deepcopy(result)
+    by_number = {str(s.get("step_number", "")): s for s in merged.get("steps", [])}
+    by_number.update(
+        {str(s.get("step_number", "")): s for s in remapped.get("steps", [])}
+    )
+
+    ordered = []
+    for source in source_steps:
+        step = by_number.pop(str(source.get("step_number", "")), None)
+        if step is not None:
+            ordered.append(step)
+    ordered.extend(by_number.values())
+
+    merged["steps"] = ordered
+    if not merged.get("sop_id"):
+        merged["sop_id"] = remapped.get("sop_id")
+    return merged
+
+
+def run_catalogue_remap(
+    sop_files: List[str],
+    results_dir: str,
+    old_catalogue: List[Dict[str, Any]],
+    new_catalogue: List[Dict[str, Any]],
+    make_transformer: Callable[[], Any],
+    min_score: float = 0.35,
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Re-map the affected steps of stored results after a catalogue change.
+
+    Args:
+        sop_files: SOP .docx files whose results live in results_dir.
+        results_dir: directory of the stored results (<stem>[.vN].json).
+        old_catalogue: catalogue version the stored results were made with.
+        new_catalogue: new catalogue version.
+        make_transformer: builds the transformer; only called if at least one
+                          step is affected.
+        min_score: see find_affected_steps().
+        on_error: optional callback(sop_file, exc); without it errors raise.
+        dry_run: only report the affected steps; nothing is re-mapped or
+                 written.
+
+    Returns:
+        A report with the catalogue diff, counts and, per SOP, the affected
+        steps (with reasons) and the written version. Identical catalogues
+        return right away, without reading any result; SOPs whose latest
+        version was already mapped against new_catalogue are counted in
+        "sops_up_to_date" and left alone.
+    """
+    diff = diff_catalogues(old_catalogue, new_catalogue)
+    matcher = CatalogueMatcher(new_catalogue)
+    fingerprint = catalogue_fingerprint(new_catalogue)
+    transformer = None
+
+    report: Dict[str, Any] = {
+        "diff": diff,
+        "sops_total": len(sop_files),
+        "sops_without_result": 0,
+        "sops_up_to_date": 0,
+        "sops_affected": 0,
+        "sops_failed": 0,
+        "steps_total": 0,
+        "steps_remapped": 0,
+        "sops": {},
+    }
+
+    if is_empty_diff(diff):
+        return report
+
+    for sop_file in sop_files:
+        stem = Path(sop_file).stem
+        versions = mapping_versions(results_dir, stem)
+        if not versions:
+            report["sops_without_result"] += 1
+            continue
+
+        latest_version, latest_path = versions[-1]
+        try:
+            meta = _read_meta(version_meta_path(results_dir, stem, latest_version))
+            if meta.get("catalogue_fingerprint") == fingerprint:
+                report["sops_up_to_date"] += 1
+                continue
+            with open(latest_path, encoding="utf-8") as f:
+                result = json.load(f)
+            sop_data = parse_sop_document(sop_file)
+            affected = find_affected_steps(
+                result, sop_data, diff, new_catalogue, matcher, min_score
+            )
+            report["steps_total"] += len(sop_data.get("steps", []) or [])
+            if not affected:
+                continue
+            version = latest_version + 1
+            output_path = os.path.join(results_dir, f"{stem}.v{version}.json")
+
+            if not dry_run:
+                if transformer is None:
+                    transformer = make_transformer()
+                merged = remap_steps(
+                    result, sop_data, new_catalogue, transformer, list(affected)
+                )
+                write_json_atomic(output_path, merged)
+                write_json_atomic(
+                    version_meta_path(results_dir, stem, version),
+                    {"catalogue_fingerprint": fingerprint},
+                )
+        except Exception as exc:
+            if on_error is None:
+                raise
+            report["sops_failed"] += 1
+            on_error(sop_file, exc)
+            continue
+
+        report["sops_affected"] += 1
+        report["steps_remapped"] += len(affected)
+        report["sops"][stem] = {
+            "from_version": latest_version,
+            "version": version,
+            "output_path": output_path,
+            "steps": affected,
+        }
+
+    return report
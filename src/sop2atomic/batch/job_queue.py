@@ -0,0 +1,294 @@
+"""
+Brokerless job queue for spreading conversions over several hosts.
+
+The queue is a single SQLite file, typically on storage shared by all
+workers. Each job converts one SOP file into one output JSON.
+
+Semantics:
+  - enqueue() is idempotent: a job is keyed by SOP path + output path, and
+    re-enqueueing a completed job with unchanged inputs is a no-op
+  - lease() atomically hands a job to one worker for lease_seconds
+  - heartbeat() extends the lease while the worker is busy
+  - a lease that is not renewed expires (visibility timeout) and the job
+    becomes available again, so a crashed worker's job is picked up by
+    another one
+  - complete() / fail() only take effect for the current lease holder
+  - re-enqueueing a leased job with new inputs never takes the job away
+    from its lease holder: the new inputs are recorded, and when the holder
+    completes the job for the inputs it leased, the job is queued again
+    instead of being marked done (see holds_lease() / complete())
+  - outputs are written atomically to a deterministic path, so a late
+    duplicate write from a presumed-dead worker yields the same, complete
+    file
+
+Note: SQLite relies on file locking. Use a filesystem with working POSIX
+locks (local disk, or a network share known to support them).
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+STATUS_QUEUED = "queued"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id         TEXT PRIMARY KEY,
+    sop_file       TEXT NOT NULL,
+    catalogue_file TEXT NOT NULL,
+    output_path    TEXT NOT NULL,
+    params         TEXT NOT NULL,
+    input_hash     TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    lease_owner    TEXT,
+    lease_expires  REAL,
+    error          TEXT,
+    created_at     REAL NOT NULL,
+    updated_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+"""
+
+
+class JobQueue:
+    """SQLite-backed job queue with leases, heartbeats and retries."""
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Autocommit mode: transactions are opened explicitly where needed
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def enqueue(
+        self,
+        sop_file: str,
+        catalogue_file: str,
+        output_path: str,
+        params: Dict[str, Any],
+        input_hash: str,
+    ) -> str:
+        """
+        Add (or refresh) a job and return its id.
+
+        A job that is already done with the same input_hash, or currently
+        queued/leased with it, is left untouched. A leased job with a
+        different input_hash keeps its lease; only its inputs are updated.
+
+        Raises:
+            ValueError: if another SOP file's job already writes output_path.
+        """
+        job_id = hashlib.sha256(f"{sop_file}\n{output_path}".encode()).hexdigest()[:16]
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            other = self.conn.execute(
+                "SELECT sop_file FROM jobs WHERE output_path = ? AND sop_file != ?",
+                (output_path, sop_file),
+            ).fetchone()
+            if other is not None:
+                raise ValueError(
+                    f"{output_path} is already the output of {other[0]}; "
+                    f"{sop_file} would overwrite it"
+                )
+            row = self.conn.execute(
+                "SELECT input_hash, status FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO jobs (job_id, sop_file, catalogue_file, "
+                    "output_path, params, input_hash, status, created_at, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        sop_file,
+                        catalogue_file,
+                        output_path,
+                        json.dumps(params, sort_keys=True),
+                        input_hash,
+                        STATUS_QUEUED,
+                        now,
+                        now,
+                    ),
+                )
+            elif row[0] != input_hash and row[1] == STATUS_LEASED:
+                self.conn.execute(
+                    "UPDATE jobs SET catalogue_file = ?, params = ?, "
+                    "input_hash = ?, updated_at = ? WHERE job_id = ?",
+                    (
+                        catalogue_file,
+                        json.dumps(params, sort_keys=True),
+                        input_hash,
+                        now,
+                        job_id,
+                    ),
+                )
+            elif row[0] != input_hash or row[1] == STATUS_FAILED:
+                self.conn.execute(
+                    "UPDATE jobs SET catalogue_file = ?, params = ?, "
+                    "input_hash = ?, status = ?, attempts = 0, lease_owner = NULL, "
+                    "lease_expires = NULL, error = NULL, updated_at = ? "
+                    "WHERE job_id = ?",
+                    (
+                        catalogue_file,
+                        json.dumps(params, sort_keys=True),
+                        input_hash,
+                        STATUS_QUEUED,
+                        now,
+                        job_id,
+                    ),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the next available job, or return None.
+
+        Available means queued, or leased with an expired lease whose
+        holder presumably crashed.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that used up their attempts will not be retried
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, "
+                "error = 'lease expired', updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (STATUS_FAILED, now, STATUS_LEASED, now, self.max_attempts),
+            )
+            cursor = self.conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? OR (status = ? AND "
+                "lease_expires < ?)) AND attempts < ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED, STATUS_LEASED, now, self.max_attempts),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            job = dict(zip([c[0] for c in cursor.description], row))
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (STATUS_LEASED, worker_id, now + lease_seconds, now, job["job_id"]),
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        job["params"] = json.loads(job["params"])
+        job["attempts"] += 1
+        job["lease_owner"] = worker_id
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False means the lease was lost to another worker."""
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, STATUS_LEASED, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def holds_lease(
+        self, job_id: str, worker_id: str, input_hash: Optional[str] = None
+    ) -> bool:
+        """
+        True if worker_id holds the job's lease and, if given, the job's
+        inputs are still input_hash. Check this before writing the output.
+        """
+        row = self.conn.execute(
+            "SELECT input_hash FROM jobs "
+            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (job_id, STATUS_LEASED, worker_id),
+        ).fetchone()
+        return row is not None and (input_hash is None or row[0] == input_hash)
+
+    def complete(
+        self, job_id: str, worker_id: str, input_hash: Optional[str] = None
+    ) -> bool:
+        """
+        Mark a job done if worker_id still holds its lease.
+
+        If input_hash (the hash the job was leased with) is given and the
+        job was re-enqueued with other inputs meanwhile, the job is queued
+        again for the new inputs and False is returned.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, "
+                "lease_expires = NULL, error = NULL, updated_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_owner = ? "
+                "AND (? IS NULL OR input_hash = ?)",
+                (
+                    STATUS_DONE,
+                    now,
+                    job_id,
+                    STATUS_LEASED,
+                    worker_id,
+                    input_hash,
+                    input_hash,
+                ),
+            )
+            done = cursor.rowcount == 1
+            if not done:
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = 0, lease_owner = NULL, "
+                    "lease_expires = NULL, error = NULL, updated_at = ? "
+                    "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                    (STATUS_QUEUED, now, job_id, STATUS_LEASED, worker_id),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return done
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Release a job after an error.
+
+        The job is queued again, or marked failed once it has been attempted
+        max_attempts times.
+        """
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (
+                self.max_attempts,
+                STATUS_FAILED,
+                STATUS_QUEUED,
+                error,
+                time.time(),
+                job_id,
+                STATUS_LEASED,
+                worker_id,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs per status."""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
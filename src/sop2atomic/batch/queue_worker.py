@@ -0,0 +1,146 @@
+"""
+Queue worker: pull conversion jobs from a JobQueue and run them.
+
+Each worker runs the standard pipeline (parse_sop_document,
+load_atomic_catalogue, a transformer) for one job at a time, keeps its lease
+alive with a background heartbeat, and writes the output atomically before
+marking the job done. The output is only written while the worker still
+holds the lease for the inputs it converted, so a stale worker cannot
+overwrite the result of newer inputs. Run as many workers as needed, on as many hosts as
+share the queue file; they coordinate only through the queue.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sop2atomic.batch.job_queue import JobQueue
+from sop2atomic.catalogue.atomic_catalogue_loader import load_atomic_catalogue
+from sop2atomic.parser.sop_parser import parse_sop_document
+from sop2atomic.utils.file_utils import sha256_file, write_json_atomic
+
+
+def default_worker_id() -> str:
+    """Return a worker id unique across hosts and processes."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _heartbeat_loop(
+    queue_path: str,
+    job_id: str,
+    worker_id: str,
+    lease_seconds: float,
+    interval: float,
+    stop: threading.Event,
+) -> None:
+    """Renew the lease every interval seconds until stop is set."""
+    # SQLite connections are per-thread, so the heartbeat uses its own
+    queue = JobQueue(queue_path)
+    try:
+        while not stop.wait(interval):
+            if not queue.heartbeat(job_id, worker_id, lease_seconds):
+                break
+    finally:
+        queue.close()
+
+
+def run_worker(
+    queue: JobQueue,
+    make_transformer: Callable[[Dict[str, Any]], Any],
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 300.0,
+    heartbeat_interval: Optional[float] = None,
+    poll_interval: float = 5.0,
+    exit_when_empty: bool = True,
+    max_jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Process jobs until the queue is empty (or forever, if requested).
+
+    Args:
+        queue: the shared job queue.
+        make_transformer: builds a transformer from a job's params
+                          (model, output_format); cached per distinct params.
+                          Catalogues are cached per path and reloaded when
+                          the file content changes.
+        worker_id: lease owner name (default: host-pid-random).
+        lease_seconds: visibility timeout of each lease.
+        heartbeat_interval: lease renewal period (default: lease_seconds / 3).
+        poll_interval: sleep between polls when the queue is empty.
+        exit_when_empty: stop when no job is available instead of polling.
+        max_jobs: stop after this many jobs.
+
+    Returns:
+        Counters for this worker: jobs done, failed and lost leases.
+    """
+    worker_id = worker_id or default_worker_id()
+    heartbeat_interval = heartbeat_interval or lease_seconds / 3
+
+    # Per catalogue path: (file hash, loaded catalogue). The hash is checked
+    # for every job, so a long-running worker picks up catalogue edits
+    catalogues: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+    transformers: Dict[Tuple[Any, ...], Any] = {}
+    report = {"worker_id": worker_id, "done": 0, "failed": 0, "lost_leases": 0}
+
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = queue.lease(worker_id, lease_seconds)
+        if job is None:
+            if exit_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+        processed += 1
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat_loop,
+            args=(
+                queue.path,
+                job["job_id"],
+                worker_id,
+                lease_seconds,
+                heartbeat_interval,
+                stop,
+            ),
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            catalogue_file = job["catalogue_file"]
+            digest = sha256_file(catalogue_file)
+            if catalogues.get(catalogue_file, ("",))[0] != digest:
+                catalogues[catalogue_file] = (
+                    digest,
+                    load_atomic_catalogue(catalogue_file),
+                )
+            key = tuple(sorted(job["params"].items()))
+            if key not in transformers:
+                transformers[key] = make_transformer(job["params"])
+
+            sop_data = parse_sop_document(job["sop_file"])
+            result = transformers[key].transform(
+                sop_data, catalogues[catalogue_file][1]
+            )
+            if queue.holds_lease(job["job_id"], worker_id, job["input_hash"]):
+                write_json_atomic(job["output_path"], result)
+        except Exception as exc:
+            stop.set()
+            heartbeat.join()
+            queue.fail(job["job_id"], worker_id, f"{type(exc).__name__}: {exc}")
+            report["failed"] += 1
+            continue
+
+        stop.set()
+        heartbeat.join()
+        if queue.complete(job["job_id"], worker_id, job["input_hash"]):
+            report["done"] += 1
+        else:
+            # Another worker took over after our lease expired, or the job
+            # was re-enqueued with new inputs and is queued again for them
+            report["lost_leases"] += 1
+
+    return report
@@ -0,0 +1,193 @@
+"""
+Crash-safe, resumable batch conversion.
+
+Wraps run_batch() with a RunJournal:
+  - every SOP is keyed by its path and a hash of its inputs (SOP file bytes,
+    catalogue fingerprint and conversion options)
+  - SOPs already completed in the run, with unchanged inputs and an existing
+    output file, are skipped
+  - interrupted and failed SOPs are retried until max_attempts attempts
+    have been started on them (an attempt counts as soon as it starts, so a
+    SOP that keeps crashing the run is given up too)
+  - outputs are written atomically as soon as each SOP completes, so a crash
+    never leaves a truncated JSON file behind
+  - the mapping of every clustered step of the dedup pre-pass is
+    checkpointed as a "chunk", keyed by the step text and the catalogue
+
+Re-running a finished run performs no LLM calls and writes nothing.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sop2atomic.batch.batch_runner import run_batch
+from sop2atomic.batch.run_journal import JournalChunkStore, RunJournal
+from sop2atomic.catalogue.atomic_catalogue_loader import (
+    catalogue_fingerprint,
+    load_atomic_catalogue,
+)
+from sop2atomic.models.sop_models import SopDocument
+from sop2atomic.parser.sop_parser import parse_sop_document
+from sop2atomic.utils.file_utils import (
+    sha256_file,
+    stem_collisions,
+    write_json_atomic,
+)
+
+
+def run_resumable_batch(
+    journal: RunJournal,
+    run_id: str,
+    make_transformer: Callable[[Dict[str, Any]], Any],
+    max_attempts: int = 3,
+) -> Dict[str, Any]:
+    """
+    Execute (or resume) a journaled batch run.
+
+    The run's parameters (SOP files, catalogue file, output directory and
+    conversion options) are read from the journal, as stored by start_run().
+
+    Args:
+        journal: the run journal.
+        run_id: id returned by journal.start_run().
+        make_transformer: builds an object with transform(sop_data, catalogue)
+                          from the run parameters. Only called if there is
+                          work left, so a finished run needs no LLM client.
+        max_attempts: attempts per SOP before it is no longer retried.
+
+    Returns:
+        A report with per-status counts for this invocation plus the
+        underlying batch report (dedup ratio, LLM calls...).
+    """
+    params = journal.run_params(run_id)
+    output_dir = params["output_dir"]
+    catalogue = load_atomic_catalogue(params["catalogue_file"])
+
+    options = json.dumps(
+        {
+            "catalogue": catalogue_fingerprint(catalogue),
+            "model": params.get("model"),
+            "output_format": params.get("output_format"),
+            "dedup": params.get("dedup"),
+            "threshold": params.get("threshold"),
+            "pack_token_budget": params.get("pack_token_budget"),
+            "dedup_chunk_steps": params.get("dedup_chunk_steps"),
+        },
+        sort_keys=True,
+    )
+
+    report: Dict[str, Any] = {
+        "run_id": run_id,
+        "sops_total": len(params["sop_files"]),
+        "skipped_done": 0,
+        "gave_up": 0,
+        "converted": 0,
+        "failed": 0,
+    }
+
+    # 1) Decide which SOPs still need work
+    pending: List[Dict[str, Any]] = []
+    for sop_file in params["sop_files"]:
+        item_id = os.path.abspath(sop_file)
+        input_hash = hashlib.sha256(
+            (sha256_file(sop_file) + options).encode("utf-8")
+        ).hexdigest()
+
+        if journal.is_done(run_id, item_id, input_hash):
+            report["skipped_done"] += 1
+            continue
+        if journal.attempts(run_id, item_id, input_hash) >= max_attempts:
+            report["gave_up"] += 1
+            continue
+
+        journal.mark_running(run_id, item_id, "sop", input_hash)
+        try:
+            # Held until the whole batch is done: keep the compact records
+            sop_data = SopDocument.from_dict(parse_sop_document(sop_file))
+        except Exception as exc:  # unreadable or malformed SOP document
+            journal.mark_failed(run_id, item_id, f"parse error: {exc}")
+            report["failed"] += 1
+            continue
+
+        pending.append(
+            {
+                "item_id": item_id,
+                "sop_data": sop_data,
+                "output_path": os.path.join(output_dir, f"{Path(sop_file).stem}.json"),
+            }
+        )
+
+    if not pending:
+        report["batch"] = None
+        return report
+
+    # 2) Convert, persisting each SOP the moment it completes
+    def on_result(index: int, result: Dict[str, Any]) -> None:
+        item = pending[index]
+        write_json_atomic(item["output_path"], result)
+        journal.mark_done(run_id, item["item_id"], item["output_path"])
+        report["converted"] += 1
+
+    def on_error(index: int, exc: Exception) -> None:
+        journal.mark_failed(run_id, pending[index]["item_id"], str(exc))
+        report["failed"] += 1
+
+    chunk_dir = os.path.join(os.path.dirname(os.path.abspath(journal.path)), run_id)
+    _, batch_report = run_batch(
+        [item["sop_data"] for item in pending],
+        catalogue,
+        make_transformer(params),
+        dedup=bool(params.get("dedup", True)),
+        threshold=float(params.get("threshold", 0.8)),
+        chunk_store=JournalChunkStore(journal, run_id, chunk_dir),
+        on_result=on_result,
+        on_error=on_error,
+        pack_token_budget=params.get("pack_token_budget"),
+        dedup_chunk_steps=int(params.get("dedup_chunk_steps") or 50),
+    )
+    report["batch"] = batch_report
+    return report
+
+
+def start_batch_run(
+    journal: RunJournal,
+    catalogue_file: str,
+    sop_files: List[str],
+    output_dir: str,
+    model: str = "gpt-5.1",
+    output_format: str = "full",
+    dedup: bool = True,
+    threshold: float = 0.8,
+    pack_token_budget: Optional[int] = None,
+    dedup_chunk_steps: int = 50,
+) -> str:
+    """
+    Register a new batch run in the journal and return its id.
+
+    Raises:
+        ValueError: if two SOP files share a file name (stem), since their
+                    outputs <output_dir>/<stem>.json would overwrite each
+                    other.
+    """
+    collisions = stem_collisions(sop_files)
+    if collisions:
+        raise ValueError(
+            "SOP files with the same name would write the same output: "
+            + "; ".join(", ".join(group) for group in collisions.values())
+        )
+    return journal.start_run(
+        {
+            "catalogue_file": os.path.abspath(catalogue_file),
+            "sop_files": [os.path.abspath(p) for p in sop_files],
+            "output_dir": os.path.abspath(output_dir),
+            "model": model,
+            "output_format": output_format,
+            "dedup": dedup,
+            "threshold": threshold,
+            "pack_token_budget": pack_token_budget,
+            "dedup_chunk_steps": dedup_chunk_steps,
+        }
+    )
@@ -0,0 +1,232 @@
+"""
+Durable run journal for batch conversions (SQLite).
+
+The journal records, per run, the status of every work item so that a batch
+that dies part-way (OOM, network drop, killed pod) can be resumed without
+paying again for completed LLM calls.
+
+Work items are either:
+  - "sop":   one SOP file converted to one output JSON
+  - "chunk": an intermediate LLM result shared by several SOPs (the
+             mapping of one clustered step of the deduplication pre-pass)
+
+Each item stores the hash of its inputs; an item only counts as complete if
+its recorded hash matches the current inputs and its output file exists.
+
+Tables:
+    runs(run_id, created_at, params)
+    items(run_id, item_id, kind, input_hash, status, attempts,
+          output_path, error, updated_at)
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sop2atomic.utils.file_utils import write_json_atomic
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    params     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id      TEXT NOT NULL,
+    item_id     TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    input_hash  TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error       TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, item_id)
+);
+"""
+
+
+class RunJournal:
+    """SQLite-backed journal of batch runs and their work items."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ------------------------------------------------------------------ runs
+
+    def start_run(self, params: Dict[str, Any]) -> str:
+        """Create a new run and return its id."""
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, created_at, params) VALUES (?, ?, ?)",
+                (run_id, time.time(), json.dumps(params, sort_keys=True)),
+            )
+        return run_id
+
+    def run_params(self, run_id: str) -> Dict[str, Any]:
+        """
+        Return the parameters a run was started with.
+
+        Raises:
+            KeyError: if the run does not exist in this journal.
+        """
+        row = self.conn.execute(
+            "SELECT params FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run id {run_id!r} in journal {self.path}")
+        return json.loads(row[0])
+
+    # ----------------------------------------------------------------- items
+
+    def is_done(self, run_id: str, item_id: str, input_hash: str) -> bool:
+        """True if the item completed with these inputs and its output exists."""
+        row = self._item(run_id, item_id)
+        return (
+            row is not None
+            and row["status"] == STATUS_DONE
+            and row["input_hash"] == input_hash
+            and bool(row["output_path"])
+            and os.path.exists(row["output_path"])
+        )
+
+    def attempts(self, run_id: str, item_id: str, input_hash: str) -> int:
+        """
+        Number of attempts started so far with these inputs.
+
+        An attempt counts from the moment it is claimed (mark_running), so an
+        item whose attempts keep dying with the whole process (OOM, a batch-
+        level exception) stops being retried after max_attempts too.
+        """
+        row = self._item(run_id, item_id)
+        if row is None or row["input_hash"] != input_hash:
+            return 0
+        return row["attempts"]
+
+    def mark_running(
+        self, run_id: str, item_id: str, kind: str, input_hash: str
+    ) -> None:
+        """Claim the item and count the attempt (reset if inputs changed)."""
+        self._upsert(
+            run_id,
+            item_id,
+            kind=kind,
+            input_hash=input_hash,
+            status=STATUS_RUNNING,
+            attempts=self.attempts(run_id, item_id, input_hash) + 1,
+            output_path=None,
+            error=None,
+        )
+
+    def mark_done(self, run_id: str, item_id: str, output_path: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE items SET status = ?, output_path = ?, error = NULL, "
+                "updated_at = ? WHERE run_id = ? AND item_id = ?",
+                (STATUS_DONE, output_path, time.time(), run_id, item_id),
+            )
+
+    def mark_failed(self, run_id: str, item_id: str, error: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE items SET status = ?, error = ?, "
+                "updated_at = ? WHERE run_id = ? AND item_id = ?",
+                (STATUS_FAILED, error, time.time(), run_id, item_id),
+            )
+
+    def items(self, run_id: str) -> List[Dict[str, Any]]:
+        """Return every item of a run as a dict."""
+        cursor = self.conn.execute(
+            "SELECT * FROM items WHERE run_id = ? ORDER BY item_id", (run_id,)
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self, run_id: str) -> Dict[str, int]:
+        """Count items of a run per status."""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM items WHERE run_id = ? GROUP BY status",
+            (run_id,),
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def _item(self, run_id: str, item_id: str) -> Optional[Dict[str, Any]]:
+        cursor = self.conn.execute(
+            "SELECT * FROM items WHERE run_id = ? AND item_id = ?",
+            (run_id, item_id),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cursor.description], row))
+
+    def _upsert(self, run_id: str, item_id: str, **fields: Any) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO items (run_id, item_id, kind, input_hash, status, "
+                "attempts, output_path, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id, item_id) DO UPDATE SET "
+                "kind = excluded.kind, input_hash = excluded.input_hash, "
+                "status = excluded.status, attempts = excluded.attempts, "
+                "output_path = excluded.output_path, error = excluded.error, "
+                "updated_at = excluded.updated_at",
+                (
+                    run_id,
+                    item_id,
+                    fields["kind"],
+                    fields["input_hash"],
+                    fields["status"],
+                    fields["attempts"],
+                    fields["output_path"],
+                    fields["error"],
+                    time.time(),
+                ),
+            )
+
+
+class JournalChunkStore:
+    """
+    Mapping-like store of intermediate LLM results, checkpointed in a run.
+
+    Used by run_batch() for the mappings of clustered steps: a mapping
+    completed earlier in the run is read back from disk on resume instead of
+    being sent to the LLM again.
+    """
+
+    def __init__(self, journal: RunJournal, run_id: str, directory: str):
+        self.journal = journal
+        self.run_id = run_id
+        self.directory = directory
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item_id = f"chunk:{key}"
+        if not self.journal.is_done(self.run_id, item_id, key):
+            return None
+        with open(self._path(key), encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        item_id = f"chunk:{key}"
+        self.journal.mark_running(self.run_id, item_id, "chunk", key)
+        write_json_atomic(self._path(key), value)
+        self.journal.mark_done(self.run_id, item_id, self._path(key))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
@@ -0,0 +1,228 @@
+"""
+Near-duplicate detection for SOP steps across a batch (MinHash + LSH).
+
+Many SOPs share almost identical steps ("Save the report to the shared
+drive"). This module clusters such steps so a batch run can map one
+representative per cluster and fan the mapping back out:
+
+  - normalise_step_text(): lower-case, mask variable tokens (emails, paths,
+    file names, numbers), strip punctuation, collapse spaces
+  - cluster_texts(): MinHash signatures over word shingles, banded LSH to
+    find candidate pairs, then an estimated-Jaccard check and union-find
+  - adapt_mapped_step(): copy a representative's mapped step onto another
+    instance, re-extracting parameter values that differ between the two
+    texts (file names, dates, recipients...) as whole tokens
+
+Everything is pure Python and deterministic (fixed hash seeds).
+"""
+
+import copy
+import difflib
+import hashlib
+import random
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+_PUNCT_RE = re.compile(r"[^\w\s<>]")
+_SPACE_RE = re.compile(r"\s+")
+
+# Variable parts of otherwise identical steps, masked before comparison so
+# that "Save pack_A.xlsx" and "Save pack_B.xlsx" are exact duplicates. The
+# concrete values are re-extracted per instance by adapt_mapped_step().
+_MASKS = [
+    (re.compile(r"\S+@\S+\.\w+"), " <email> "),
+    (re.compile(r"\S*[\\/]\S*"), " <path> "),
+    (re.compile(r"\S+\.[a-z][a-z0-9]{1,4}\b"), " <file> "),
+    (re.compile(r"\S*\d\S*"), " <num> "),
+]
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Differing tokens this short ("1", "A", "Q2") are too ambiguous to
+# substitute safely inside parameter values
+_MIN_SUBSTITUTION_LEN = 3
+
+
+def normalise_step_text(text: str) -> str:
+    """Normalise step text for duplicate detection."""
+    text = str(text or "").lower()
+    for pattern, placeholder in _MASKS:
+        text = pattern.sub(placeholder, text)
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip(" .")
+
+
+def _shingles(text: str, size: int = 2) -> Set[str]:
+    """Word n-gram shingles; short texts fall back to single words."""
+    words = text.split()
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _base_hash(shingle: str) -> int:
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class MinHasher:
+    """MinHash signatures with num_perm universal hash permutations."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = [rng.randrange(1, _MERSENNE_PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _MERSENNE_PRIME) for _ in range(num_perm)]
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        if not shingles:
+            return [_MERSENNE_PRIME] * self.num_perm
+        hashes = [_base_hash(s) for s in shingles]
+        return [
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in zip(self._a, self._b)
+        ]
+
+
+def _estimated_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def cluster_texts(
+    texts: List[str],
+    threshold: float = 0.8,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> List[List[int]]:
+    """
+    Group near-duplicate texts.
+
+    Args:
+        texts: raw step texts (normalised internally).
+        threshold: minimum estimated Jaccard similarity of word shingles.
+        num_perm: MinHash signature length; must be divisible by bands.
+        bands: LSH bands; more bands find more candidates at lower similarity.
+
+    Returns:
+        Clusters as lists of indices into texts, each sorted, ordered by
+        their first index. Singletons are included.
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+
+    normalised = [normalise_step_text(t) for t in texts]
+    hasher = MinHasher(num_perm=num_perm)
+    signatures = [hasher.signature(_shingles(t)) for t in normalised]
+
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = num_perm // bands
+    for band in range(bands):
+        buckets: Dict[tuple, List[int]] = {}
+        for i, sig in enumerate(signatures):
+            if normalised[i]:
+                key = tuple(sig[band * rows : (band + 1) * rows])
+                buckets.setdefault(key, []).append(i)
+
+        for members in buckets.values():
+            head = members[0]
+            for other in members[1:]:
+                root_a, root_b = find(head), find(other)
+                if root_a == root_b:
+                    continue
+                if normalised[head] == normalised[other] or (
+                    _estimated_jaccard(signatures[head], signatures[other]) >= threshold
+                ):
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def adapt_mapped_step(
+    mapped_step: Dict[str, Any],
+    representative_text: str,
+    instance_step: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    Fan a representative's mapped step out to another near-duplicate step.
+
+    Words that differ between the representative and the instance (e.g. a
+    file name) are substituted in string parameter values where they occur
+    as whole tokens (delimited by non-word characters), never inside other
+    words. The instance is not adapted, and must be mapped on its own, when
+      - a differing token of one or two characters occurs in a parameter
+        value, since it cannot be substituted reliably ("1" in "Pack 1 for
+        Q1")
+      - a differing token occurs in no parameter value: the difference may
+        change the action itself ("Open ..." vs "Delete ..."), which the
+        representative's mapping cannot reflect
+    Step number, wording and notes come from the instance.
+
+    Args:
+        mapped_step: normalised step from the transformer result for the
+                     representative.
+        representative_text: "action notes" text the mapping was made from.
+        instance_step: parsed SOP step ({step_number, action, notes}).
+
+    Returns:
+        A new mapped step dict for the instance (the input is not modified),
+        or None if the instance cannot be adapted safely.
+    """
+    instance_text = (
+        f"{instance_step.get('action', '')} {instance_step.get('notes', '')}"
+    )
+    substitutions = _word_substitutions(representative_text, instance_text)
+
+    adapted = copy.deepcopy(mapped_step)
+    adapted["step_number"] = str(instance_step.get("step_number", ""))
+    adapted["original_action"] = instance_step.get("action", "")
+    adapted["notes"] = instance_step.get("notes", "")
+
+    unused = set(substitutions)
+    if substitutions:
+        patterns = [
+            (re.compile(r"(?<!\w)" + re.escape(old) + r"(?!\w)"), old, new)
+            for old, new in substitutions
+        ]
+        for action in adapted.get("atomic_actions", []):
+            parameters = action.get("parameters") or {}
+            for name, value in parameters.items():
+                if not isinstance(value, str):
+                    continue
+                for pattern, old, new in patterns:
+                    if not pattern.search(value):
+                        continue
+                    if len(old) < _MIN_SUBSTITUTION_LEN:
+                        return None
+                    value = pattern.sub(lambda _: new, value)
+                    unused.discard((old, new))
+                parameters[name] = value
+    if unused:
+        return None
+    return adapted
+
+
+def _word_substitutions(source: str, target: str) -> List[tuple]:
+    """Return (old, new) word-run replacements turning source into target."""
+    source_words = source.split()
+    target_words = target.split()
+    matcher = difflib.SequenceMatcher(a=source_words, b=target_words, autojunk=False)
+
+    substitutions = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "replace":
+            old = " ".join(source_words[i1:i2]).strip(".,;:")
+            new = " ".join(target_words[j1:j2]).strip(".,;:")
+            if old and new and old != new:
+                substitutions.append((old, new))
+    # Longest first, so "report_v2.xlsx" wins over a shorter overlapping run
+    substitutions.sort(key=lambda pair: len(pair[0]), reverse=True)
+    return substitutions
@@ -14,6 +14,9 @@ This catalogue is used to map SOP steps into atomic actions.
 """
 
 from typing import List, Dict, Any
+import hashlib
+import json
+
 import pandas as pd
 
 
@@ -54,3 +57,30 @@ def load_atomic_catalogue(path: str) -> List[Dict[str, Any]]:
         )
 
     return components
+
+
+def catalogue_fingerprint(catalogue: List[Dict[str, Any]]) -> str:
+    """
+    Return a stable hex digest identifying the content of a loaded catalogue.
+
+    Two catalogues with the same components (same order, same fields) share a
+    fingerprint, which makes it usable as a cache or checkpoint key.
+    """
+    payload = json.dumps(catalogue, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def duplicate_component_ids(catalogue: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Return the component ids used by more than one component, with the
+    id_names sharing each of them (e.g. {"4.1": ["OPEN_EMAIL_TEMPLATE",
+    "COPY_EMAIL_FOOTER"]}).
+
+    Such ids do not identify a component on their own; (id, id_name) does.
+    """
+    names: Dict[str, List[str]] = {}
+    for component in catalogue:
+        names.setdefault(str(component.get("id", "")), []).append(
+            str(component.get("id_name", ""))
+        )
+    return {cid: group for cid, group in names.items() if len(group) > 1}
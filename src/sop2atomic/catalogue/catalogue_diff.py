@@ -0,0 +1,160 @@
+"""
+Catalogue change impact analysis.
+
+Compares two versions of the Atomic Components Catalogue (as returned by
+load_atomic_catalogue) and finds the mapped steps of a stored result that
+may map differently under the new version:
+  - steps using a component that was removed or changed (name, category,
+    description or parameters)
+  - steps containing a MISSING_COMPONENT action, which a new component may
+    now cover
+  - steps of the SOP that the result has no mapping for
+  - steps lexically close (see CatalogueMatcher) to an added component or
+    to a component whose description changed
+
+Components are matched across versions by their "id", so a renamed component
+shows up as changed. An id shared by several components in either version
+(e.g. "4.1" for OPEN_EMAIL_TEMPLATE and COPY_EMAIL_FOOTER) does not identify
+a component: those components are matched by (id, id_name) instead and keyed
+as "4.1 (COPY_EMAIL_FOOTER)" in the diff.
+"""
+
+from typing import Any, Collection, Dict, List, Optional
+
+from sop2atomic.catalogue.atomic_catalogue_loader import duplicate_component_ids
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+
+# Component fields whose change may alter a mapping
+DIFF_FIELDS = ("id_name", "category", "description", "parameters")
+
+
+def component_key(component_id: Any, id_name: Any, shared_ids: Collection[str]) -> str:
+    """Return the diff key of a component: its id, plus id_name if shared."""
+    component_id = str(component_id)
+    if component_id in shared_ids:
+        return f"{component_id} ({id_name})"
+    return component_id
+
+
+def diff_catalogues(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Diff two loaded catalogues.
+
+    Returns:
+        {
+          "added":      [component keys only in new],
+          "removed":    [component keys only in old],
+          "changed":    {component key: [changed fields]},
+          "shared_ids": [ids used by several components in either version]
+        }
+        A component key is its id, or "id (id_name)" for a shared id (see
+        component_key()).
+    """
+    shared = sorted(
+        set(duplicate_component_ids(old)) | set(duplicate_component_ids(new))
+    )
+    old_by_id = {
+        component_key(c.get("id", ""), c.get("id_name"), shared): c for c in old
+    }
+    new_by_id = {
+        component_key(c.get("id", ""), c.get("id_name"), shared): c for c in new
+    }
+
+    changed: Dict[str, List[str]] = {}
+    for component_id, component in new_by_id.items():
+        previous = old_by_id.get(component_id)
+        if previous is None:
+            continue
+        fields = [
+            f for f in DIFF_FIELDS if str(previous.get(f)) != str(component.get(f))
+        ]
+        if fields:
+            changed[component_id] = fields
+
+    return {
+        "added": [i for i in new_by_id if i not in old_by_id],
+        "removed": [i for i in old_by_id if i not in new_by_id],
+        "changed": changed,
+        "shared_ids": shared,
+    }
+
+
+def is_empty_diff(diff: Dict[str, Any]) -> bool:
+    """Return True if the diff contains no change at all."""
+    return not (diff["added"] or diff["removed"] or diff["changed"])
+
+
+def find_affected_steps(
+    result: Dict[str, Any],
+    sop_data: Dict[str, Any],
+    diff: Dict[str, Any],
+    new_catalogue: List[Dict[str, Any]],
+    matcher: Optional[CatalogueMatcher] = None,
+    min_score: float = 0.35,
+) -> Dict[str, List[str]]:
+    """
+    Return the steps of a stored result to re-map, with the reasons.
+
+    Args:
+        result: stored sop2atomic result for the SOP.
+        sop_data: parsed SOP the result was produced from.
+        diff: output of diff_catalogues(old, new_catalogue).
+        new_catalogue: the new catalogue version.
+        matcher: optional CatalogueMatcher over new_catalogue (pass one in
+                 when analysing many SOPs against the same catalogue).
+        min_score: lexical score above which a step counts as close to an
+                   added or re-described component.
+
+    Returns:
+        {step_number: [reason, ...]} for every affected step.
+    """
+    shared = set(diff.get("shared_ids", []))
+    touched = set(diff["removed"]) | set(diff["changed"])
+    attracting = set(diff["added"]) | {
+        i for i, fields in diff["changed"].items() if "description" in fields
+    }
+    if attracting and matcher is None:
+        matcher = CatalogueMatcher(new_catalogue)
+
+    mapped = {str(s.get("step_number", "")): s for s in result.get("steps", [])}
+    affected: Dict[str, List[str]] = {}
+
+    for source in sop_data.get("steps", []) or []:
+        step_number = str(source.get("step_number", ""))
+        reasons: List[str] = []
+
+        step = mapped.get(step_number)
+        if step is None:
+            reasons.append("unmapped_step")
+        else:
+            for action in step.get("atomic_actions", []) or []:
+                key = component_key(
+                    action.get("component_id"), action.get("component_name"), shared
+                )
+                if action.get("component_name") == MISSING_COMPONENT:
+                    reason = "missing_component"
+                elif key in diff["removed"]:
+                    reason = "removed_component"
+                elif key in touched:
+                    reason = "changed_component"
+                else:
+                    continue
+                if reason not in reasons:
+                    reasons.append(reason)
+
+        if attracting and matcher is not None:
+            text = f"{source.get('action', '')} {source.get('notes', '')}"
+            candidates = matcher.rank(text, top_k=3, min_score=min_score)
+            if any(
+                component_key(c.get("id", ""), c.get("id_name"), shared) in attracting
+                for c, _ in candidates
+            ):
+                reasons.append("close_to_new_component")
+
+        if reasons:
+            affected[step_number] = reasons
+
+    return affected
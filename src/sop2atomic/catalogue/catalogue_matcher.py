@@ -0,0 +1,118 @@
+"""
+Lexical matching of free text against the Atomic Components Catalogue.
+
+This is a cheap, local retrieval signal: no LLM call is involved. Each
+component is indexed by the words of its ID_NAME, category and description,
+weighted by inverse document frequency so that generic words ("file",
+"open") count for less than specific ones ("bloomberg", "clipboard").
+
+Typical use:
+    matcher = CatalogueMatcher(catalogue)
+    matcher.rank("Open the shared mailbox folder", top_k=3)
+    -> [(component_dict, score), ...]
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal for component selection
+_STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "as",
+    "at",
+    "be",
+    "by",
+    "for",
+    "from",
+    "if",
+    "in",
+    "into",
+    "is",
+    "it",
+    "of",
+    "on",
+    "or",
+    "the",
+    "then",
+    "this",
+    "to",
+    "with",
+}
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-case and split text into word tokens, dropping stopwords."""
+    if not text:
+        return []
+    words = _TOKEN_RE.findall(str(text).lower().replace("_", " "))
+    return [w for w in words if w not in _STOPWORDS and len(w) > 1]
+
+
+class CatalogueMatcher:
+    """IDF-weighted token overlap between free text and catalogue components."""
+
+    def __init__(self, catalogue: List[Dict[str, Any]]):
+        self.catalogue = catalogue
+        self._tokens: List[Set[str]] = [
+            set(
+                tokenize(c.get("id_name", ""))
+                + tokenize(c.get("category", ""))
+                + tokenize(c.get("description", ""))
+            )
+            for c in catalogue
+        ]
+
+        document_frequency: Dict[str, int] = {}
+        for tokens in self._tokens:
+            for token in tokens:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        n = max(len(catalogue), 1)
+        self._idf = {
+            token: math.log(1 + n / df) for token, df in document_frequency.items()
+        }
+        self._max_idf = math.log(1 + n)
+
+    def score(self, text: Any, index: int) -> float:
+        """
+        Return the match score of text against the component at index.
+
+        Cosine similarity of IDF-weighted token sets, so it lies in [0, 1].
+        Query words unknown to the catalogue get the maximum IDF.
+        """
+        return self._score_tokens(set(tokenize(text)), index)
+
+    def _score_tokens(self, query: Set[str], index: int) -> float:
+        """Score a pre-tokenised query against the component at index."""
+        component_tokens = self._tokens[index]
+        if not component_tokens or not query:
+            return 0.0
+
+        shared = sum(self._idf[t] ** 2 for t in component_tokens & query)
+        if not shared:
+            return 0.0
+        component_norm = sum(self._idf[t] ** 2 for t in component_tokens)
+        query_norm = sum(self._idf.get(t, self._max_idf) ** 2 for t in query)
+        return shared / math.sqrt(component_norm * query_norm)
+
+    def rank(
+        self, text: Any, top_k: int = 3, min_score: float = 0.0
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Return up to top_k (component, score) pairs, best first.
+
+        Components scoring at or below min_score are dropped.
+        """
+        query = set(tokenize(text))
+        scored = [
+            (self.catalogue[i], self._score_tokens(query, i))
+            for i in range(len(self.catalogue))
+        ]
+        scored = [pair for pair in scored if pair[1] > min_score]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:top_k]
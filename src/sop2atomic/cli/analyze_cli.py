@@ -0,0 +1,63 @@
+"""
+`sop2atomic analyze`: parallelism analysis of a conversion result.
+
+Reads a result JSON produced by sop2atomic and writes its execution DAG
+(see sop2atomic.analysis.execution_dag): independent branches, critical
+path and theoretical speedup.
+
+Usage:
+    sop2atomic analyze <result.json> [--durations durations.json] [--output dag.json]
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from sop2atomic.analysis.execution_dag import build_execution_dag
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the analyze command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic analyze",
+        description="Compile a conversion result into an execution DAG.",
+    )
+    parser.add_argument("result_file", help="Path to a sop2atomic result JSON")
+    parser.add_argument(
+        "--durations",
+        help="Optional JSON file mapping component_name to seconds per action",
+    )
+    parser.add_argument(
+        "--output",
+        help="Optional output file (default: print to stdout)",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Analyze CLI workflow."""
+    args = build_parser().parse_args(argv)
+
+    with open(args.result_file, encoding="utf-8") as f:
+        result = json.load(f)
+    durations = None
+    if args.durations:
+        with open(args.durations, encoding="utf-8") as f:
+            durations = json.load(f)
+
+    dag = build_execution_dag(result, durations=durations)
+
+    print(
+        f"{len(dag['nodes'])} actions, {len(dag['branches'])} independent "
+        f"branches, critical path {dag['critical_path_s']:.1f}s of "
+        f"{dag['total_duration_s']:.1f}s serial "
+        f"(theoretical speedup x{dag['theoretical_speedup']})",
+        file=sys.stderr,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(dag, f, indent=2)
+        print(f"Output written to {args.output}")
+    else:
+        print(json.dumps(dag, indent=2))
@@ -0,0 +1,162 @@
+"""
+`sop2atomic batch`: convert many SOPs in one run.
+
+Near-duplicate steps shared across SOPs are mapped once per batch (see
+sop2atomic.batch.batch_runner). One JSON file per SOP is written to the
+output directory, named after the SOP file.
+
+Every run is recorded in a journal (see sop2atomic.batch.run_journal) and
+its id is printed. An interrupted run can be resumed, skipping completed
+SOPs and retrying failed ones:
+
+Usage:
+    sop2atomic batch <atomic_catalogue.xlsx> <sop1.docx> [<sop2.docx> ...] \
+        --output-dir out/
+    sop2atomic batch --resume <run-id>
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from sop2atomic.batch.resumable_batch import run_resumable_batch, start_batch_run
+from sop2atomic.batch.run_journal import RunJournal
+from sop2atomic.cli.scheduler_options import (
+    add_scheduler_arguments,
+    configure_scheduler,
+)
+from sop2atomic.llm.request_scheduler import get_default_scheduler
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+DEFAULT_JOURNAL = ".sop2atomic/runs.sqlite"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the batch command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic batch",
+        description="Convert a batch of SOP (.docx) files into atomic workflow JSON.",
+    )
+    parser.add_argument(
+        "catalogue_file",
+        nargs="?",
+        help="Path to the Atomic Components Catalogue (.xlsx)",
+    )
+    parser.add_argument("sop_files", nargs="*", help="Paths to SOP .docx files")
+    parser.add_argument("--output-dir", help="Directory for the per-SOP JSON files")
+    parser.add_argument(
+        "--model",
+        default="gpt-5.1",
+        help="OpenAI model to use (default: gpt-5.1)",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["full", "compact"],
+        default="full",
+        help="Output contract requested from the model (default: full)",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Disable cross-SOP near-duplicate step deduplication",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=0.8,
+        help="Similarity threshold for near-duplicate steps (default: 0.8)",
+    )
+    parser.add_argument(
+        "--dedup-chunk-steps",
+        type=int,
+        default=50,
+        help="Maximum near-duplicate representatives per request (default: 50)",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        metavar="N",
+        help=(
+            "Pack several small SOPs into one request of up to N estimated "
+            "prompt tokens, sending the catalogue once per pack"
+        ),
+    )
+    parser.add_argument(
+        "--journal",
+        default=DEFAULT_JOURNAL,
+        help=f"SQLite run journal used for checkpointing (default: {DEFAULT_JOURNAL})",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Resume a previous run: skip completed SOPs, retry failed ones",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Failures per SOP before it is no longer retried (default: 3)",
+    )
+    add_scheduler_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Batch CLI workflow."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configure_scheduler(parser, args)
+
+    journal = RunJournal(args.journal)
+    try:
+        if args.resume:
+            run_id = args.resume
+            try:
+                params = journal.run_params(run_id)
+            except KeyError as exc:
+                parser.error(str(exc))
+        else:
+            if not args.catalogue_file or not args.sop_files or not args.output_dir:
+                parser.error(
+                    "catalogue_file, at least one SOP file and --output-dir are "
+                    "required unless --resume is given"
+                )
+            try:
+                run_id = start_batch_run(
+                    journal,
+                    args.catalogue_file,
+                    args.sop_files,
+                    args.output_dir,
+                    model=args.model,
+                    output_format=args.output_format,
+                    dedup=not args.no_dedup,
+                    threshold=args.dedup_threshold,
+                    pack_token_budget=args.pack_tokens,
+                    dedup_chunk_steps=args.dedup_chunk_steps,
+                )
+            except ValueError as exc:
+                parser.error(str(exc))
+            params = journal.run_params(run_id)
+
+        print(f"Run id: {run_id}", file=sys.stderr)
+        report = run_resumable_batch(
+            journal,
+            run_id,
+            lambda p: SopToAtomicTransformer(
+                model=p["model"],
+                output_format=p["output_format"],
+                priority="bulk",
+                tenant=args.tenant,
+            ),
+            max_attempts=args.max_attempts,
+        )
+    finally:
+        journal.close()
+
+    print(f"Output written to {params['output_dir']}")
+    print("Batch report: " + json.dumps(report, indent=2), file=sys.stderr)
+    print(
+        "LLM scheduler: " + json.dumps(get_default_scheduler().stats()),
+        file=sys.stderr,
+    )
@@ -0,0 +1,146 @@
+"""
+`sop2atomic index` / `sop2atomic query`: searchable SOP corpus index
+(see sop2atomic.index.corpus_index).
+
+`index` parses SOP files into the index together with their result JSONs,
+looked up as <results-dir>/<sop file stem>.json (the naming used by
+`sop2atomic batch`), or its latest <stem>.vN.json re-mapped version (see
+`sop2atomic remap`). Unchanged SOPs are skipped; a SOP that cannot be read or
+parsed is reported and skipped, and the others are still indexed.
+
+`query` answers one lookup and prints the matches as JSON.
+
+Usage:
+    sop2atomic index --db corpus.sqlite <sop1.docx> [...] --results-dir out/
+    sop2atomic query --db corpus.sqlite --component CLIPBOARD_PASTE
+    sop2atomic query --db corpus.sqlite --text bloomberg
+    sop2atomic query --db corpus.sqlite --card CLIENT="Test Client"
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from sop2atomic.batch.catalogue_remap import mapping_versions
+from sop2atomic.index.corpus_index import CorpusIndex
+
+DEFAULT_INDEX = ".sop2atomic/corpus.sqlite"
+
+
+def build_index_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the index command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic index",
+        description="Index SOPs and their atomic mappings for fast lookups.",
+    )
+    parser.add_argument(
+        "--db",
+        default=DEFAULT_INDEX,
+        help=f"Path to the index database (default: {DEFAULT_INDEX})",
+    )
+    parser.add_argument("sop_files", nargs="+", help="Paths to SOP .docx files")
+    parser.add_argument(
+        "--results-dir",
+        help="Directory holding the result JSON of each SOP (<stem>[.vN].json)",
+    )
+    return parser
+
+
+def build_query_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the query command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic query",
+        description="Look up SOPs and steps in a corpus index.",
+    )
+    parser.add_argument(
+        "--db",
+        default=DEFAULT_INDEX,
+        help=f"Path to the index database (default: {DEFAULT_INDEX})",
+    )
+    lookup = parser.add_mutually_exclusive_group(required=True)
+    lookup.add_argument(
+        "--component",
+        help="Steps mapped to this component (name or id)",
+    )
+    lookup.add_argument("--text", help="Steps whose action or notes mention text")
+    lookup.add_argument(
+        "--card",
+        metavar="FIELD=TEXT",
+        help="SOPs whose SOP card FIELD contains TEXT",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=100,
+        help="Maximum number of --text matches (default: 100)",
+    )
+    return parser
+
+
+def index_main(argv: Optional[List[str]] = None) -> None:
+    """Index CLI workflow."""
+    args = build_index_parser().parse_args(argv)
+
+    index = CorpusIndex(args.db)
+    indexed = unchanged = failed = 0
+    try:
+        for sop_file in args.sop_files:
+            mapping_file = None
+            if args.results_dir:
+                versions = mapping_versions(args.results_dir, Path(sop_file).stem)
+                if versions:
+                    mapping_file = versions[-1][1]
+            try:
+                changed = index.index_file(sop_file, mapping_file)
+            except Exception as exc:  # unreadable SOP or malformed result JSON
+                print(
+                    f"Skipping {sop_file}: {type(exc).__name__}: {exc}",
+                    file=sys.stderr,
+                )
+                failed += 1
+                continue
+            if changed:
+                indexed += 1
+            else:
+                unchanged += 1
+        stats = index.stats()
+    finally:
+        index.close()
+
+    print(
+        f"Indexed {indexed} SOP(s), {unchanged} unchanged, {failed} failed. "
+        "Index: " + json.dumps(stats),
+        file=sys.stderr,
+    )
+
+
+def query_main(argv: Optional[List[str]] = None) -> None:
+    """Query CLI workflow."""
+    parser = build_query_parser()
+    args = parser.parse_args(argv)
+
+    if args.text is not None and not args.text.split():
+        parser.error("--text needs at least one word")
+    if args.card is not None:
+        field, _, text = args.card.partition("=")
+        if not field.strip() or not text.split():
+            parser.error("--card expects FIELD=TEXT with a non-empty TEXT")
+
+    index = CorpusIndex(args.db)
+    try:
+        started = time.perf_counter()
+        if args.component is not None:
+            matches = index.steps_using_component(args.component)
+        elif args.text is not None:
+            matches = index.search_steps(args.text, limit=args.limit)
+        else:
+            matches = index.sops_by_card(field, text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        index.close()
+
+    print(f"{len(matches)} match(es) in {elapsed_ms:.1f} ms", file=sys.stderr)
+    print(json.dumps(matches, indent=2))
@@ -11,13 +11,38 @@ transformation pipeline. It wires together:
 
 Usage:
     python -m sop2atomic.cli.main <sop_file.docx> <atomic_catalogue.xlsx>
+    python -m sop2atomic.cli.main <command> ...
+
+Commands:
+    batch    convert many SOPs in one run (see cli.batch_cli)
+    analyze  execution DAG / critical path of a result (see cli.analyze_cli)
+    enqueue  add conversion jobs to a shared queue (see cli.queue_cli)
+    worker   process jobs from a shared queue (see cli.queue_cli)
+    index    index SOPs and their mappings for fast lookups (see cli.index_cli)
+    query    look up SOPs and steps in a corpus index (see cli.index_cli)
+    remap    re-map steps affected by a catalogue change (see cli.remap_cli)
 """
 
 import argparse
 import json
+import sys
+from typing import List, Optional
+
+from sop2atomic.cli import analyze_cli, batch_cli, index_cli, queue_cli, remap_cli
+from sop2atomic.cli.scheduler_options import (
+    add_scheduler_arguments,
+    configure_scheduler,
+)
 from sop2atomic.parser.sop_parser import parse_sop_document
 from sop2atomic.catalogue.atomic_catalogue_loader import load_atomic_catalogue
-from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+from sop2atomic.llm.hedging import HedgingPolicy
+from sop2atomic.llm.request_scheduler import PRIORITY_CLASSES
+from sop2atomic.llm.response_interpreter import check_compact_catalogue
+from sop2atomic.transformers.cascade_transformer import CascadeTransformer
+from sop2atomic.transformers.sop_to_atomic_transformer import (
+    SopToAtomicTransformer,
+    wait_for_late_responses,
+)
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -38,19 +63,182 @@ def build_parser() -> argparse.ArgumentParser:
         "--output",
         help="Optional output file (default: print to stdout)",
     )
+    parser.add_argument(
+        "--output-format",
+        choices=["full", "compact"],
+        default="full",
+        help=(
+            "Output contract requested from the model. 'compact' generates far "
+            "fewer tokens; the result JSON is identical (default: full)"
+        ),
+    )
+    parser.add_argument(
+        "--structured-output",
+        action="store_true",
+        help=(
+            "Constrain the model with a strict JSON schema generated from the "
+            "catalogue (full output format only)"
+        ),
+    )
+    parser.add_argument(
+        "--priority",
+        choices=list(PRIORITY_CLASSES),
+        default="interactive",
+        help="LLM request scheduler priority class (default: interactive)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Time budget for the conversion; steps not mapped by the LLM in "
+            "time get a local fallback and each step is marked with its "
+            "provenance"
+        ),
+    )
+    parser.add_argument(
+        "--late-cache-dir",
+        metavar="DIR",
+        help=(
+            "With --deadline: store LLM responses that arrive after the "
+            "deadline in DIR, so a later run of the same SOP can use them"
+        ),
+    )
+    parser.add_argument(
+        "--late-wait",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help=(
+            "With --deadline: after writing the output, wait up to SECONDS "
+            "for late LLM responses to reach the cache (default: 0, exit "
+            "right away)"
+        ),
+    )
+    parser.add_argument(
+        "--cascade-small-model",
+        help=(
+            "Enable the model cascade: map with this small model first and "
+            "escalate only uncertain steps to --model"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-after-s",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Enable hedged requests: send a duplicate LLM request when the "
+            "original has not completed after SECONDS"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        metavar="P",
+        help=(
+            "With --hedge-after-s: once 20 latencies have been observed, hedge "
+            "at their P-th percentile instead (default: 95)"
+        ),
+    )
+    parser.add_argument(
+        "--max-hedge-fraction",
+        type=float,
+        default=1.0,
+        help=(
+            "Upper bound on hedged / all LLM requests (default: 1.0, as a "
+            "single conversion sends only a few requests)"
+        ),
+    )
+    add_scheduler_arguments(parser)
     return parser
 
 
-def main() -> None:
+# Sub-commands dispatched on the first argument; anything else is treated as
+# the original single-SOP invocation.
+COMMANDS = {
+    "batch": batch_cli.main,
+    "analyze": analyze_cli.main,
+    "enqueue": queue_cli.enqueue_main,
+    "worker": queue_cli.worker_main,
+    "index": index_cli.index_main,
+    "query": index_cli.query_main,
+    "remap": remap_cli.main,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Main CLI workflow."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+        return
+
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.structured_output and args.output_format != "full":
+        parser.error("--structured-output requires --output-format full")
+    if args.cascade_small_model and args.deadline is not None:
+        parser.error("--deadline cannot be combined with --cascade-small-model")
+    hedging = None
+    if args.hedge_percentile is not None and args.hedge_after_s is None:
+        # One conversion sends far fewer requests than the latency window
+        # needs (min_samples), so a percentile alone would never hedge
+        parser.error("--hedge-percentile requires --hedge-after-s")
+    if args.hedge_after_s is not None:
+        if args.hedge_after_s < 0:
+            parser.error("--hedge-after-s must not be negative")
+        if args.hedge_percentile is not None and not 0 < args.hedge_percentile <= 100:
+            parser.error("--hedge-percentile must be in (0, 100]")
+        if not 0 <= args.max_hedge_fraction <= 1:
+            parser.error("--max-hedge-fraction must be in [0, 1]")
+        hedging = HedgingPolicy(
+            percentile=args.hedge_percentile or 95.0,
+            max_hedge_fraction=args.max_hedge_fraction,
+            hedge_after_s=args.hedge_after_s,
+        )
+    configure_scheduler(parser, args)
 
     sop_data = parse_sop_document(args.sop_file)
     catalogue = load_atomic_catalogue(args.catalogue_file)
+    if args.output_format == "compact":
+        try:
+            check_compact_catalogue(catalogue)
+        except ValueError as exc:
+            parser.error(str(exc))
 
-    transformer = SopToAtomicTransformer(model=args.model)
-    result_json = transformer.transform(sop_data, catalogue)
+    if args.cascade_small_model:
+        cascade = CascadeTransformer(
+            small_model=args.cascade_small_model,
+            large_model=args.model,
+            output_format=args.output_format,
+            structured_output=args.structured_output,
+            priority=args.priority,
+            tenant=args.tenant,
+            hedging=hedging,
+        )
+        result_json = cascade.transform(sop_data, catalogue)
+        print(
+            "Cascade report: " + json.dumps(cascade.last_report, indent=2),
+            file=sys.stderr,
+        )
+        tiers = {"small": cascade.small, "large": cascade.large}
+        hedging_stats = {name: t.hedging_stats() for name, t in tiers.items()}
+    else:
+        transformer = SopToAtomicTransformer(
+            model=args.model,
+            output_format=args.output_format,
+            structured_output=args.structured_output,
+            priority=args.priority,
+            tenant=args.tenant,
+            late_cache_dir=args.late_cache_dir,
+            hedging=hedging,
+        )
+        result_json = transformer.transform(sop_data, catalogue, deadline=args.deadline)
+        hedging_stats = transformer.hedging_stats()
+
+    if hedging is not None:
+        print("LLM hedging: " + json.dumps(hedging_stats), file=sys.stderr)
 
     if args.output:
         with open(args.output, "w", encoding="utf-8") as f:
@@ -59,6 +247,9 @@ def main() -> None:
     else:
         print(json.dumps(result_json, indent=2))
 
+    if args.deadline is not None and args.late_wait > 0:
+        wait_for_late_responses(args.late_wait)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+"""
+`sop2atomic enqueue` / `sop2atomic worker`: multi-host conversions through a
+shared SQLite job queue (see sop2atomic.batch.job_queue).
+
+Usage:
+    sop2atomic enqueue --queue /shared/queue.sqlite \
+        <atomic_catalogue.xlsx> <sop1.docx> [...] --output-dir /shared/out
+    sop2atomic worker --queue /shared/queue.sqlite      # on each host
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from sop2atomic.batch.job_queue import JobQueue
+from sop2atomic.batch.queue_worker import run_worker
+from sop2atomic.cli.scheduler_options import (
+    add_scheduler_arguments,
+    configure_scheduler,
+)
+from sop2atomic.llm.request_scheduler import get_default_scheduler
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+from sop2atomic.utils.file_utils import sha256_file, stem_collisions
+
+
+def build_enqueue_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the enqueue command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic enqueue",
+        description="Add SOP conversion jobs to a shared job queue.",
+    )
+    parser.add_argument("--queue", required=True, help="Path to the queue file")
+    parser.add_argument(
+        "catalogue_file", help="Path to the Atomic Components Catalogue (.xlsx)"
+    )
+    parser.add_argument("sop_files", nargs="+", help="Paths to SOP .docx files")
+    parser.add_argument(
+        "--output-dir", required=True, help="Directory for the per-SOP JSON files"
+    )
+    parser.add_argument(
+        "--model",
+        default="gpt-5.1",
+        help="OpenAI model to use (default: gpt-5.1)",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["full", "compact"],
+        default="full",
+        help="Output contract requested from the model (default: full)",
+    )
+    return parser
+
+
+def build_worker_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the worker command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic worker",
+        description="Process SOP conversion jobs from a shared job queue.",
+    )
+    parser.add_argument("--queue", required=True, help="Path to the queue file")
+    parser.add_argument("--worker-id", help="Worker name (default: host-pid-random)")
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300.0,
+        help="Visibility timeout of a leased job (default: 300)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Attempts per job before it is marked failed (default: 3)",
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep polling for new jobs instead of exiting when the queue is empty",
+    )
+    add_scheduler_arguments(parser)
+    return parser
+
+
+def enqueue_main(argv: Optional[List[str]] = None) -> None:
+    """Enqueue CLI workflow."""
+    parser = build_enqueue_parser()
+    args = parser.parse_args(argv)
+
+    collisions = stem_collisions(args.sop_files)
+    if collisions:
+        parser.error(
+            "SOP files with the same name would write the same output: "
+            + "; ".join(", ".join(group) for group in collisions.values())
+        )
+
+    catalogue_file = os.path.abspath(args.catalogue_file)
+    catalogue_hash = sha256_file(catalogue_file)
+    params = {"model": args.model, "output_format": args.output_format}
+
+    queue = JobQueue(args.queue)
+    try:
+        for sop_file in args.sop_files:
+            sop_file = os.path.abspath(sop_file)
+            input_hash = hashlib.sha256(
+                (
+                    sha256_file(sop_file)
+                    + catalogue_hash
+                    + json.dumps(params, sort_keys=True)
+                ).encode("utf-8")
+            ).hexdigest()
+            output_path = os.path.join(
+                os.path.abspath(args.output_dir), f"{Path(sop_file).stem}.json"
+            )
+            try:
+                queue.enqueue(sop_file, catalogue_file, output_path, params, input_hash)
+            except ValueError as exc:
+                parser.error(str(exc))
+        stats = queue.stats()
+    finally:
+        queue.close()
+
+    print("Queue: " + json.dumps(stats), file=sys.stderr)
+
+
+def worker_main(argv: Optional[List[str]] = None) -> None:
+    """Worker CLI workflow."""
+    parser = build_worker_parser()
+    args = parser.parse_args(argv)
+    configure_scheduler(parser, args)
+
+    queue = JobQueue(args.queue, max_attempts=args.max_attempts)
+    try:
+        report = run_worker(
+            queue,
+            lambda params: SopToAtomicTransformer(
+                model=params["model"],
+                output_format=params["output_format"],
+                priority="bulk",
+                tenant=args.tenant,
+            ),
+            worker_id=args.worker_id,
+            lease_seconds=args.lease_seconds,
+            exit_when_empty=not args.wait,
+        )
+    finally:
+        queue.close()
+
+    print("Worker report: " + json.dumps(report), file=sys.stderr)
+    print(
+        "LLM scheduler: " + json.dumps(get_default_scheduler().stats()),
+        file=sys.stderr,
+    )
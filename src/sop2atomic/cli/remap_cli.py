@@ -0,0 +1,97 @@
+"""
+`sop2atomic remap`: re-map only the steps affected by a catalogue change.
+
+Diffs two catalogue versions, finds the stored mapped steps they affect
+(see sop2atomic.catalogue.catalogue_diff) and re-transforms those steps
+only. Updated results are written as new mapping versions
+(<stem>.v2.json, <stem>.v3.json, ...) next to the stored ones (see
+sop2atomic.batch.catalogue_remap).
+
+Usage:
+    sop2atomic remap <old_catalogue.xlsx> <new_catalogue.xlsx> \
+        <sop1.docx> [...] --results-dir out/
+    sop2atomic remap <old.xlsx> <new.xlsx> <sop1.docx> --results-dir out/ --dry-run
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from sop2atomic.batch.catalogue_remap import run_catalogue_remap
+from sop2atomic.cli.scheduler_options import (
+    add_scheduler_arguments,
+    configure_scheduler,
+)
+from sop2atomic.catalogue.atomic_catalogue_loader import load_atomic_catalogue
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create and return the argument parser for the remap command."""
+    parser = argparse.ArgumentParser(
+        prog="sop2atomic remap",
+        description="Re-map the steps affected by a catalogue change.",
+    )
+    parser.add_argument("old_catalogue", help="Catalogue the results were made with")
+    parser.add_argument("new_catalogue", help="New catalogue version")
+    parser.add_argument("sop_files", nargs="+", help="Paths to SOP .docx files")
+    parser.add_argument(
+        "--results-dir",
+        required=True,
+        help="Directory holding the stored result JSON of each SOP",
+    )
+    parser.add_argument(
+        "--model",
+        default="gpt-5.1",
+        help="OpenAI model to use (default: gpt-5.1)",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["full", "compact"],
+        default="full",
+        help="Output contract requested from the model (default: full)",
+    )
+    parser.add_argument(
+        "--min-score",
+        type=float,
+        default=0.35,
+        help=(
+            "Lexical score above which a step counts as close to a new "
+            "component (default: 0.35)"
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report the catalogue diff and the affected steps",
+    )
+    add_scheduler_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Remap CLI workflow."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configure_scheduler(parser, args)
+
+    old_catalogue = load_atomic_catalogue(args.old_catalogue)
+    new_catalogue = load_atomic_catalogue(args.new_catalogue)
+
+    report = run_catalogue_remap(
+        args.sop_files,
+        args.results_dir,
+        old_catalogue,
+        new_catalogue,
+        lambda: SopToAtomicTransformer(
+            model=args.model,
+            output_format=args.output_format,
+            priority="bulk",
+            tenant=args.tenant,
+        ),
+        min_score=args.min_score,
+        dry_run=args.dry_run,
+    )
+
+    print("Remap report: " + json.dumps(report, indent=2), file=sys.stderr)
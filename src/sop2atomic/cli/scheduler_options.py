@@ -0,0 +1,118 @@
+"""
+LLM request scheduler options shared by the CLI commands.
+
+Every command that calls the LLM accepts the same options to configure the
+process-wide RequestScheduler (see sop2atomic.llm.request_scheduler):
+  --max-concurrency N          LLM requests in flight at once
+  --priority-weight CLASS=W    weight of a priority class (repeatable)
+  --tenant NAME                caller name the requests are accounted to
+  --tenant-quota NAME=N        in-flight cap of a tenant (repeatable)
+  --scheduler-db PATH          SQLite slot table shared with other processes
+                               (default: $SOP2ATOMIC_SCHEDULER_DB)
+
+Point the interactive CLI, batch runs and workers at the same
+--scheduler-db to share one rate limit between them; an interactive
+conversion then overtakes the bulk requests of the other processes.
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional
+
+from sop2atomic.llm.request_scheduler import (
+    PRIORITY_CLASSES,
+    RequestScheduler,
+    configure_default_scheduler,
+)
+from sop2atomic.llm.shared_slots import SharedSlotTable
+
+SCHEDULER_DB_ENV = "SOP2ATOMIC_SCHEDULER_DB"
+
+
+def add_scheduler_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the scheduler options to parser."""
+    group = parser.add_argument_group("LLM request scheduling")
+    group.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        metavar="N",
+        help="LLM requests in flight at once (default: 8)",
+    )
+    group.add_argument(
+        "--priority-weight",
+        action="append",
+        default=[],
+        metavar="CLASS=W",
+        help=(
+            "Relative share of a priority class, e.g. bulk=2 (repeatable; "
+            "default: interactive=16, normal=4, bulk=1)"
+        ),
+    )
+    group.add_argument("--tenant", help="Caller name the LLM requests count against")
+    group.add_argument(
+        "--tenant-quota",
+        action="append",
+        default=[],
+        metavar="NAME=N",
+        help="Maximum LLM requests a tenant may have in flight (repeatable)",
+    )
+    group.add_argument(
+        "--scheduler-db",
+        default=os.environ.get(SCHEDULER_DB_ENV),
+        metavar="PATH",
+        help=(
+            "SQLite file shared with other sop2atomic processes, so that all "
+            "of them respect --max-concurrency and priorities together "
+            f"(default: ${SCHEDULER_DB_ENV})"
+        ),
+    )
+
+
+def _parse_pairs(
+    parser: argparse.ArgumentParser, option: str, values: List[str], kind: type
+) -> Dict[str, float]:
+    pairs = {}
+    for value in values:
+        name, sep, number = value.partition("=")
+        try:
+            if not sep or not name:
+                raise ValueError(value)
+            pairs[name] = kind(number)
+        except ValueError:
+            parser.error(f"{option} expects NAME=VALUE, got {value!r}")
+    return pairs
+
+
+def configure_scheduler(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> RequestScheduler:
+    """
+    Replace the process-wide scheduler according to the parsed options.
+
+    Invalid values are reported through parser.error().
+    """
+    weights = _parse_pairs(parser, "--priority-weight", args.priority_weight, float)
+    unknown = set(weights) - set(PRIORITY_CLASSES)
+    if unknown:
+        parser.error(
+            f"--priority-weight: unknown class {sorted(unknown)[0]!r}; expected "
+            f"one of {PRIORITY_CLASSES}"
+        )
+    if any(weight <= 0 for weight in weights.values()):
+        parser.error("--priority-weight: weights must be positive")
+    quotas = _parse_pairs(parser, "--tenant-quota", args.tenant_quota, int)
+    if args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
+
+    shared_slots: Optional[SharedSlotTable] = None
+    if args.scheduler_db:
+        shared_slots = SharedSlotTable(
+            args.scheduler_db, max_concurrency=args.max_concurrency
+        )
+    return configure_default_scheduler(
+        max_concurrency=args.max_concurrency,
+        weights=weights,
+        tenant_quotas=quotas,
+        shared_slots=shared_slots,
+    )
@@ -0,0 +1,332 @@
+"""
+Searchable index of a SOP corpus and its atomic mappings (SQLite + FTS5).
+
+Answers corpus-wide questions without re-parsing .docx files or reloading
+result JSONs:
+  - which steps use a given atomic component (reverse component -> steps
+    index over the mapped atomic actions)
+  - which steps mention some text (FTS5 over step action and notes)
+  - which SOPs have a SOP card field matching some text (e.g. CLIENT)
+
+Each SOP is keyed by its .docx path and stored with a content hash of the
+SOP file and of its result JSON (if any). Re-indexing skips SOPs whose
+hash is unchanged, so only new or modified SOPs are parsed again.
+
+Tables:
+    sops(sop_key, sop_id, content_hash, mapping_path, indexed_at)
+    card(sop_key, field, value)             + card_fts(value)
+    steps(sop_key, step_number, action, notes)  + steps_fts(action, notes)
+    actions(sop_key, step_number, position, component_id, component_name,
+            category, parameters)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from sop2atomic.parser.sop_parser import parse_sop_document
+from sop2atomic.utils.file_utils import sha256_file
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sops (
+    sop_key      TEXT PRIMARY KEY,
+    sop_id       TEXT,
+    content_hash TEXT NOT NULL,
+    mapping_path TEXT,
+    indexed_at   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS card (
+    id      INTEGER PRIMARY KEY,
+    sop_key TEXT NOT NULL,
+    field   TEXT NOT NULL,
+    value   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS card_sop ON card (sop_key);
+CREATE INDEX IF NOT EXISTS card_field ON card (field COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS card_fts USING fts5(value);
+CREATE TABLE IF NOT EXISTS steps (
+    id          INTEGER PRIMARY KEY,
+    sop_key     TEXT NOT NULL,
+    step_number TEXT NOT NULL,
+    action      TEXT NOT NULL,
+    notes       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_sop ON steps (sop_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS steps_fts USING fts5(action, notes);
+CREATE TABLE IF NOT EXISTS actions (
+    sop_key        TEXT NOT NULL,
+    step_number    TEXT NOT NULL,
+    position       INTEGER NOT NULL,
+    component_id   TEXT,
+    component_name TEXT,
+    category       TEXT,
+    parameters     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_sop ON actions (sop_key);
+CREATE INDEX IF NOT EXISTS actions_name ON actions (component_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS actions_id ON actions (component_id);
+"""
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all of its words."""
+    terms = [t for t in text.split() if t]
+    if not terms:
+        raise ValueError("Empty search text")
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+class CorpusIndex:
+    """SQLite/FTS5 index of parsed SOPs and their mapped atomic actions."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def content_hash(self, sop_key: str) -> Optional[str]:
+        """Return the content hash a SOP was indexed with, or None."""
+        row = self.conn.execute(
+            "SELECT content_hash FROM sops WHERE sop_key = ?", (sop_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def index_file(self, sop_file: str, mapping_file: Optional[str] = None) -> bool:
+        """
+        Index one SOP file and, if given and present, its result JSON.
+
+        Args:
+            sop_file: path to the SOP .docx (used as the SOP key).
+            mapping_file: optional path to the sop2atomic result for this SOP.
+
+        Returns:
+            True if the SOP was (re)indexed, False if it was unchanged.
+        """
+        if mapping_file and not os.path.exists(mapping_file):
+            mapping_file = None
+
+        digest = hashlib.sha256(sha256_file(sop_file).encode())
+        if mapping_file:
+            digest.update(sha256_file(mapping_file).encode())
+        content_hash = digest.hexdigest()
+
+        sop_key = os.path.abspath(sop_file)
+        if self.content_hash(sop_key) == content_hash:
+            return False
+
+        sop_data = parse_sop_document(sop_file)
+        mapping = None
+        if mapping_file:
+            with open(mapping_file, encoding="utf-8") as f:
+                mapping = json.load(f)
+
+        self.index_document(sop_key, content_hash, sop_data, mapping, mapping_file)
+        return True
+
+    def index_document(
+        self,
+        sop_key: str,
+        content_hash: str,
+        sop_data: Dict[str, Any],
+        mapping: Optional[Dict[str, Any]] = None,
+        mapping_path: Optional[str] = None,
+    ) -> None:
+        """
+        Replace the indexed content of one SOP.
+
+        Args:
+            sop_key: unique key of the SOP (normally its file path).
+            content_hash: hash of the inputs, used to skip unchanged SOPs.
+            sop_data: parsed SOP (see parse_sop_document()).
+            mapping: optional sop2atomic result for this SOP.
+            mapping_path: optional path the mapping was read from.
+        """
+        sop_card = sop_data.get("sop_card", {}) or {}
+        sop_id = (mapping or {}).get("sop_id") or sop_card.get("SCHRODERS_ID")
+
+        with self.conn:
+            self._delete(sop_key)
+            self.conn.execute(
+                "INSERT INTO sops (sop_key, sop_id, content_hash, mapping_path, "
+                "indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (sop_key, sop_id, content_hash, mapping_path, time.time()),
+            )
+
+            for field, value in sop_card.items():
+                cursor = self.conn.execute(
+                    "INSERT INTO card (sop_key, field, value) VALUES (?, ?, ?)",
+                    (sop_key, str(field), str(value)),
+                )
+                self.conn.execute(
+                    "INSERT INTO card_fts (rowid, value) VALUES (?, ?)",
+                    (cursor.lastrowid, str(value)),
+                )
+
+            for step in sop_data.get("steps", []):
+                action = step.get("action", "") or ""
+                notes = step.get("notes", "") or ""
+                cursor = self.conn.execute(
+                    "INSERT INTO steps (sop_key, step_number, action, notes) "
+                    "VALUES (?, ?, ?, ?)",
+                    (sop_key, str(step.get("step_number", "")), action, notes),
+                )
+                self.conn.execute(
+                    "INSERT INTO steps_fts (rowid, action, notes) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, action, notes),
+                )
+
+            rows = []
+            for step in (mapping or {}).get("steps", []):
+                step_number = str(step.get("step_number", ""))
+                for position, action in enumerate(step.get("atomic_actions", [])):
+                    rows.append(
+                        (
+                            sop_key,
+                            step_number,
+                            position,
+                            action.get("component_id"),
+                            action.get("component_name"),
+                            action.get("category"),
+                            json.dumps(action.get("parameters", {})),
+                        )
+                    )
+            self.conn.executemany(
+                "INSERT INTO actions (sop_key, step_number, position, component_id, "
+                "component_name, category, parameters) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, sop_key: str) -> None:
+        """Drop a SOP from the index."""
+        with self.conn:
+            self._delete(sop_key)
+
+    def _delete(self, sop_key: str) -> None:
+        """Delete every row of a SOP (caller holds the transaction)."""
+        self.conn.execute(
+            "DELETE FROM card_fts WHERE rowid IN "
+            "(SELECT id FROM card WHERE sop_key = ?)",
+            (sop_key,),
+        )
+        self.conn.execute(
+            "DELETE FROM steps_fts WHERE rowid IN "
+            "(SELECT id FROM steps WHERE sop_key = ?)",
+            (sop_key,),
+        )
+        for table in ("card", "steps", "actions", "sops"):
+            self.conn.execute(f"DELETE FROM {table} WHERE sop_key = ?", (sop_key,))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def steps_using_component(self, component: str) -> List[Dict[str, Any]]:
+        """
+        Return the steps whose mapping uses a component.
+
+        Args:
+            component: component name (case-insensitive) or component id.
+        """
+        rows = self.conn.execute(
+            "SELECT s.sop_id, a.sop_key, a.step_number, a.position, "
+            "a.component_id, a.component_name, a.parameters "
+            "FROM actions a JOIN sops s ON s.sop_key = a.sop_key "
+            "WHERE a.component_name = ? COLLATE NOCASE "
+            "UNION "
+            "SELECT s.sop_id, a.sop_key, a.step_number, a.position, "
+            "a.component_id, a.component_name, a.parameters "
+            "FROM actions a JOIN sops s ON s.sop_key = a.sop_key "
+            "WHERE a.component_id = ? "
+            "ORDER BY 2, 3, 4",
+            (component, component),
+        ).fetchall()
+        return [
+            {
+                "sop_id": sop_id,
+                "sop_key": sop_key,
+                "step_number": step_number,
+                "position": position,
+                "component_id": component_id,
+                "component_name": component_name,
+                "parameters": json.loads(parameters),
+            }
+            for (
+                sop_id,
+                sop_key,
+                step_number,
+                position,
+                component_id,
+                component_name,
+                parameters,
+            ) in rows
+        ]
+
+    def search_steps(self, text: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Return the steps whose action or notes contain all words of text.
+
+        Raises:
+            ValueError: if text has no words.
+        """
+        rows = self.conn.execute(
+            "SELECT s.sop_id, st.sop_key, st.step_number, st.action, st.notes "
+            "FROM steps_fts f JOIN steps st ON st.id = f.rowid "
+            "JOIN sops s ON s.sop_key = st.sop_key "
+            "WHERE steps_fts MATCH ? ORDER BY f.rank LIMIT ?",
+            (_fts_query(text), limit),
+        ).fetchall()
+        return [
+            {
+                "sop_id": sop_id,
+                "sop_key": sop_key,
+                "step_number": step_number,
+                "action": action,
+                "notes": notes,
+            }
+            for sop_id, sop_key, step_number, action, notes in rows
+        ]
+
+    def sops_by_card(self, field: str, text: str) -> List[Dict[str, Any]]:
+        """
+        Return the SOPs whose SOP card field contains all words of text.
+
+        Args:
+            field: SOP card field name, e.g. "CLIENT" (case-insensitive).
+            text: words to look for in the field value.
+
+        Raises:
+            ValueError: if text has no words.
+        """
+        rows = self.conn.execute(
+            "SELECT s.sop_id, c.sop_key, c.field, c.value "
+            "FROM card_fts f JOIN card c ON c.id = f.rowid "
+            "JOIN sops s ON s.sop_key = c.sop_key "
+            "WHERE card_fts MATCH ? AND c.field = ? COLLATE NOCASE "
+            "ORDER BY c.sop_key",
+            (_fts_query(text), field),
+        ).fetchall()
+        return [
+            {"sop_id": sop_id, "sop_key": sop_key, "field": f, "value": value}
+            for sop_id, sop_key, f, value in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Count indexed SOPs, steps and mapped actions."""
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sops", "steps", "actions")
+        }
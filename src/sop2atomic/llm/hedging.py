@@ -0,0 +1,223 @@
+"""
+Hedged requests for LLM calls.
+
+A hedge is a duplicate request fired when the original has not completed by
+a percentile of recently observed latencies. Whichever request returns a
+valid result first wins, which trims the latency tail at the cost of a small,
+capped amount of extra traffic.
+
+Typical use (see LLMClient):
+    hedger = HedgedExecutor(HedgingPolicy(percentile=95, max_hedge_fraction=0.1))
+    text = hedger.run(lambda: send_request())
+    hedger.stats()  # hedge rate, win rate, ...
+
+Note: the synchronous OpenAI SDK cannot abort an in-flight HTTP request. The
+losing request keeps running and its result is discarded when it arrives.
+Every request therefore runs in its own daemon thread: a stalled loser never
+delays later requests or process exit. No hedge is fired while
+max_in_flight requests (losers included) are still running.
+
+Both requests can be admitted through a slot callable (e.g. a slot of the
+request scheduler): each then holds a slot of its own until its response
+arrives, so hedges and stalled losers count against the shared rate limit.
+A hedge still waiting for its slot when the original completes is dropped.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+@dataclass
+class HedgingPolicy:
+    """
+    Configuration for hedged requests.
+
+    Attributes:
+        percentile: hedge when a request is slower than this percentile of
+                    the recent latency window (0-100).
+        max_hedge_fraction: upper bound on hedged requests / all requests.
+        window: number of recent latencies kept for the percentile.
+        min_samples: the percentile is used once this many latencies have
+                     been observed.
+        hedge_after_s: fixed hedge trigger (seconds) used until then; None
+                       means no hedging before min_samples. A process that
+                       sends only a few requests (one CLI conversion) only
+                       hedges with this.
+        max_in_flight: no hedging while this many requests (including
+                       discarded losers still running) are in flight.
+    """
+
+    percentile: float = 95.0
+    max_hedge_fraction: float = 0.1
+    window: int = 200
+    min_samples: int = 20
+    hedge_after_s: Optional[float] = None
+    max_in_flight: int = 8
+
+
+class _HedgeDropped(Exception):
+    """A hedge admitted after its original request had already completed."""
+
+
+class HedgedExecutor:
+    """Run request callables with percentile-triggered hedging."""
+
+    def __init__(self, policy: HedgingPolicy):
+        if not 0 < policy.percentile <= 100:
+            raise ValueError("HedgingPolicy.percentile must be in (0, 100]")
+        if not 0 <= policy.max_hedge_fraction <= 1:
+            raise ValueError("HedgingPolicy.max_hedge_fraction must be in [0, 1]")
+        if policy.hedge_after_s is not None and policy.hedge_after_s < 0:
+            raise ValueError("HedgingPolicy.hedge_after_s must not be negative")
+
+        self.policy = policy
+        self._latencies: Deque[float] = deque(maxlen=policy.window)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return the current hedge trigger in seconds, or None if not ready."""
+        with self._lock:
+            if len(self._latencies) < self.policy.min_samples:
+                return self.policy.hedge_after_s
+            ordered = sorted(self._latencies)
+        rank = int(round(self.policy.percentile / 100 * (len(ordered) - 1)))
+        return ordered[rank]
+
+    def run(
+        self,
+        request: Callable[[], Any],
+        is_valid: Callable[[Any], bool] = lambda result: True,
+        slot: Optional[Callable[[Callable[[], Any]], Any]] = None,
+    ) -> Any:
+        """
+        Execute request, hedging it once if it runs past the trigger.
+
+        Args:
+            request: zero-argument callable performing one LLM request.
+            is_valid: predicate on a result; invalid results do not win and
+                      the other request (if any) is awaited instead.
+            slot: optional callable running each request, the original and
+                  the hedge, e.g. lambda send: scheduler.run(send), so that
+                  each holds a slot of its own until its response arrives.
+
+        Returns:
+            The first valid result.
+
+        Raises:
+            The primary request's exception if no request produced a
+            valid result.
+        """
+        delay = self.hedge_delay()
+        with self._lock:
+            self._requests += 1
+
+        def admitted(send: Callable[[], Any]) -> Callable[[], Any]:
+            return (lambda: slot(send)) if slot is not None else send
+
+        # Set as soon as a valid result exists, still inside the original's
+        # slot, so that a hedge admitted to the freed slot is not sent
+        settled = threading.Event()
+
+        def original() -> Any:
+            result = request()
+            if is_valid(result):
+                settled.set()
+            return result
+
+        submitted_at = time.perf_counter()
+        primary = self._submit(admitted(original))
+        if delay is None:
+            return self._finish(primary, submitted_at)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._reserve_hedge():
+            return self._finish(primary, submitted_at)
+
+        def duplicate() -> Any:
+            if settled.is_set():
+                # Admitted only after the original completed: not sent
+                raise _HedgeDropped
+            return request()
+
+        hedge = self._submit(admitted(duplicate))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None and is_valid(future.result()):
+                        if future is hedge:
+                            with self._lock:
+                                self._hedge_wins += 1
+                        return self._finish(future, submitted_at)
+
+            # Neither request produced a valid result: surface the primary
+            # outcome
+            return self._finish(primary, submitted_at)
+        finally:
+            settled.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return request, hedge and win counters, derived rates and the
+        requests still in flight.
+        """
+        with self._lock:
+            requests, hedges, wins = self._requests, self._hedges, self._hedge_wins
+            in_flight = self._in_flight
+        return {
+            "requests": requests,
+            "hedges": hedges,
+            "hedge_wins": wins,
+            "hedge_rate": hedges / requests if requests else 0.0,
+            "win_rate": wins / hedges if hedges else 0.0,
+            "hedge_delay_s": self.hedge_delay(),
+            "in_flight": in_flight,
+        }
+
+    def _submit(self, request: Callable[[], Any]) -> "Future[Any]":
+        """Start request in a daemon thread, returning a future of its result."""
+        future: "Future[Any]" = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            self._in_flight += 1
+
+        def run() -> None:
+            try:
+                future.set_result(request())
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+        return future
+
+    def _reserve_hedge(self) -> bool:
+        """Count a hedge if it keeps hedges within budget and in-flight cap."""
+        with self._lock:
+            if self._in_flight >= self.policy.max_in_flight:
+                return False
+            if (self._hedges + 1) / self._requests > self.policy.max_hedge_fraction:
+                return False
+            self._hedges += 1
+            return True
+
+    def _finish(self, future: "Future[Any]", submitted_at: float) -> Any:
+        """
+        Record the end-to-end latency since the primary was submitted and
+        unwrap the result (or raise).
+        """
+        result = future.result()
+        with self._lock:
+            self._latencies.append(time.perf_counter() - submitted_at)
+        return result
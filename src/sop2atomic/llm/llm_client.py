@@ -5,15 +5,32 @@ This client is used by the SopToAtomicTransformer in production. For tests,
 LLMClient is typically monkeypatched with a fake implementation.
 """
 
+import json
 import os
+from typing import Any, Callable, Dict, Optional
+
 from openai import OpenAI
+from sop2atomic.llm.hedging import HedgedExecutor, HedgingPolicy
 from sop2atomic.llm.prompt_builder import build_system_prompt
 
 
 class LLMClient:
-    """A thin wrapper around the OpenAI Responses API."""
+    """
+    A thin wrapper around the OpenAI Responses API.
+
+    Pass a HedgingPolicy to opt into hedged requests: a duplicate request is
+    fired when the original is slower than a percentile of recent latencies,
+    and the first response containing valid JSON wins. slot, if given, runs
+    every request sent, originals and hedges alike (see HedgedExecutor.run()),
+    e.g. through the request scheduler so that each takes a slot of its own.
+    """
 
-    def __init__(self, model: str = "gpt-5.1"):
+    def __init__(
+        self,
+        model: str = "gpt-5.1",
+        hedging: Optional[HedgingPolicy] = None,
+        slot: Optional[Callable[[Callable[[], str]], str]] = None,
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("Environment variable OPENAI_API_KEY is not set")
@@ -21,19 +38,59 @@ class LLMClient:
         # The OpenAI client will pick up the key from here
         self.client = OpenAI(api_key=api_key)
         self.model = model
+        self.hedger: Optional[HedgedExecutor] = (
+            HedgedExecutor(hedging) if hedging is not None else None
+        )
+        self.slot = slot
 
-    def call(self, user_prompt: str) -> str:
+    def call(
+        self,
+        user_prompt: str,
+        instructions: Optional[str] = None,
+        text_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Send a prompt to the LLM and return the raw JSON string.
 
         The actual parsing into Python objects is handled by the response
         interpreter (parse_llm_json), so this method only returns a string.
+
+        Args:
+            user_prompt: content of the 'user' role message.
+            instructions: optional system instructions; defaults to the full
+                          output contract from build_system_prompt().
+            text_format: optional structured output format (e.g. from
+                         output_schema.get_response_format()).
         """
+
+        def send() -> str:
+            return self._request(user_prompt, instructions, text_format)
+
+        if self.hedger is None:
+            return self.slot(send) if self.slot is not None else send()
+        return self.hedger.run(send, is_valid=_is_json, slot=self.slot)
+
+    def hedging_stats(self) -> Optional[Dict[str, Any]]:
+        """Return hedge rate / win rate counters, or None if hedging is off."""
+        return self.hedger.stats() if self.hedger is not None else None
+
+    def _request(
+        self,
+        user_prompt: str,
+        instructions: Optional[str],
+        text_format: Optional[Dict[str, Any]],
+    ) -> str:
+        """Perform a single Responses API request and return its text."""
+        extra: Dict[str, Any] = {}
+        if text_format is not None:
+            extra["text"] = {"format": text_format}
+
         response = self.client.responses.create(
             model=self.model,
-            instructions=build_system_prompt(),
+            instructions=instructions or build_system_prompt(),
             input=[{"role": "user", "content": user_prompt}],
             temperature=0.1,
+            **extra,
         )
 
         # Depending on the exact SDK version, the path to the content may differ.
@@ -45,3 +102,12 @@ class LLMClient:
         # If you ever see an AttributeError here, you can print(response)
         # once locally and adjust this field access accordingly.
         return response.output[0].content[0].text  # type: ignore[union-attr]
+
+
+def _is_json(text: str) -> bool:
+    """Return True if text parses as JSON (used to pick a hedging winner)."""
+    try:
+        json.loads(text)
+    except (TypeError, ValueError):
+        return False
+    return True
@@ -0,0 +1,126 @@
+"""
+Strict JSON schema for the LLM output, generated from the loaded catalogue.
+
+Used with the Responses API structured outputs, so the model can only emit
+JSON in the result schema of build_system_prompt() and can only reference
+real catalogue entries:
+  - each atomic action is one of the catalogue components (component_id,
+    component_name and category fixed to that entry's values, parameters
+    limited to its declared parameter names), or MISSING_COMPONENT
+  - every object is closed (additionalProperties: false), as strict mode
+    requires
+
+Schemas are cached per catalogue fingerprint, so repeated calls with the
+same catalogue cost one hash computation.
+"""
+
+from typing import Any, Dict, List
+
+from sop2atomic.catalogue.atomic_catalogue_loader import catalogue_fingerprint
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+
+SCHEMA_NAME = "sop_atomic_mapping"
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+_SCHEMA_CACHE: Dict[str, Dict[str, Any]] = {}
+_SCHEMA_CACHE_SIZE = 16
+
+
+def _closed_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Object schema with every property required and nothing else allowed."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _component_action_schema(component: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema of an atomic action using exactly this catalogue component."""
+    parameters = [str(p) for p in component.get("parameters", []) or []]
+    return _closed_object(
+        {
+            "component_id": {"type": "string", "enum": [str(component["id"])]},
+            "component_name": {
+                "type": "string",
+                "enum": [str(component.get("id_name", ""))],
+            },
+            "category": {
+                "type": "string",
+                "enum": [str(component.get("category", ""))],
+            },
+            "parameters": _closed_object(
+                {name: dict(_NULLABLE_STRING) for name in dict.fromkeys(parameters)}
+            ),
+        }
+    )
+
+
+def _missing_action_schema() -> Dict[str, Any]:
+    """Schema of a MISSING_COMPONENT action."""
+    return _closed_object(
+        {
+            "component_id": {"type": "null"},
+            "component_name": {"type": "string", "enum": [MISSING_COMPONENT]},
+            "category": {"type": "null"},
+            "parameters": _closed_object({"description": {"type": "string"}}),
+        }
+    )
+
+
+def build_output_schema(catalogue: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the strict JSON schema of a mapping result for this catalogue.
+
+    There is one branch per (id, id_name): components sharing an id (e.g.
+    "4.1" for OPEN_EMAIL_TEMPLATE and COPY_EMAIL_FOOTER) each keep their own
+    branch, told apart by the component_name enum. Exact duplicates are
+    collapsed.
+    """
+    seen = set()
+    branches = []
+    for component in catalogue:
+        key = (str(component.get("id", "")), str(component.get("id_name", "")))
+        if not key[0] or key in seen:
+            continue
+        seen.add(key)
+        branches.append(_component_action_schema(component))
+    branches.append(_missing_action_schema())
+
+    step = _closed_object(
+        {
+            "step_number": {"type": "string"},
+            "original_action": {"type": "string"},
+            "notes": {"type": "string"},
+            "atomic_actions": {"type": "array", "items": {"anyOf": branches}},
+        }
+    )
+    return _closed_object(
+        {
+            "sop_id": dict(_NULLABLE_STRING),
+            "steps": {"type": "array", "items": step},
+        }
+    )
+
+
+def get_response_format(catalogue: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return the Responses API `text.format` payload for this catalogue.
+
+    The underlying schema is cached per catalogue fingerprint.
+    """
+    fingerprint = catalogue_fingerprint(catalogue)
+    schema = _SCHEMA_CACHE.get(fingerprint)
+    if schema is None:
+        if len(_SCHEMA_CACHE) >= _SCHEMA_CACHE_SIZE:
+            _SCHEMA_CACHE.pop(next(iter(_SCHEMA_CACHE)))
+        schema = build_output_schema(catalogue)
+        _SCHEMA_CACHE[fingerprint] = schema
+
+    return {
+        "type": "json_schema",
+        "name": SCHEMA_NAME,
+        "schema": schema,
+        "strict": True,
+    }
@@ -7,15 +7,18 @@ This module constructs:
 based on SOP data + atomic catalogue.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
+# Rough characters-per-token ratio used to estimate prompt sizes
+CHARS_PER_TOKEN = 4
 
-def build_system_prompt() -> str:
+
+def _build_task_instructions() -> str:
     """
-    Return the system instructions for the LLM.
+    Return the behavioural part of the system prompt (task, rules, examples).
 
-    This prompt is intentionally strict and explicit.
-    It defines the behavioural contract and the exact JSON output format.
+    Shared by every output contract so the mapping rules stay identical
+    whichever JSON format the model is asked to produce.
     """
     return (
         "You are an expert Financial Business Analyst specialised in SOP "
@@ -64,6 +67,17 @@ def build_system_prompt() -> str:
         'SOP step: "Copy the holdings table from Excel and paste it into the email."\n'
         "Correct: You MAY use CLIPBOARD_COPY and CLIPBOARD_PASTE because "
         "the SOP explicitly describes these actions.\n\n"
+    )
+
+
+def build_system_prompt() -> str:
+    """
+    Return the system instructions for the LLM.
+
+    This prompt is intentionally strict and explicit.
+    It defines the behavioural contract and the exact JSON output format.
+    """
+    return _build_task_instructions() + (
         "============================\n"
         "REQUIRED OUTPUT FORMAT\n"
         "============================\n"
@@ -94,6 +108,67 @@ def build_system_prompt() -> str:
     )
 
 
+def build_compact_system_prompt() -> str:
+    """
+    Return the system instructions for the compact output contract.
+
+    The model emits only step numbers, catalogue IDs and parameter values.
+    Everything else (original wording, notes, component names, categories)
+    is known locally and restored by expand_compact_result().
+    """
+    return _build_task_instructions() + (
+        "============================\n"
+        "REQUIRED OUTPUT FORMAT (COMPACT)\n"
+        "============================\n"
+        "You MUST output ONLY a valid JSON object with the following schema and "
+        "nothing else:\n"
+        "{\n"
+        '  "steps": [\n'
+        '    {"n": string, "a": [[component_id, value_1, value_2, ...], ...]}\n'
+        "  ]\n"
+        "}\n\n"
+        "Where:\n"
+        '- "n" is the SOP step number exactly as given.\n'
+        '- "a" is the list of atomic actions for that step, in order.\n'
+        "- Each atomic action is an array whose first element is the catalogue "
+        "component id, followed by the parameter VALUES in the same order as the "
+        "component's params list in the catalogue. Use null for values that "
+        "cannot be inferred. Omit trailing nulls.\n"
+        '- If no component fits, use [null, "<short description of what is '
+        'missing>"].\n\n'
+        "IMPORTANT:\n"
+        "- Do NOT repeat the step wording, notes, component names or categories.\n"
+        "- Do NOT output explanations, comments, reasoning or text outside "
+        "the JSON object.\n"
+        "- Do NOT format the JSON with trailing commas or comments.\n"
+    )
+
+
+def build_packed_system_prompt(base_prompt: str) -> str:
+    """
+    Extend a single-SOP system prompt for requests packing several SOPs.
+
+    Args:
+        base_prompt: build_system_prompt() or build_compact_system_prompt();
+                     its JSON object becomes the per-SOP entry of the output.
+    """
+    return base_prompt + (
+        "\n============================\n"
+        "SEVERAL SOPS IN ONE REQUEST\n"
+        "============================\n"
+        "This request contains several independent SOPs. Each one starts with "
+        "a line '=== BEGIN SOP <sop_id> ===' and ends with "
+        "'=== END SOP <sop_id> ==='. All SOPs share the catalogue given once "
+        "at the end.\n"
+        "Map every SOP separately, following all the rules above. Never mix "
+        "steps of different SOPs.\n"
+        "Instead of a single object, output ONLY:\n"
+        '{"sops": [{"sop_id": "<sop_id exactly as in its BEGIN line>", ...the '
+        "keys of the JSON object described above for that SOP...}, ...]}\n"
+        "with exactly one entry per SOP, in the order given.\n"
+    )
+
+
 def _format_sop_section(sop: Dict[str, Any]) -> str:
     """Format SOP card + steps as text for the user prompt."""
     sop_card = sop.get("sop_card", {})
@@ -137,6 +212,24 @@ def _format_catalogue_section(catalogue: List[Dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
+def build_packed_user_prompt(
+    sops: List[Tuple[str, Dict[str, Any]]], catalogue: List[Dict[str, Any]]
+) -> str:
+    """
+    Return the user message for a packed request: several SOPs, each
+    delimited by its sop_id, followed by the catalogue once.
+
+    Args:
+        sops: (sop_id, parsed SOP) pairs; sop_ids must be unique.
+    """
+    sections = [
+        f"=== BEGIN SOP {sop_id} ===\n{_format_sop_section(sop)}\n"
+        f"=== END SOP {sop_id} ==="
+        for sop_id, sop in sops
+    ]
+    return "\n\n".join(sections) + "\n\n" + _format_catalogue_section(catalogue)
+
+
 def build_user_prompt(sop: Dict[str, Any], catalogue: List[Dict[str, Any]]) -> str:
     """
     Return the user message containing SOP steps + atomic catalogue.
@@ -0,0 +1,257 @@
+"""
+Priority-aware scheduling of LLM requests.
+
+All LLM requests of a process share one rate limit, so a long bulk run
+(batch, worker, remap) can make a single interactive conversion wait
+behind hundreds of queued requests. The scheduler admits at most
+max_concurrency requests at a time and decides which waiting request goes
+next:
+  - priority classes "interactive", "normal" and "bulk", served by weighted
+    fair queuing: each class gets a share of the slots proportional to its
+    weight, so an interactive request is admitted ahead of a bulk backlog
+    while bulk still progresses
+  - optional per-tenant quotas capping the requests a tenant (a caller
+    name) may have in flight at once
+  - per-class queue depth, in-flight count and wait times, see stats()
+
+Requests run in the caller's thread; run() blocks until a slot is granted.
+Requests already in flight are never interrupted.
+
+A scheduler only sees the requests of its own process. To share the rate
+limit between processes (an interactive CLI next to a batch run or
+workers), give every scheduler the same shared_slots table (see
+sop2atomic.llm.shared_slots): a request granted locally then also waits
+for one of the table's slots, ranked across all processes by priority.
+
+Typical use:
+    scheduler = get_default_scheduler()
+    text = scheduler.run(lambda: client.call(prompt), priority="interactive")
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sop2atomic.llm.shared_slots import SharedSlotTable
+
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+
+DEFAULT_WEIGHTS = {"interactive": 16.0, "normal": 4.0, "bulk": 1.0}
+
+
+class _Ticket:
+    """One waiting request."""
+
+    __slots__ = ("priority", "tenant", "start_tag", "enqueued_at", "granted")
+
+    def __init__(self, priority: str, tenant: Optional[str], start_tag: float):
+        self.priority = priority
+        self.tenant = tenant
+        self.start_tag = start_tag
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+
+
+class RequestScheduler:
+    """
+    Weighted fair queuing of LLM requests across priority classes.
+
+    Args:
+        max_concurrency: requests allowed in flight at once (the shared
+                         rate limit).
+        weights: relative share per priority class (default DEFAULT_WEIGHTS).
+        tenant_quotas: optional {tenant: max requests in flight}.
+        default_tenant_quota: in-flight cap for tenants not in tenant_quotas
+                              (None = no cap).
+        window: number of recent wait times kept per class for stats().
+        shared_slots: optional cross-process slot table; requests then also
+                      hold one of its slots while in flight.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        weights: Optional[Dict[str, float]] = None,
+        tenant_quotas: Optional[Dict[str, int]] = None,
+        default_tenant_quota: Optional[int] = None,
+        window: int = 500,
+        shared_slots: Optional[SharedSlotTable] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.tenant_quotas = dict(tenant_quotas or {})
+        self.default_tenant_quota = default_tenant_quota
+        self.shared_slots = shared_slots
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        # Waiting tickets sorted by (finish tag, arrival order)
+        self._queue: List[Tuple[float, int, _Ticket]] = []
+        self._virtual_time = 0.0
+        self._last_finish = {p: 0.0 for p in self.weights}
+        self._in_flight = 0
+        self._tenant_in_flight: Counter = Counter()
+        self._class_in_flight: Counter = Counter()
+        self._completed: Counter = Counter()
+        self._waits: Dict[str, Deque[float]] = {
+            p: deque(maxlen=window) for p in self.weights
+        }
+
+    def run(
+        self,
+        request: Callable[[], Any],
+        priority: str = "normal",
+        tenant: Optional[str] = None,
+        cost: float = 1.0,
+    ) -> Any:
+        """
+        Wait for a slot, then execute request() and return its result.
+
+        Args:
+            request: zero-argument callable performing the LLM request.
+            priority: one of the configured priority classes.
+            tenant: optional caller name, subject to its quota.
+            cost: relative size of the request (e.g. prompt tokens / 1000);
+                  larger requests consume more of their class's share.
+
+        Raises:
+            ValueError: if priority is not a configured class.
+        """
+        if priority not in self.weights:
+            raise ValueError(
+                f"Unknown priority {priority!r}; expected one of "
+                f"{tuple(self.weights)}"
+            )
+
+        with self._cond:
+            start = max(self._virtual_time, self._last_finish[priority])
+            finish = start + cost / self.weights[priority]
+            self._last_finish[priority] = finish
+            ticket = _Ticket(priority, tenant, start)
+            bisect.insort(self._queue, (finish, next(self._seq), ticket))
+            self._dispatch()
+            try:
+                while not ticket.granted:
+                    self._cond.wait()
+            except BaseException:
+                # Interrupted while waiting: give up the ticket or its slot
+                if ticket.granted:
+                    self._release(ticket)
+                else:
+                    self._queue = [e for e in self._queue if e[2] is not ticket]
+                raise
+
+        holder = None
+        sent = False
+        try:
+            if self.shared_slots is not None:
+                holder = self.shared_slots.acquire(
+                    priority,
+                    self.weights[priority],
+                    tenant=tenant,
+                    quota=self._quota(tenant),
+                    cost=cost,
+                )
+            with self._cond:
+                self._waits[priority].append(time.perf_counter() - ticket.enqueued_at)
+            sent = True
+            return request()
+        finally:
+            if holder is not None:
+                self.shared_slots.release(holder)
+            with self._cond:
+                self._release(ticket)
+                if sent:
+                    self._completed[priority] += 1
+
+    def _release(self, ticket: _Ticket) -> None:
+        """Free the slot held by a granted ticket (caller holds the lock)."""
+        self._in_flight -= 1
+        self._class_in_flight[ticket.priority] -= 1
+        if ticket.tenant is not None:
+            self._tenant_in_flight[ticket.tenant] -= 1
+        self._dispatch()
+
+    def _quota(self, tenant: Optional[str]) -> Optional[int]:
+        if tenant is None:
+            return None
+        return self.tenant_quotas.get(tenant, self.default_tenant_quota)
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the eligible tickets with the smallest tags."""
+        granted = False
+        while self._in_flight < self.max_concurrency:
+            for position, (_, _, ticket) in enumerate(self._queue):
+                quota = self._quota(ticket.tenant)
+                if quota is None or self._tenant_in_flight[ticket.tenant] < quota:
+                    break
+            else:
+                break
+
+            del self._queue[position]
+            ticket.granted = True
+            granted = True
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._in_flight += 1
+            self._class_in_flight[ticket.priority] += 1
+            if ticket.tenant is not None:
+                self._tenant_in_flight[ticket.tenant] += 1
+
+        if granted:
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return per-class queue depth, in-flight and completed counts, and
+        average / p95 / max wait (seconds) over recent requests.
+        """
+        with self._cond:
+            queued = Counter(ticket.priority for _, _, ticket in self._queue)
+            stats = {}
+            for priority in self.weights:
+                waits = sorted(self._waits[priority])
+                stats[priority] = {
+                    "queued": queued[priority],
+                    "in_flight": self._class_in_flight[priority],
+                    "completed": self._completed[priority],
+                    "wait_avg_s": (
+                        round(sum(waits) / len(waits), 4) if waits else None
+                    ),
+                    "wait_p95_s": (
+                        round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else None
+                    ),
+                    "wait_max_s": round(waits[-1], 4) if waits else None,
+                }
+            return stats
+
+
+_DEFAULT_SCHEDULER: Optional[RequestScheduler] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler shared by all transformers."""
+    global _DEFAULT_SCHEDULER
+    with _DEFAULT_LOCK:
+        if _DEFAULT_SCHEDULER is None:
+            _DEFAULT_SCHEDULER = RequestScheduler()
+        return _DEFAULT_SCHEDULER
+
+
+def configure_default_scheduler(**kwargs: Any) -> RequestScheduler:
+    """
+    Replace the process-wide scheduler (see RequestScheduler for arguments).
+
+    Requests already waiting on the previous scheduler are still served by
+    it.
+    """
+    global _DEFAULT_SCHEDULER
+    with _DEFAULT_LOCK:
+        _DEFAULT_SCHEDULER = RequestScheduler(**kwargs)
+        return _DEFAULT_SCHEDULER
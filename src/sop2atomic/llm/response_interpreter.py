@@ -2,12 +2,140 @@
 Utilities for interpreting or validating the JSON returned by the LLM.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 import json
 
+from sop2atomic.catalogue.atomic_catalogue_loader import duplicate_component_ids
+
+MISSING_COMPONENT = "MISSING_COMPONENT"
+
 
 def parse_llm_json(raw_text: str) -> Dict[str, Any]:
     """
     Convert raw string returned by LLM into a Python dict.
     """
     return json.loads(raw_text)
+
+
+def check_compact_catalogue(catalogue: List[Dict[str, Any]]) -> None:
+    """
+    Ensure the compact contract can be used with this catalogue.
+
+    Compact actions reference components by id only, so every id must
+    identify exactly one component.
+
+    Raises:
+        ValueError: naming the ids shared by several components.
+    """
+    duplicates = duplicate_component_ids(catalogue)
+    if duplicates:
+        shared = "; ".join(
+            f"{cid} ({', '.join(names)})" for cid, names in duplicates.items()
+        )
+        raise ValueError(
+            "The compact output format needs unique component ids, but the "
+            f"catalogue reuses: {shared}. Use the full output format or fix "
+            "the catalogue."
+        )
+
+
+def expand_compact_result(
+    compact: Dict[str, Any],
+    sop_data: Dict[str, Any],
+    catalogue: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Expand a compact LLM response into the full result schema.
+
+    The compact contract (see build_compact_system_prompt) looks like:
+        {"steps": [{"n": "1", "a": [["1,1", "X:\\\\Shared"], [null, "..."]]}]}
+
+    Step wording and notes are restored from the parsed SOP, component names
+    and categories from the catalogue, and positional parameter values are
+    zipped with the catalogue parameter names.
+
+    Returns:
+        dict in the schema defined by build_system_prompt(). sop_id is left
+        as None so the transformer injects it from the SOP card.
+
+    Raises:
+        ValueError: if the compact payload is structurally invalid, or the
+                    catalogue has ambiguous ids (see check_compact_catalogue).
+    """
+    check_compact_catalogue(catalogue)
+    if not isinstance(compact, dict):
+        raise ValueError("Compact response is not a JSON object")
+
+    compact_steps = compact.get("steps") or []
+    if not isinstance(compact_steps, list):
+        raise ValueError("Compact response 'steps' field is not a list")
+
+    sop_steps = {
+        str(s.get("step_number", "")): s for s in sop_data.get("steps", []) or []
+    }
+    components = {str(c.get("id", "")): c for c in catalogue}
+
+    steps: List[Dict[str, Any]] = []
+    for item in compact_steps:
+        if not isinstance(item, dict):
+            raise ValueError("Each compact step must be a JSON object")
+
+        step_number = str(item.get("n", ""))
+        source = sop_steps.get(step_number, {})
+
+        raw_actions = item.get("a") or []
+        if not isinstance(raw_actions, list):
+            raise ValueError("Compact field 'a' must be a list in each step")
+
+        steps.append(
+            {
+                "step_number": step_number,
+                "original_action": source.get("action", ""),
+                "notes": source.get("notes", ""),
+                "atomic_actions": [
+                    _expand_compact_action(raw, components) for raw in raw_actions
+                ],
+            }
+        )
+
+    return {"sop_id": compact.get("sop_id"), "steps": steps}
+
+
+def _expand_compact_action(
+    raw: Any, components: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Expand one positional compact action into a full atomic action dict."""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("Each compact atomic action must be a non-empty array")
+
+    component_id, values = raw[0], raw[1:]
+
+    if component_id is None:
+        description = values[0] if values else None
+        return {
+            "component_id": None,
+            "component_name": MISSING_COMPONENT,
+            "category": None,
+            "parameters": {"description": description},
+        }
+
+    component = components.get(str(component_id))
+    if component is None:
+        # The model referenced an ID that is not in the catalogue: surface it
+        # as a missing component rather than inventing a name for it.
+        return {
+            "component_id": None,
+            "component_name": MISSING_COMPONENT,
+            "category": None,
+            "parameters": {"requested_component_id": str(component_id)},
+        }
+
+    names = component.get("parameters", []) or []
+    padded = list(values[: len(names)]) + [None] * (len(names) - len(values))
+
+    return {
+        "component_id": str(component_id),
+        "component_name": component.get("id_name", ""),
+        "category": component.get("category"),
+        "parameters": dict(zip(names, padded)),
+    }
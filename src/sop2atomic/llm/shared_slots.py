@@ -0,0 +1,220 @@
+"""
+LLM request slots shared by several processes through one SQLite file.
+
+RequestScheduler only orders the requests of its own process. The entry
+points (interactive CLI, batch, worker, remap) run as separate processes,
+so to keep one rate limit across all of them each scheduler can also take a
+slot in a SharedSlotTable before its request is sent:
+  - at most max_concurrency slots are held at once across all processes
+  - waiting requests are ranked by a virtual deadline,
+    arrival time + cost * RANK_QUANTUM_S / weight, and the next free slot
+    goes to the smallest one: an interactive request (weight 16) overtakes
+    bulk requests (weight 1) that arrived up to ~10 s before it, while a
+    bulk request is never overtaken forever
+  - optional per-tenant quotas, counted over all processes
+  - slots and waiters carry an expiry, so the entries of a crashed process
+    are reclaimed: waiters after a few seconds, slots after lease_seconds
+    (a request holding its slot for longer than that loses it)
+
+Note: SQLite relies on file locking. Use a filesystem with working POSIX
+locks (see sop2atomic.batch.job_queue).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+# Virtual-deadline offset of a request of cost 1 and weight 1 (seconds)
+RANK_QUANTUM_S = 10.0
+
+# Waiters refresh their entry at every poll; one not refreshed for this long
+# belongs to a dead process
+_WAITER_TTL_S = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    holder   TEXT PRIMARY KEY,
+    priority TEXT NOT NULL,
+    tenant   TEXT,
+    expires  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    waiter_id TEXT PRIMARY KEY,
+    priority  TEXT NOT NULL,
+    tenant    TEXT,
+    quota     INTEGER,
+    rank      REAL NOT NULL,
+    expires   REAL NOT NULL
+);
+"""
+
+
+class SharedSlotTable:
+    """
+    Cross-process pool of LLM request slots.
+
+    Args:
+        path: SQLite file shared by all processes.
+        max_concurrency: slots held at once across all processes.
+        lease_seconds: lifetime of a slot; also bounds how long a crashed
+                       process's slot blocks the others.
+        poll_interval: seconds between two admission attempts of a waiter.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_concurrency: int = 8,
+        lease_seconds: float = 600.0,
+        poll_interval: float = 0.05,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 objects are per thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(
+        self,
+        priority: str,
+        weight: float,
+        tenant: Optional[str] = None,
+        quota: Optional[int] = None,
+        cost: float = 1.0,
+    ) -> str:
+        """
+        Block until a slot is granted and return its holder id.
+
+        Args:
+            priority: priority class of the request (for stats only).
+            weight: weight of that class; higher weights rank earlier.
+            tenant: optional caller name.
+            quota: slots the tenant may hold at once across all processes
+                   (None = no cap).
+            cost: relative size of the request, see RequestScheduler.run().
+        """
+        conn = self._connect()
+        waiter_id = uuid.uuid4().hex
+        now = time.time()
+        conn.execute(
+            "INSERT INTO waiters (waiter_id, priority, tenant, quota, rank, "
+            "expires) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                waiter_id,
+                priority,
+                tenant,
+                quota,
+                now + cost * RANK_QUANTUM_S / weight,
+                now + _WAITER_TTL_S,
+            ),
+        )
+        try:
+            while not self._try_admit(conn, waiter_id, priority, tenant):
+                time.sleep(self.poll_interval)
+        except BaseException:
+            conn.execute("DELETE FROM waiters WHERE waiter_id = ?", (waiter_id,))
+            raise
+        return waiter_id
+
+    def _try_admit(
+        self,
+        conn: sqlite3.Connection,
+        waiter_id: str,
+        priority: str,
+        tenant: Optional[str],
+    ) -> bool:
+        """Take a slot if this waiter is the best eligible one."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE expires < ?", (now,))
+            conn.execute("DELETE FROM waiters WHERE expires < ?", (now,))
+            conn.execute(
+                "UPDATE waiters SET expires = ? WHERE waiter_id = ?",
+                (now + _WAITER_TTL_S, waiter_id),
+            )
+
+            # The free slots go to the best-ranked eligible waiters; this
+            # waiter takes one if it is among them
+            admitted = False
+            (held,) = conn.execute("SELECT COUNT(*) FROM slots").fetchone()
+            free = self.max_concurrency - held
+            if free > 0:
+                tenant_held = dict(
+                    conn.execute(
+                        "SELECT tenant, COUNT(*) FROM slots "
+                        "WHERE tenant IS NOT NULL GROUP BY tenant"
+                    ).fetchall()
+                )
+                for candidate, candidate_tenant, quota in conn.execute(
+                    "SELECT waiter_id, tenant, quota FROM waiters "
+                    "ORDER BY rank, waiter_id"
+                ).fetchall():
+                    if (
+                        quota is not None
+                        and tenant_held.get(candidate_tenant, 0) >= quota
+                    ):
+                        continue
+                    if candidate == waiter_id:
+                        admitted = True
+                        break
+                    free -= 1
+                    if free == 0:
+                        break
+                    if candidate_tenant is not None:
+                        tenant_held[candidate_tenant] = (
+                            tenant_held.get(candidate_tenant, 0) + 1
+                        )
+
+            if admitted:
+                conn.execute("DELETE FROM waiters WHERE waiter_id = ?", (waiter_id,))
+                conn.execute(
+                    "INSERT INTO slots (holder, priority, tenant, expires) "
+                    "VALUES (?, ?, ?, ?)",
+                    (waiter_id, priority, tenant, now + self.lease_seconds),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return admitted
+
+    def release(self, holder: str) -> None:
+        """Give back the slot of holder."""
+        self._connect().execute("DELETE FROM slots WHERE holder = ?", (holder,))
+
+    def in_use(self) -> int:
+        """Number of slots currently held across all processes."""
+        (held,) = (
+            self._connect()
+            .execute("SELECT COUNT(*) FROM slots WHERE expires >= ?", (time.time(),))
+            .fetchone()
+        )
+        return held
+
+    def waiting(self) -> int:
+        """Number of requests currently waiting for a slot across all processes."""
+        (count,) = (
+            self._connect()
+            .execute("SELECT COUNT(*) FROM waiters WHERE expires >= ?", (time.time(),))
+            .fetchone()
+        )
+        return count
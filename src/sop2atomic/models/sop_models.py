@@ -0,0 +1,184 @@
+"""
+Compact typed records for parsed SOPs, catalogue entries and mapping results.
+
+The pipeline exchanges plain dicts (see parser.sop_parser,
+catalogue.atomic_catalogue_loader and the transformer output schema). For
+large batches these records are a lighter alternative:
+  - slotted dataclasses: no per-instance __dict__
+  - repeated strings (categories, component names/IDs, parameter names)
+    are interned, so thousands of actions share one string object each
+  - defaults are applied once in from_dict(), so downstream code can read
+    attributes without re-checking keys
+
+Every record round-trips with the dict schema via from_dict() / to_dict().
+The shims are shallow: string values and SOP card dicts are shared with the
+source, never deep-copied.
+
+Trade-off (scripts/benchmark_models.py, 10,000 mapped steps x 3 actions):
+building records is ~2.5x slower than keeping the parsed dicts (0.27 s vs
+0.10 s) and peaks higher while both coexist (31.0 MB vs 22.0 MB), but the
+records retained afterwards take 12.4 MB vs 22.0 MB and scan ~2.5x faster.
+They therefore pay off only for data held for a long time: the batch paths
+keep every parsed SOP as a SopDocument until the batch is done (see
+batch.batch_runner), and convert back with to_dict() for the LLM requests
+and JSON output.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+
+
+def _intern(value: Any) -> Optional[str]:
+    """Intern a string-like value; None stays None."""
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+@dataclass(slots=True)
+class SopStep:
+    """One row of the SOP procedure table."""
+
+    step_number: str
+    action: str
+    notes: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SopStep":
+        return cls(
+            step_number=str(data.get("step_number", "")),
+            action=data.get("action", "") or "",
+            notes=data.get("notes", "") or "",
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step_number": self.step_number,
+            "action": self.action,
+            "notes": self.notes,
+        }
+
+
+@dataclass(slots=True)
+class SopDocument:
+    """A parsed SOP: SOP card metadata plus procedure steps."""
+
+    sop_card: Dict[str, str] = field(default_factory=dict)
+    steps: List[SopStep] = field(default_factory=list)
+
+    @property
+    def sop_id(self) -> Optional[str]:
+        return self.sop_card.get("SCHRODERS_ID")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SopDocument":
+        return cls(
+            sop_card=data.get("sop_card") or {},
+            steps=[SopStep.from_dict(s) for s in data.get("steps") or []],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sop_card": self.sop_card,
+            "steps": [s.to_dict() for s in self.steps],
+        }
+
+
+@dataclass(slots=True)
+class AtomicComponent:
+    """One entry of the Atomic Components Catalogue."""
+
+    id: str
+    id_name: str
+    category: str
+    description: str
+    parameters: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AtomicComponent":
+        return cls(
+            id=_intern(data.get("id", "")) or "",
+            id_name=_intern(data.get("id_name", "")) or "",
+            category=_intern(data.get("category", "")) or "",
+            description=data.get("description", "") or "",
+            parameters=tuple(_intern(p) for p in data.get("parameters") or []),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "id_name": self.id_name,
+            "category": self.category,
+            "description": self.description,
+            "parameters": list(self.parameters),
+        }
+
+
+@dataclass(slots=True)
+class AtomicAction:
+    """One atomic action inside a mapped step."""
+
+    component_id: Optional[str]
+    component_name: str
+    category: Optional[str]
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_missing(self) -> bool:
+        return self.component_name == MISSING_COMPONENT
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AtomicAction":
+        parameters = data.get("parameters")
+        if isinstance(parameters, dict):
+            # Parameter names repeat across every action of the same component
+            parameters = {_intern(k): v for k, v in parameters.items()}
+        else:
+            parameters = {}
+        return cls(
+            component_id=_intern(data.get("component_id")),
+            component_name=_intern(data.get("component_name", MISSING_COMPONENT))
+            or MISSING_COMPONENT,
+            category=_intern(data.get("category")),
+            parameters=parameters,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "component_id": self.component_id,
+            "component_name": self.component_name,
+            "category": self.category,
+            "parameters": self.parameters,
+        }
+
+
+@dataclass(slots=True)
+class MappedStep:
+    """One SOP step with its atomic actions, as in the transformer output."""
+
+    step_number: str
+    original_action: str
+    notes: str = ""
+    atomic_actions: List[AtomicAction] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MappedStep":
+        return cls(
+            step_number=str(data.get("step_number", "")),
+            original_action=data.get("original_action", data.get("action", "")) or "",
+            notes=data.get("notes", "") or "",
+            atomic_actions=[
+                AtomicAction.from_dict(a) for a in data.get("atomic_actions") or []
+            ],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step_number": self.step_number,
+            "original_action": self.original_action,
+            "notes": self.notes,
+            "atomic_actions": [a.to_dict() for a in self.atomic_actions],
+        }
@@ -0,0 +1,340 @@
+"""
+Model cascade: SOP → Atomic mapping on a small model, escalating only
+uncertain steps to the large model.
+
+Workflow:
+  - run the whole SOP through a small, fast model
+  - score every step of the small result against local signals
+      * step missing from the result or with empty atomic_actions
+      * MISSING_COMPONENT actions
+      * validation failures (unknown component ID, name/ID mismatch,
+        parameter names not declared in the catalogue)
+      * disagreement with the lexical catalogue matcher
+  - re-run only the low-confidence steps on the large model
+  - merge the large model's steps back in, per step_number
+
+The merged result has exactly the same schema as SopToAtomicTransformer's.
+A per-run report (tier counts, measured latencies, estimated cost and, when
+the large model was called, extrapolated savings) is kept in
+CascadeTransformer.last_report.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.llm.hedging import HedgingPolicy
+from sop2atomic.llm.prompt_builder import CHARS_PER_TOKEN, build_user_prompt
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+
+def score_step(
+    step: Optional[Dict[str, Any]],
+    source_step: Dict[str, Any],
+    components_by_id: Dict[str, Dict[str, Any]],
+    matcher: CatalogueMatcher,
+    disagreement_threshold: float = 0.35,
+) -> List[str]:
+    """
+    Return the low-confidence reasons for one mapped step (empty = confident).
+
+    Args:
+        step: the normalised step from the transformer result, or None if the
+              model did not return this step at all.
+        source_step: the parsed SOP step ({step_number, action, notes}).
+        components_by_id: catalogue components keyed by their "id".
+        matcher: lexical matcher over the same catalogue.
+        disagreement_threshold: minimum lexical score of the best candidate
+              before disagreement with it counts as a low-confidence signal.
+    """
+    if step is None:
+        return ["missing_step"]
+
+    actions = step.get("atomic_actions") or []
+    if not actions:
+        return ["empty_actions"]
+
+    reasons: List[str] = []
+    chosen_ids = set()
+
+    for action in actions:
+        component_id = action.get("component_id")
+        if action.get("component_name") == MISSING_COMPONENT or component_id is None:
+            _add_reason(reasons, "missing_component")
+            continue
+
+        component = components_by_id.get(str(component_id))
+        if component is None:
+            _add_reason(reasons, "unknown_component_id")
+            continue
+
+        chosen_ids.add(str(component_id))
+        if action.get("component_name") != component.get("id_name"):
+            _add_reason(reasons, "component_name_mismatch")
+
+        declared = set(component.get("parameters", []) or [])
+        if set(action.get("parameters", {}) or {}) - declared:
+            _add_reason(reasons, "unknown_parameter")
+
+    if chosen_ids:
+        text = f"{source_step.get('action', '')} {source_step.get('notes', '')}"
+        candidates = matcher.rank(text, top_k=3)
+        if (
+            candidates
+            and candidates[0][1] >= disagreement_threshold
+            and not chosen_ids & {str(c.get("id", "")) for c, _ in candidates}
+        ):
+            _add_reason(reasons, "retrieval_disagreement")
+
+    return reasons
+
+
+def _add_reason(reasons: List[str], reason: str) -> None:
+    if reason not in reasons:
+        reasons.append(reason)
+
+
+def _estimate_tokens(prompt: str, result: Dict[str, Any]) -> int:
+    """Crude token estimate for one request: prompt plus generated JSON."""
+    return (len(prompt) + len(json.dumps(result))) // CHARS_PER_TOKEN
+
+
+class CascadeTransformer:
+    """
+    Two-tier transformer: small model first, large model for uncertain steps.
+
+    Args:
+        small_model / large_model: model names for the two tiers.
+        small / large: optional pre-built transformers (used in tests).
+        output_format / structured_output: passed through to both tiers
+                       (see SopToAtomicTransformer).
+        small_relative_cost: price per token of the small model relative to
+                             the large one, used only for the report.
+        disagreement_threshold: see score_step().
+        priority / tenant: request scheduler priority class and tenant of
+                  both tiers (see SopToAtomicTransformer).
+        hedging: optional hedged-request policy of both tiers.
+    """
+
+    def __init__(
+        self,
+        small_model: str = "gpt-5-mini",
+        large_model: str = "gpt-5.1",
+        small: Optional[SopToAtomicTransformer] = None,
+        large: Optional[SopToAtomicTransformer] = None,
+        output_format: str = "full",
+        structured_output: bool = False,
+        small_relative_cost: float = 0.2,
+        disagreement_threshold: float = 0.35,
+        priority: str = "normal",
+        tenant: Optional[str] = None,
+        hedging: Optional[HedgingPolicy] = None,
+    ):
+        self.small = small or SopToAtomicTransformer(
+            model=small_model,
+            output_format=output_format,
+            structured_output=structured_output,
+            priority=priority,
+            tenant=tenant,
+            hedging=hedging,
+        )
+        self.large = large or SopToAtomicTransformer(
+            model=large_model,
+            output_format=output_format,
+            structured_output=structured_output,
+            priority=priority,
+            tenant=tenant,
+            hedging=hedging,
+        )
+        self.small_relative_cost = small_relative_cost
+        self.disagreement_threshold = disagreement_threshold
+        self.last_report: Dict[str, Any] = {}
+
+    def transform(
+        self,
+        sop_data: Dict[str, Any],
+        catalogue: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Execute the cascaded SOP → Atomic mapping.
+
+        Returns:
+            A dict with the same schema and guarantees as
+            SopToAtomicTransformer.transform().
+
+        Raises:
+            RuntimeError: if the large model fails on the escalated steps.
+        """
+        source_steps = sop_data.get("steps", []) or []
+
+        # 1) Small tier over the whole SOP. A malformed response simply means
+        #    every step is escalated.
+        started = time.perf_counter()
+        try:
+            small_result: Optional[Dict[str, Any]] = self.small.transform(
+                sop_data, catalogue
+            )
+        except RuntimeError:
+            small_result = None
+        small_latency = time.perf_counter() - started
+
+        # 2) Score each step of the small result
+        escalations: Dict[str, List[str]] = {}
+        if small_result is None:
+            escalations = {
+                str(s.get("step_number", "")): ["invalid_response"]
+                for s in source_steps
+            }
+            sop_card = sop_data.get("sop_card", {}) or {}
+            merged: Dict[str, Any] = {
+                "sop_id": sop_card.get("SCHRODERS_ID"),
+                "steps": [],
+            }
+        else:
+            merged = small_result
+            matcher = CatalogueMatcher(catalogue)
+            components_by_id = {str(c.get("id", "")): c for c in catalogue}
+            mapped = {s["step_number"]: s for s in small_result["steps"]}
+            for source in source_steps:
+                step_number = str(source.get("step_number", ""))
+                reasons = score_step(
+                    mapped.get(step_number),
+                    source,
+                    components_by_id,
+                    matcher,
+                    self.disagreement_threshold,
+                )
+                if reasons:
+                    escalations[step_number] = reasons
+
+        # 3) Large tier over the escalated steps only, merged per step
+        large_latency = 0.0
+        large_result: Optional[Dict[str, Any]] = None
+        escalated_sop = {
+            "sop_card": sop_data.get("sop_card", {}),
+            "steps": [
+                s for s in source_steps if str(s.get("step_number", "")) in escalations
+            ],
+        }
+        if escalated_sop["steps"]:
+            started = time.perf_counter()
+            large_result = self.large.transform(escalated_sop, catalogue)
+            large_latency = time.perf_counter() - started
+            merged = self._merge(merged, large_result, source_steps)
+
+        self.last_report = self._build_report(
+            sop_data,
+            escalated_sop,
+            catalogue,
+            small_result,
+            large_result,
+            escalations,
+            small_latency,
+            large_latency,
+        )
+        return merged
+
+    @staticmethod
+    def _merge(
+        base: Dict[str, Any],
+        override: Dict[str, Any],
+        source_steps: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Replace base steps with override steps, keeping SOP step order."""
+        by_number = {s["step_number"]: s for s in base.get("steps", [])}
+        by_number.update({s["step_number"]: s for s in override.get("steps", [])})
+
+        ordered = []
+        for source in source_steps:
+            step = by_number.pop(str(source.get("step_number", "")), None)
+            if step is not None:
+                ordered.append(step)
+        # Steps the model returned that are not in the parsed SOP are kept last
+        ordered.extend(by_number.values())
+
+        base["steps"] = ordered
+        if not base.get("sop_id"):
+            base["sop_id"] = override.get("sop_id")
+        return base
+
+    def _build_report(
+        self,
+        sop_data: Dict[str, Any],
+        escalated_sop: Dict[str, Any],
+        catalogue: List[Dict[str, Any]],
+        small_result: Optional[Dict[str, Any]],
+        large_result: Optional[Dict[str, Any]],
+        escalations: Dict[str, List[str]],
+        small_latency: float,
+        large_latency: float,
+    ) -> Dict[str, Any]:
+        """
+        Summarise tier usage, measured latencies and estimated cost.
+
+        Costs are token estimates in "large-model token" units. A large-only
+        run is never executed, so its latency and cost can only be
+        extrapolated from the escalation request, linearly in the number of
+        steps (large_only_basis). Without a large-model request nothing is
+        known about the large model: the large-only and savings fields are
+        then None and large_only_basis is "unmeasured".
+        """
+        steps_total = len(sop_data.get("steps", []) or [])
+        steps_escalated = len(escalations)
+
+        full_prompt = build_user_prompt(sop_data, catalogue)
+        small_tokens = _estimate_tokens(full_prompt, small_result or {})
+        cost = small_tokens * self.small_relative_cost
+
+        report: Dict[str, Any] = {
+            "small_model": self.small.model,
+            "large_model": self.large.model,
+            "steps_total": steps_total,
+            "steps_small": steps_total - steps_escalated,
+            "steps_escalated": steps_escalated,
+            "escalations": escalations,
+            "small_latency_s": round(small_latency, 3),
+            "large_latency_s": None,
+            "large_only_basis": "unmeasured",
+            "estimated_large_only_latency_s": None,
+            "estimated_latency_saved_s": None,
+            "estimated_cost_units": None,
+            "estimated_large_only_cost_units": None,
+            "estimated_cost_saved_pct": None,
+        }
+        if large_result is None:
+            report["estimated_cost_units"] = round(cost, 1)
+            return report
+
+        escalated_prompt = build_user_prompt(escalated_sop, catalogue)
+        large_output = len(json.dumps(large_result)) // CHARS_PER_TOKEN
+        cost += len(escalated_prompt) // CHARS_PER_TOKEN + large_output
+
+        # A large-only run reads the full prompt; its output and latency are
+        # scaled from the escalated steps
+        scale = steps_total / steps_escalated
+        large_only_cost = len(full_prompt) // CHARS_PER_TOKEN + large_output * scale
+        large_only_latency = large_latency * scale
+
+        report.update(
+            {
+                "large_latency_s": round(large_latency, 3),
+                "large_only_basis": (
+                    f"extrapolated linearly from {steps_escalated} escalated "
+                    f"of {steps_total} steps"
+                ),
+                "estimated_large_only_latency_s": round(large_only_latency, 3),
+                "estimated_latency_saved_s": round(
+                    large_only_latency - (small_latency + large_latency), 3
+                ),
+                "estimated_cost_units": round(cost, 1),
+                "estimated_large_only_cost_units": round(large_only_cost, 1),
+                "estimated_cost_saved_pct": (
+                    round(100 * (1 - cost / large_only_cost), 1)
+                    if large_only_cost
+                    else None
+                ),
+            }
+        )
+        return report
@@ -0,0 +1,77 @@
+"""
+Local, LLM-free mapping of SOP steps, used when the LLM result is not
+available in time (see SopToAtomicTransformer.transform(deadline=...)).
+
+Each step is mapped to:
+  - the best lexical catalogue match (see CatalogueMatcher), with every
+    declared parameter set to null, if it scores above min_score
+  - otherwise a single MISSING_COMPONENT action describing why
+
+Fallback steps are marked provenance="fallback" with a fallback_reason, so
+they can be found and upgraded by a later LLM run.
+"""
+
+from typing import Any, Dict, Optional
+
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.llm.response_interpreter import MISSING_COMPONENT
+
+PROVENANCE_LLM = "llm"
+PROVENANCE_FALLBACK = "fallback"
+PROVENANCE_CACHED = "cached"
+
+
+def fallback_step(
+    source_step: Dict[str, Any],
+    matcher: Optional[CatalogueMatcher],
+    reason: str,
+    min_score: float = 0.35,
+) -> Dict[str, Any]:
+    """
+    Map one parsed SOP step without the LLM.
+
+    Args:
+        source_step: the parsed SOP step ({step_number, action, notes}).
+        matcher: lexical matcher over the catalogue (None = no matching).
+        reason: why the LLM mapping is missing, e.g. "deadline_exceeded".
+        min_score: minimum lexical score for a keyword match.
+
+    Returns:
+        A step in the result schema, with provenance and fallback_reason.
+    """
+    action_text = source_step.get("action", "") or ""
+    notes = source_step.get("notes", "") or ""
+
+    candidates = []
+    if matcher is not None:
+        candidates = matcher.rank(
+            f"{action_text} {notes}", top_k=1, min_score=min_score
+        )
+
+    if candidates:
+        component = candidates[0][0]
+        action = {
+            "component_id": component.get("id"),
+            "component_name": component.get("id_name"),
+            "category": component.get("category"),
+            "parameters": {p: None for p in component.get("parameters", []) or []},
+        }
+    else:
+        action = {
+            "component_id": None,
+            "component_name": MISSING_COMPONENT,
+            "category": None,
+            "parameters": {
+                "description": f"No LLM mapping ({reason}) and no catalogue "
+                "keyword match"
+            },
+        }
+
+    return {
+        "step_number": str(source_step.get("step_number", "")),
+        "original_action": action_text,
+        "notes": notes,
+        "atomic_actions": [action],
+        "provenance": PROVENANCE_FALLBACK,
+        "fallback_reason": reason,
+    }
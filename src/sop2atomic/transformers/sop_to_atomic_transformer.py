@@ -9,11 +9,158 @@ This class coordinates the full workflow:
   - perform light normalisation / validation of the structure
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from sop2atomic.llm.prompt_builder import build_user_prompt
+from sop2atomic.catalogue.atomic_catalogue_loader import catalogue_fingerprint
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.llm.prompt_builder import (
+    CHARS_PER_TOKEN,
+    build_compact_system_prompt,
+    build_packed_system_prompt,
+    build_packed_user_prompt,
+    build_system_prompt,
+    build_user_prompt,
+)
+from sop2atomic.llm.hedging import HedgingPolicy
 from sop2atomic.llm.llm_client import LLMClient
-from sop2atomic.llm.response_interpreter import parse_llm_json
+from sop2atomic.llm.output_schema import get_response_format
+from sop2atomic.llm.request_scheduler import (
+    PRIORITY_CLASSES,
+    RequestScheduler,
+    get_default_scheduler,
+)
+from sop2atomic.llm.response_interpreter import (
+    check_compact_catalogue,
+    expand_compact_result,
+    parse_llm_json,
+)
+from sop2atomic.transformers.local_fallback import (
+    PROVENANCE_CACHED,
+    PROVENANCE_LLM,
+    fallback_step,
+)
+from sop2atomic.utils.file_utils import write_json_atomic
+
+OUTPUT_FORMATS = ("full", "compact")
+
+# Deadline-bounded calls wait for the LLM in daemon threads, so a process
+# never waits at exit for a call it has given up on. At most
+# _DEADLINE_MAX_PENDING calls may be pending at once: when the LLM hangs,
+# further calls fall back right away (fallback_reason "llm_saturated")
+# instead of queueing behind the hung ones.
+_DEADLINE_MAX_PENDING = 8
+_DEADLINE_SLOTS = threading.BoundedSemaphore(_DEADLINE_MAX_PENDING)
+_PENDING: "set[threading.Thread]" = set()
+_PENDING_LOCK = threading.Lock()
+
+# A response that arrives after its deadline is kept for the next identical
+# call: in memory (bounded LRU, per process) and, if the transformer has a
+# late_cache_dir, as <key>.json there for later processes. The key covers
+# everything the response depends on (model, system prompt, output format
+# and schema, catalogue fingerprint, user prompt), so a change to any of them
+# never serves a stale response.
+_LATE_RESPONSES: "OrderedDict[str, str]" = OrderedDict()
+_LATE_RESPONSES_SIZE = 64
+_LATE_LOCK = threading.Lock()
+
+# Part of a deadline kept aside to build the local fallback
+_FALLBACK_RESERVE_S = 0.1
+
+
+def _submit_deadline_call(request: Callable[[], str]) -> Optional[Future]:
+    """
+    Run request() in a daemon thread.
+
+    Returns:
+        A future for its result, or None if _DEADLINE_MAX_PENDING calls are
+        already pending.
+    """
+    slots = _DEADLINE_SLOTS
+    if not slots.acquire(blocking=False):
+        return None
+    future: Future = Future()
+    future.set_running_or_notify_cancel()
+
+    def run() -> None:
+        try:
+            future.set_result(request())
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            with _PENDING_LOCK:
+                _PENDING.discard(threading.current_thread())
+            slots.release()
+
+    thread = threading.Thread(target=run, name="sop2atomic-deadline", daemon=True)
+    with _PENDING_LOCK:
+        _PENDING.add(thread)
+    thread.start()
+    return future
+
+
+def wait_for_late_responses(timeout: float) -> int:
+    """
+    Wait up to timeout seconds for the deadline-bounded calls still pending,
+    so their late responses reach the cache before the process exits.
+
+    Returns:
+        The number of calls still pending afterwards.
+    """
+    wait_until = time.monotonic() + timeout
+    with _PENDING_LOCK:
+        pending = list(_PENDING)
+    for thread in pending:
+        thread.join(max(0.0, wait_until - time.monotonic()))
+    return sum(thread.is_alive() for thread in pending)
+
+
+def _late_cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _load_late_response(key: str, cache_dir: Optional[str]) -> Optional[str]:
+    """Return a late response stored in memory or in cache_dir, if any."""
+    with _LATE_LOCK:
+        raw_json = _LATE_RESPONSES.get(key)
+    if raw_json is None and cache_dir:
+        try:
+            with open(_late_cache_path(cache_dir, key), encoding="utf-8") as f:
+                raw_json = json.load(f)
+        except (OSError, ValueError):
+            return None
+    return raw_json
+
+
+def _drop_late_response(key: str, cache_dir: Optional[str]) -> None:
+    with _LATE_LOCK:
+        _LATE_RESPONSES.pop(key, None)
+    if cache_dir:
+        try:
+            os.remove(_late_cache_path(cache_dir, key))
+        except OSError:
+            pass
+
+
+def _store_late_response(key: str, cache_dir: Optional[str], future: Future) -> None:
+    """Keep the response of an LLM call that finished after its deadline."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _LATE_LOCK:
+        _LATE_RESPONSES[key] = future.result()
+        _LATE_RESPONSES.move_to_end(key)
+        while len(_LATE_RESPONSES) > _LATE_RESPONSES_SIZE:
+            _LATE_RESPONSES.popitem(last=False)
+    if cache_dir:
+        write_json_atomic(_late_cache_path(cache_dir, key), future.result())
 
 
 class SopToAtomicTransformer:
@@ -23,19 +170,106 @@ class SopToAtomicTransformer:
     In production, this uses the real LLMClient. In tests, LLMClient is usually
     monkeypatched with a fake implementation (see tests/test_transformer.py),
     so that no external API calls are performed.
+
+    output_format selects the contract requested from the model:
+      - "full": the model returns the complete result schema (default).
+      - "compact": the model returns only step numbers, catalogue IDs and
+        parameter values; the full schema is rebuilt locally from the parsed
+        SOP and the catalogue, which cuts generated tokens substantially.
+
+    structured_output=True passes a strict JSON schema generated from the
+    catalogue as the Responses API output format, so the model can only
+    return well-formed JSON referencing real components (full format only).
+
+    transform(..., deadline=seconds) always returns within the time budget:
+    steps the LLM has not mapped by then get a local fallback mapping (see
+    local_fallback), and every step is marked with its provenance. Responses
+    arriving after the deadline are reused by the next identical call of the
+    process, and of later processes if late_cache_dir is set (see
+    wait_for_late_responses()).
+
+    transform_packed() maps several small SOPs with one request per pack of
+    SOPs, so the catalogue is sent once per pack instead of once per SOP.
+
+    hedging=HedgingPolicy(...) opts the default LLMClient into hedged
+    requests (see sop2atomic.llm.hedging and hedging_stats()); a hedge waits
+    for a scheduler slot of its own, like the request it duplicates.
+
+    Every LLM call goes through a RequestScheduler (the process-wide default
+    unless one is given) under this transformer's priority class
+    ("interactive", "normal" or "bulk") and optional tenant name.
     """
 
-    def __init__(self, model: str = "gpt-5.1", llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        model: str = "gpt-5.1",
+        llm_client: Optional[LLMClient] = None,
+        output_format: str = "full",
+        structured_output: bool = False,
+        priority: str = "normal",
+        tenant: Optional[str] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        late_cache_dir: Optional[str] = None,
+        hedging: Optional[HedgingPolicy] = None,
+    ):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output_format {output_format!r}; "
+                f"expected one of {OUTPUT_FORMATS}"
+            )
+        if structured_output and output_format != "full":
+            raise ValueError("structured_output requires output_format='full'")
+        classes = tuple(scheduler.weights) if scheduler else PRIORITY_CLASSES
+        if priority not in classes:
+            raise ValueError(
+                f"Unknown priority {priority!r}; expected one of {classes}"
+            )
+
         # Allow explicit injection for advanced use, but default to constructing
         # a client with the given model. In tests, LLMClient is monkeypatched
         # at the module level, so this will actually construct the fake client.
-        self.llm: LLMClient = llm_client or LLMClient(model=model)
+        # A hedging client takes a scheduler slot per request it sends (the
+        # original and its hedge), so its calls are not wrapped in one here.
+        self._client_takes_slots = llm_client is None and hedging is not None
+        if llm_client is None:
+            llm_client = (
+                LLMClient(model=model, hedging=hedging, slot=self._in_slot)
+                if hedging is not None
+                else LLMClient(model=model)
+            )
+        self.llm: LLMClient = llm_client
         self.model = model
+        self.output_format = output_format
+        self.structured_output = structured_output
+        self.priority = priority
+        self.tenant = tenant
+        self.scheduler = scheduler
+        self.late_cache_dir = late_cache_dir
+        self.last_pack_report: Dict[str, Any] = {}
+
+    def _in_slot(self, request: Callable[[], str], cost: float = 1.0) -> str:
+        """Run one LLM request in a slot of the request scheduler."""
+        scheduler = self.scheduler or get_default_scheduler()
+        return scheduler.run(
+            request, priority=self.priority, tenant=self.tenant, cost=cost
+        )
+
+    def _scheduled(self, call: Callable[[], str], cost: float = 1.0) -> str:
+        """Run an LLM client call, in a scheduler slot unless it takes its own."""
+        if self._client_takes_slots:
+            return call()
+        return self._in_slot(call, cost=cost)
+
+    def hedging_stats(self) -> Optional[Dict[str, Any]]:
+        """Return the LLM client's hedging counters, or None if hedging is off."""
+        stats = getattr(self.llm, "hedging_stats", None)
+        return stats() if stats is not None else None
 
     def transform(
         self,
         sop_data: Dict[str, Any],
         catalogue: List[Dict[str, Any]],
+        deadline: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Execute the full SOP → Atomic mapping.
@@ -46,6 +280,17 @@ class SopToAtomicTransformer:
                         - "sop_card": dict with fields like SCHRODERS_ID, CLIENT…
                         - "steps": list of {step_number, action, notes}
             catalogue: List of atomic components from the catalogue loader.
+            deadline: optional time budget in seconds. When set, the call
+                      returns best-effort results instead of raising: steps
+                      without an LLM mapping in time (timeout, LLM error,
+                      invalid JSON, step not returned) are mapped locally,
+                      and each step gets a "provenance" key:
+                        - "llm": mapped by the LLM within the deadline
+                        - "cached": mapped by an LLM response that arrived
+                          after the deadline of an earlier identical call
+                          (of this process, or stored in late_cache_dir)
+                        - "fallback": local keyword match or
+                          MISSING_COMPONENT, with a "fallback_reason"
 
         Returns:
             A dict matching the JSON schema defined in build_system_prompt(),
@@ -57,20 +302,337 @@ class SopToAtomicTransformer:
                     component_id, component_name, category, parameters.
 
         Raises:
-            RuntimeError: if the LLM returns invalid or structurally inconsistent JSON.
+            RuntimeError: if the LLM returns invalid or structurally inconsistent
+                          JSON (only without a deadline).
+            ValueError: if output_format="compact" and the catalogue has
+                        component ids shared by several components.
         """
+        started = time.monotonic()
+        if self.output_format == "compact":
+            check_compact_catalogue(catalogue)
+
         # 1) Build the prompt from SOP + catalogue
         user_prompt = build_user_prompt(sop_data, catalogue)
 
-        # 2) Call the LLM (real or fake, depending on environment)
-        raw_json = self.llm.call(user_prompt)
+        # 2) Call the LLM (real or fake, depending on environment), waiting
+        #    for a slot of the request scheduler
+        instructions: Optional[str] = None
+        text_format: Optional[Dict[str, Any]] = None
+        if self.output_format == "compact":
+            instructions = build_compact_system_prompt()
+
+            def request() -> str:
+                return self.llm.call(user_prompt, instructions=instructions)
+
+        elif self.structured_output:
+            text_format = get_response_format(catalogue)
 
+            def request() -> str:
+                return self.llm.call(user_prompt, text_format=text_format)
+
+        else:
+
+            def request() -> str:
+                return self.llm.call(user_prompt)
+
+        def scheduled_request() -> str:
+            return self._scheduled(request)
+
+        if deadline is not None:
+            key = hashlib.sha256(
+                json.dumps(
+                    [
+                        self.model,
+                        self.output_format,
+                        instructions or build_system_prompt(),
+                        text_format,
+                        catalogue_fingerprint(catalogue),
+                        user_prompt,
+                    ],
+                    sort_keys=True,
+                ).encode("utf-8")
+            ).hexdigest()
+            return self._transform_with_deadline(
+                sop_data, catalogue, key, scheduled_request, started + deadline
+            )
+
+        return self._interpret(scheduled_request(), sop_data, catalogue)
+
+    def _interpret(
+        self,
+        raw_json: str,
+        sop_data: Dict[str, Any],
+        catalogue: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Turn a raw LLM response into a normalised result (steps 3-6).
+
+        Raises:
+            RuntimeError: if the response is invalid or inconsistent JSON.
+        """
         # 3) Parse JSON string into a Python object
         try:
             result = parse_llm_json(raw_json)
         except Exception as exc:  # ValueError most likely
             raise RuntimeError("LLM returned invalid JSON") from exc
 
+        if self.output_format == "compact":
+            try:
+                result = expand_compact_result(result, sop_data, catalogue)
+            except ValueError as exc:
+                raise RuntimeError("LLM returned invalid compact JSON") from exc
+
+        return self._normalise_result(result, sop_data)
+
+    def _transform_with_deadline(
+        self,
+        sop_data: Dict[str, Any],
+        catalogue: List[Dict[str, Any]],
+        key: str,
+        request: Callable[[], str],
+        deadline_at: float,
+    ) -> Dict[str, Any]:
+        """
+        Run request() until deadline_at (time.monotonic()), then fill the
+        steps still unmapped with local fallbacks. See transform().
+
+        key identifies the request in the late-response cache.
+        """
+        raw_json = _load_late_response(key, self.late_cache_dir)
+
+        provenance = PROVENANCE_CACHED
+        reason = "step_not_returned"
+        if raw_json is None:
+            provenance = PROVENANCE_LLM
+            future = _submit_deadline_call(request)
+            timeout = max(0.0, deadline_at - time.monotonic() - _FALLBACK_RESERVE_S)
+            if future is None:
+                reason = "llm_saturated"
+            else:
+                try:
+                    raw_json = future.result(timeout=timeout)
+                except FutureTimeout:
+                    reason = "deadline_exceeded"
+                    future.add_done_callback(
+                        partial(_store_late_response, key, self.late_cache_dir)
+                    )
+                except Exception:  # any LLM/client failure degrades to fallback
+                    reason = "llm_error"
+
+        result: Optional[Dict[str, Any]] = None
+        if raw_json is not None:
+            try:
+                result = self._interpret(raw_json, sop_data, catalogue)
+            except RuntimeError:
+                reason = "invalid_response"
+                _drop_late_response(key, self.late_cache_dir)
+        if result is None:
+            result = self._normalise_result({"sop_id": None, "steps": []}, sop_data)
+
+        # Keep SOP step order; steps the model returned that are not in the
+        # parsed SOP are kept last
+        mapped = {s["step_number"]: s for s in result["steps"]}
+        matcher: Optional[CatalogueMatcher] = None
+        steps = []
+        for source in sop_data.get("steps", []) or []:
+            step = mapped.pop(str(source.get("step_number", "")), None)
+            if step is None:
+                if matcher is None:
+                    matcher = CatalogueMatcher(catalogue)
+                step = fallback_step(source, matcher, reason)
+            else:
+                step["provenance"] = provenance
+            steps.append(step)
+        for step in mapped.values():
+            step["provenance"] = provenance
+            steps.append(step)
+
+        result["steps"] = steps
+        return result
+
+    def transform_packed(
+        self,
+        sops: List[Dict[str, Any]],
+        catalogue: List[Dict[str, Any]],
+        token_budget: int = 8000,
+        on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+        on_error: Optional[Callable[[int, Exception], None]] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Map several SOPs, packing consecutive ones into shared requests.
+
+        SOPs are packed in order while the estimated prompt (SOP sections
+        plus one catalogue) stays within token_budget. Each SOP is delimited
+        by its sop_id in the prompt and in the output contract; the response
+        is split back into one result per SOP, each going through the same
+        normalisation as transform(). A pack whose response is unusable, and
+        any SOP missing from or malformed in it, is mapped again with one
+        transform() request per SOP.
+
+        Args:
+            sops: parsed SOPs as returned by parse_sop_document().
+            catalogue: atomic components from the catalogue loader.
+            token_budget: estimated prompt tokens allowed per packed request.
+            on_result: called with (sop_index, result) as each SOP completes.
+            on_error: if given, a SOP whose per-SOP fallback request fails is
+                      reported here (its result is None) instead of raising.
+
+        Returns:
+            One result per input SOP, in the same order. Counters for the
+            call are kept in self.last_pack_report.
+
+        Raises:
+            ValueError: if structured_output is enabled (its schema describes
+                        a single SOP), or as in transform() for compact
+                        output with ambiguous component ids.
+            RuntimeError: if a per-SOP fallback request fails and no on_error
+                          is given.
+        """
+        if self.structured_output:
+            raise ValueError("transform_packed does not support structured_output")
+        if self.output_format == "compact":
+            check_compact_catalogue(catalogue)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sops)
+        report = {"sops": len(sops), "packs": 0, "llm_calls": 0, "fallback_sops": 0}
+        self.last_pack_report = report
+
+        def finish(index: int, result: Dict[str, Any]) -> None:
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+
+        def transform_one(index: int) -> None:
+            report["llm_calls"] += 1
+            try:
+                result = self.transform(sops[index], catalogue)
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                on_error(index, exc)
+                return
+            finish(index, result)
+
+        for pack in self._plan_packs(sops, catalogue, token_budget):
+            report["packs"] += 1
+            if len(pack) == 1:
+                transform_one(pack[0][1])
+                continue
+
+            report["llm_calls"] += 1
+            mapped = self._transform_pack(
+                [(key, sops[index]) for key, index in pack], catalogue
+            )
+            for key, index in pack:
+                result = mapped.get(key)
+                if result is None:
+                    report["fallback_sops"] += 1
+                    transform_one(index)
+                else:
+                    finish(index, result)
+
+        return results
+
+    def _plan_packs(
+        self,
+        sops: List[Dict[str, Any]],
+        catalogue: List[Dict[str, Any]],
+        token_budget: int,
+    ) -> List[List[Tuple[str, int]]]:
+        """Group consecutive SOPs into packs of (pack key, SOP index)."""
+        catalogue_tokens = (
+            len(build_packed_user_prompt([], catalogue)) // CHARS_PER_TOKEN
+        )
+
+        packs: List[List[Tuple[str, int]]] = []
+        current: List[Tuple[str, int]] = []
+        used = catalogue_tokens
+        seen: set = set()
+        for index, sop in enumerate(sops):
+            # Pack keys delimit the SOPs in the request and must be unique
+            sop_id = (sop.get("sop_card", {}) or {}).get("SCHRODERS_ID")
+            key = str(sop_id) if sop_id else f"SOP_{index + 1}"
+            if key in seen:
+                key = f"{key}#{index + 1}"
+            seen.add(key)
+
+            tokens = len(build_packed_user_prompt([(key, sop)], [])) // CHARS_PER_TOKEN
+            if current and used + tokens > token_budget:
+                packs.append(current)
+                current, used = [], catalogue_tokens
+            current.append((key, index))
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+
+    def _transform_pack(
+        self,
+        pack: List[Tuple[str, Dict[str, Any]]],
+        catalogue: List[Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Map a pack of (key, SOP) in one request.
+
+        Returns:
+            {key: normalised result} for the SOPs that came back usable; an
+            unusable response yields an empty dict.
+        """
+        base_prompt = (
+            build_compact_system_prompt()
+            if self.output_format == "compact"
+            else build_system_prompt()
+        )
+        instructions = build_packed_system_prompt(base_prompt)
+        user_prompt = build_packed_user_prompt(pack, catalogue)
+
+        try:
+            raw_json = self._scheduled(
+                lambda: self.llm.call(user_prompt, instructions=instructions),
+                cost=len(pack),
+            )
+            entries = parse_llm_json(raw_json).get("sops")
+        except Exception:  # failed request or invalid JSON: per-SOP fallback
+            return {}
+        if not isinstance(entries, list):
+            return {}
+
+        by_key = {str(e.get("sop_id")): e for e in entries if isinstance(e, dict)}
+        mapped: Dict[str, Dict[str, Any]] = {}
+        for key, sop_data in pack:
+            entry = by_key.get(key)
+            if entry is None:
+                continue
+            try:
+                if self.output_format == "compact":
+                    result = expand_compact_result(entry, sop_data, catalogue)
+                else:
+                    result = dict(entry)
+                # The pack key is not necessarily the SOP id
+                result["sop_id"] = None
+                result = self._normalise_result(result, sop_data)
+            except (RuntimeError, ValueError):
+                continue
+
+            # Guard against steps leaking between SOPs of the pack
+            expected = {
+                str(s.get("step_number", "")) for s in sop_data.get("steps", [])
+            }
+            returned = {s["step_number"] for s in result["steps"]}
+            if returned - expected or (expected and not returned):
+                continue
+            mapped[key] = result
+        return mapped
+
+    def _normalise_result(
+        self, result: Any, sop_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Validate and normalise a parsed LLM result in place (steps 4-6 below).
+
+        Raises:
+            RuntimeError: if the result is structurally inconsistent.
+        """
         if not isinstance(result, dict):
             raise RuntimeError("LLM response is not a JSON object (expected dict)")
 
@@ -1,9 +1,62 @@
 """
-General-purpose file utilities (if needed later).
+General-purpose file utilities.
 """
 
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
 
 def ensure_exists(path: str) -> None:
     """Placeholder for file existence checks."""
     # TODO: Implement proper validation
     pass
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Write data as JSON so that readers never see a partial file.
+
+    The JSON is written to a temporary file in the same directory, flushed
+    to disk, then moved over the target with os.replace (atomic on POSIX
+    and Windows).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def sha256_file(path: str) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stem_collisions(paths: List[str]) -> Dict[str, List[str]]:
+    """
+    Return the file stems shared by several distinct files, with their paths.
+
+    Outputs named <stem>.json would overwrite each other for these files.
+    The same file listed twice is not a collision.
+    """
+    by_stem: Dict[str, List[str]] = {}
+    for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+        by_stem.setdefault(Path(path).stem, []).append(path)
+    return {stem: group for stem, group in by_stem.items() if len(group) > 1}
@@ -0,0 +1,18 @@
+"""Builders for the result dicts shared by several test modules."""
+
+from typing import Any, Dict, Optional
+
+
+def make_action(
+    component_id: Optional[str],
+    name: str,
+    category: Optional[str] = None,
+    **parameters: Any,
+) -> Dict[str, Any]:
+    """Return one atomic action as found in a transformer result."""
+    return {
+        "component_id": component_id,
+        "component_name": name,
+        "category": category,
+        "parameters": parameters,
+    }
@@ -0,0 +1,395 @@
+import json
+
+from sop2atomic.batch.batch_runner import run_batch
+from sop2atomic.batch.step_dedup import adapt_mapped_step, cluster_texts
+from sop2atomic.models.sop_models import SopDocument
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+CATALOGUE = [
+    {
+        "id": "1,5",
+        "id_name": "SAVE_FILE",
+        "category": "Files & Folders",
+        "description": "Save a file to a folder",
+        "parameters": ["file_name", "path"],
+    }
+]
+
+
+class RecordingLLMClient:
+    """
+    Fake client that maps every step in the prompt to SAVE_FILE, extracting
+    the first *.xlsx word as file_name, and records each prompt.
+    """
+
+    def __init__(self, model: str = "gpt-5.1"):
+        self.model = model
+        self.prompts = []
+
+    def call(self, user_prompt: str, instructions: str = None) -> str:
+        self.prompts.append(user_prompt)
+        if "=== BEGIN SOP " in user_prompt:
+            sections = user_prompt.split("=== BEGIN SOP ")[1:]
+            return json.dumps(
+                {
+                    "sops": [
+                        {"sop_id": s.split(" ===", 1)[0], "steps": self._steps(s)}
+                        for s in sections
+                    ]
+                }
+            )
+        return json.dumps({"sop_id": None, "steps": self._steps(user_prompt)})
+
+    @staticmethod
+    def _steps(text: str) -> list:
+        steps = []
+        for line in text.splitlines():
+            if line.startswith("Step "):
+                number, action = line[len("Step ") :].split(": ", 1)
+                file_name = next(
+                    (w.strip(".") for w in action.split() if ".xlsx" in w), None
+                )
+                steps.append(
+                    {
+                        "step_number": number,
+                        "original_action": action,
+                        "notes": "",
+                        "atomic_actions": [
+                            {
+                                "component_id": "1,5",
+                                "component_name": "SAVE_FILE",
+                                "category": "Files & Folders",
+                                "parameters": {
+                                    "file_name": file_name,
+                                    "path": "S:\\Shared",
+                                },
+                            }
+                        ],
+                    }
+                )
+        return steps
+
+
+def test_cluster_texts_groups_near_duplicates_only():
+    texts = [
+        "Save the report pack_A.xlsx to the shared drive.",
+        "Email the pack to the client.",
+        "Save the report pack_B.xlsx to the shared drive",
+        "Save the report pack_A.xlsx to the shared drive.",
+    ]
+
+    clusters = cluster_texts(texts)
+
+    assert [0, 2, 3] in clusters
+    assert [1] in clusters
+
+
+def test_adapt_mapped_step_re_extracts_differing_parameters():
+    mapped = {
+        "step_number": "1",
+        "original_action": "Save the report pack_A.xlsx to the shared drive.",
+        "notes": "",
+        "atomic_actions": [
+            {
+                "component_id": "1,5",
+                "component_name": "SAVE_FILE",
+                "category": "Files & Folders",
+                "parameters": {"file_name": "pack_A.xlsx", "path": "S:\\Shared"},
+            }
+        ],
+    }
+    instance = {
+        "step_number": "7",
+        "action": "Save the report pack_B.xlsx to the shared drive.",
+        "notes": "",
+    }
+
+    adapted = adapt_mapped_step(
+        mapped, "Save the report pack_A.xlsx to the shared drive. ", instance
+    )
+
+    assert adapted["step_number"] == "7"
+    assert adapted["original_action"] == instance["action"]
+    assert adapted["atomic_actions"][0]["parameters"] == {
+        "file_name": "pack_B.xlsx",
+        "path": "S:\\Shared",
+    }
+    # The representative mapping is left untouched
+    assert mapped["atomic_actions"][0]["parameters"]["file_name"] == "pack_A.xlsx"
+
+
+def _send_step(text, **parameters):
+    return {
+        "step_number": "1",
+        "original_action": text,
+        "notes": "",
+        "atomic_actions": [
+            {
+                "component_id": "2,1",
+                "component_name": "SEND_EMAIL",
+                "category": "Email Operations",
+                "parameters": parameters,
+            }
+        ],
+    }
+
+
+def test_adapt_mapped_step_substitutes_whole_tokens_only():
+    # Long tokens are only replaced where they stand alone
+    mapped = _send_step(
+        "Email the pack to desk_alpha.",
+        to="desk_alpha",
+        subject="Pack for desk_alpha_old and desk_alpha",
+    )
+    instance = {
+        "step_number": "2",
+        "action": "Email the pack to desk_beta.",
+        "notes": "",
+    }
+    adapted = adapt_mapped_step(mapped, "Email the pack to desk_alpha. ", instance)
+    assert adapted["atomic_actions"][0]["parameters"] == {
+        "to": "desk_beta",
+        "subject": "Pack for desk_alpha_old and desk_beta",
+    }
+
+    # Short differing tokens that occur in a parameter are not guessed:
+    # the instance is sent back to the LLM instead
+    mapped = _send_step("Email the pack to desk 1.", subject="Pack 1 for Q1 2021")
+    instance = {"step_number": "2", "action": "Email the pack to desk 2.", "notes": ""}
+    assert adapt_mapped_step(mapped, "Email the pack to desk 1. ", instance) is None
+
+    mapped = _send_step("Archive to A Funds/Archive.", path="A Funds/Archive")
+    instance = {
+        "step_number": "2",
+        "action": "Archive to B Funds/Archive.",
+        "notes": "",
+    }
+    assert adapt_mapped_step(mapped, "Archive to A Funds/Archive. ", instance) is None
+
+    # ...and never touch characters inside other words: "1" occurs in no
+    # parameter value, so the difference cannot be carried over at all
+    mapped = _send_step("Email the pack to desk 1.", subject="Quarterly Q1 2021")
+    instance = {"step_number": "2", "action": "Email the pack to desk 2.", "notes": ""}
+    assert adapt_mapped_step(mapped, "Email the pack to desk 1. ", instance) is None
+
+
+def test_adapt_mapped_step_refuses_differences_outside_parameters():
+    text = (
+        "Open the daily cash reconciliation workbook for the European equity "
+        "funds from the shared operations drive before the morning cut-off."
+    )
+    mapped = {
+        "step_number": "1",
+        "original_action": text,
+        "notes": "",
+        "atomic_actions": [
+            {
+                "component_id": "2,1",
+                "component_name": "OPEN_FILE",
+                "category": "Files & Folders",
+                "parameters": {"path": "S:\\Shared"},
+            }
+        ],
+    }
+    instance = {
+        "step_number": "4",
+        "action": text.replace("Open", "Delete"),
+        "notes": "",
+    }
+
+    # Near-duplicates that differ only in the verb must not copy OPEN_FILE
+    assert cluster_texts([text, instance["action"]], threshold=0.8) == [[0, 1]]
+    assert adapt_mapped_step(mapped, text + " ", instance) is None
+
+
+def test_run_batch_maps_shared_steps_once():
+    sops = [
+        {
+            "sop_card": {"SCHRODERS_ID": "SOP_A"},
+            "steps": [
+                {
+                    "step_number": "1",
+                    "action": "Save the report pack_A.xlsx to the shared drive.",
+                    "notes": "",
+                },
+            ],
+        },
+        {
+            "sop_card": {"SCHRODERS_ID": "SOP_B"},
+            "steps": [
+                {
+                    "step_number": "1",
+                    "action": "Refresh the Bloomberg prices.",
+                    "notes": "",
+                },
+                {
+                    "step_number": "2",
+                    "action": "Save the report pack_B.xlsx to the shared drive.",
+                    "notes": "",
+                },
+            ],
+        },
+    ]
+    client = RecordingLLMClient()
+    transformer = SopToAtomicTransformer(llm_client=client)
+
+    results, report = run_batch(sops, CATALOGUE, transformer)
+
+    # One dedicated request for the cluster + one for SOP_B's unique step;
+    # SOP_A is fully covered by the cluster mapping.
+    assert len(client.prompts) == 2
+    assert "Refresh the Bloomberg" not in client.prompts[0]
+    assert "Save the report" not in client.prompts[1]
+
+    assert results[0]["sop_id"] == "SOP_A"
+    assert results[1]["sop_id"] == "SOP_B"
+    assert [s["step_number"] for s in results[1]["steps"]] == ["1", "2"]
+    params_a = results[0]["steps"][0]["atomic_actions"][0]["parameters"]
+    params_b = results[1]["steps"][1]["atomic_actions"][0]["parameters"]
+    assert params_a["file_name"] == "pack_A.xlsx"
+    assert params_b["file_name"] == "pack_B.xlsx"
+
+    assert report["steps_total"] == 3
+    assert report["clusters"] == 1
+    assert report["step_mappings_saved"] == 1
+    assert report["llm_calls"] == 2
+    assert report["llm_calls_saved"] == 0
+
+    # SopDocument records (as held by resumable batches) give the same result
+    client = RecordingLLMClient()
+    records = [SopDocument.from_dict(sop) for sop in sops]
+    assert run_batch(records, CATALOGUE, SopToAtomicTransformer(llm_client=client)) == (
+        results,
+        report,
+    )
+    assert len(client.prompts) == 2
+
+
+class FlakyDedupLLMClient(RecordingLLMClient):
+    """Fails the cross-SOP dedup request with a network error."""
+
+    def call(self, user_prompt: str, instructions: str = None) -> str:
+        if "BATCH_DEDUP" in user_prompt:
+            self.prompts.append(user_prompt)
+            raise ConnectionError("connection reset by peer")
+        return super().call(user_prompt, instructions)
+
+
+def test_run_batch_falls_back_to_sop_requests_when_dedup_request_fails():
+    sops = [
+        {
+            "sop_card": {"SCHRODERS_ID": f"SOP_{name}"},
+            "steps": [
+                {
+                    "step_number": "1",
+                    "action": f"Save the report pack_{name}.xlsx to the shared drive.",
+                    "notes": "",
+                }
+            ],
+        }
+        for name in ("A", "B")
+    ]
+    client = FlakyDedupLLMClient()
+
+    results, report = run_batch(
+        sops, CATALOGUE, SopToAtomicTransformer(llm_client=client)
+    )
+
+    assert report["dedup_requests_failed"] == 1
+    params = [r["steps"][0]["atomic_actions"][0]["parameters"] for r in results]
+    assert [p["file_name"] for p in params] == ["pack_A.xlsx", "pack_B.xlsx"]
+
+
+def test_run_batch_packs_small_sops_into_one_request():
+    sops = [
+        {
+            "sop_card": {"SCHRODERS_ID": f"SOP_{i}"},
+            "steps": [
+                {
+                    "step_number": "1",
+                    "action": f"Save the report {name}.xlsx to the shared drive.",
+                    "notes": "",
+                },
+            ],
+        }
+        for i, name in enumerate(["alpha", "beta", "gamma"])
+    ]
+    client = RecordingLLMClient()
+    transformer = SopToAtomicTransformer(llm_client=client)
+
+    results, report = run_batch(
+        sops, CATALOGUE, transformer, dedup=False, pack_token_budget=10_000
+    )
+
+    assert len(client.prompts) == 1
+    assert client.prompts[0].count("ATOMIC COMPONENT CATALOGUE") == 1
+    assert [r["sop_id"] for r in results] == ["SOP_0", "SOP_1", "SOP_2"]
+    params = results[2]["steps"][0]["atomic_actions"][0]["parameters"]
+    assert params["file_name"] == "gamma.xlsx"
+    assert report["llm_calls"] == 1
+    assert report["llm_calls_saved"] == 2
+
+
+class DictChunkStore:
+    def __init__(self):
+        self.chunks = {}
+
+    def get(self, key):
+        return self.chunks.get(key)
+
+    def put(self, key, value):
+        self.chunks[key] = value
+
+
+def test_run_batch_chunks_and_checkpoints_representatives():
+    actions = [
+        "Save the report {}_pack.xlsx to the shared drive.",
+        "Refresh the Bloomberg prices in {}_prices.xlsx.",
+        "Email the summary workbook {}_summary.xlsx to the desk.",
+    ]
+    sops = [
+        {
+            "sop_card": {"SCHRODERS_ID": f"SOP_{name}"},
+            "steps": [
+                {"step_number": str(n), "action": a.format(name), "notes": ""}
+                for n, a in enumerate(actions, start=1)
+            ],
+        }
+        for name in ("alpha", "beta")
+    ]
+    store = DictChunkStore()
+    client = RecordingLLMClient()
+    transformer = SopToAtomicTransformer(llm_client=client)
+
+    results, report = run_batch(
+        sops, CATALOGUE, transformer, chunk_store=store, dedup_chunk_steps=2
+    )
+
+    # Three clusters: one request of two representatives, one of one
+    assert report["clusters"] == 3
+    assert report["dedup_requests"] == 2
+    assert [p.count("Step ") for p in client.prompts] == [2, 1]
+    # One checkpoint per distinct clustered step text
+    assert len(store.chunks) == 6
+    params = results[1]["steps"][0]["atomic_actions"][0]["parameters"]
+    assert params["file_name"] == "beta_pack.xlsx"
+
+    # Re-running uses the checkpointed mappings
+    client.prompts.clear()
+    _, report = run_batch(
+        sops, CATALOGUE, transformer, chunk_store=store, dedup_chunk_steps=2
+    )
+    assert report["dedup_requests"] == 0
+    assert client.prompts == []
+
+    # So does a resume where SOP_alpha is done and the clusters and chunks
+    # are built from other representatives
+    gamma = json.loads(json.dumps(sops[1]).replace("beta", "gamma"))
+    client.prompts.clear()
+    results, report = run_batch(
+        [sops[1], gamma], CATALOGUE, transformer, chunk_store=store
+    )
+    assert report["dedup_requests"] == 0
+    assert client.prompts == []
+    params = results[1]["steps"][0]["atomic_actions"][0]["parameters"]
+    assert params["file_name"] == "gamma_pack.xlsx"
@@ -0,0 +1,204 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import sop2atomic.transformers.sop_to_atomic_transformer as tr_mod
+from sop2atomic.catalogue.catalogue_matcher import CatalogueMatcher
+from sop2atomic.cli import main as cli_main
+from sop2atomic.transformers.cascade_transformer import CascadeTransformer
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+from tests.helpers import make_action
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+SHIPPED_CATALOGUE = (
+    Path(__file__).parent.parent / "examples" / "Atomic_Components_List_v1.xlsx"
+)
+
+CATALOGUE = [
+    {
+        "id": "1,1",
+        "id_name": "OPEN_FOLDER",
+        "category": "Files & Folders",
+        "description": "Open a local or network folder",
+        "parameters": ["path"],
+    },
+    {
+        "id": "4,1",
+        "id_name": "SEND_EMAIL",
+        "category": "Email Operations",
+        "description": "Send the drafted email to its recipients",
+        "parameters": ["to"],
+    },
+]
+
+SOP_DATA = {
+    "sop_card": {"SCHRODERS_ID": "TEST001"},
+    "steps": [
+        {"step_number": "1", "action": "Open the reports folder.", "notes": ""},
+        {"step_number": "2", "action": "Send the email to the client.", "notes": ""},
+        {"step_number": "3", "action": "Print the pack.", "notes": ""},
+    ],
+}
+
+
+class ScriptedLLMClient:
+    """Fake client returning a fixed set of mapped steps, filtered to the prompt."""
+
+    def __init__(self, model, steps):
+        self.model = model
+        self.steps = steps
+        self.prompts = []
+
+    def call(self, user_prompt: str) -> str:
+        self.prompts.append(user_prompt)
+        steps = [s for s in self.steps if f"Step {s['step_number']}:" in user_prompt]
+        return json.dumps({"sop_id": None, "steps": steps})
+
+
+def test_catalogue_matcher_ranks_specific_component_first():
+    matcher = CatalogueMatcher(CATALOGUE)
+
+    ranked = matcher.rank("Send the email to the client", top_k=2)
+
+    assert ranked[0][0]["id_name"] == "SEND_EMAIL"
+    assert 0.0 < ranked[0][1] <= 1.0
+    assert matcher.rank("", top_k=2) == []
+
+
+def test_cascade_escalates_only_uncertain_steps():
+    """
+    Step 1 is confidently mapped by the small model. Step 2 uses the wrong
+    component (disagrees with the lexical matcher) and step 3 is a
+    MISSING_COMPONENT, so only steps 2 and 3 reach the large model.
+    """
+    small_client = ScriptedLLMClient(
+        "small",
+        [
+            {
+                "step_number": "1",
+                "atomic_actions": [make_action("1,1", "OPEN_FOLDER", path="X:")],
+            },
+            {
+                "step_number": "2",
+                "atomic_actions": [make_action("1,1", "OPEN_FOLDER", path=None)],
+            },
+            {
+                "step_number": "3",
+                "atomic_actions": [make_action(None, "MISSING_COMPONENT")],
+            },
+        ],
+    )
+    large_client = ScriptedLLMClient(
+        "large",
+        [
+            {
+                "step_number": "2",
+                "atomic_actions": [make_action("4,1", "SEND_EMAIL", to="client")],
+            },
+            {
+                "step_number": "3",
+                "atomic_actions": [make_action(None, "MISSING_COMPONENT")],
+            },
+        ],
+    )
+    cascade = CascadeTransformer(
+        small=SopToAtomicTransformer(model="small", llm_client=small_client),
+        large=SopToAtomicTransformer(model="large", llm_client=large_client),
+    )
+
+    result = cascade.transform(SOP_DATA, CATALOGUE)
+
+    assert result["sop_id"] == "TEST001"
+    assert [s["step_number"] for s in result["steps"]] == ["1", "2", "3"]
+    assert result["steps"][0]["atomic_actions"][0]["parameters"] == {"path": "X:"}
+    assert result["steps"][1]["atomic_actions"][0]["component_name"] == "SEND_EMAIL"
+
+    # The large model only saw the escalated steps
+    assert len(large_client.prompts) == 1
+    assert "Step 1:" not in large_client.prompts[0]
+    assert "Step 2:" in large_client.prompts[0]
+
+    report = cascade.last_report
+    assert report["steps_total"] == 3
+    assert report["steps_small"] == 1
+    assert report["steps_escalated"] == 2
+    assert report["escalations"] == {
+        "2": ["retrieval_disagreement"],
+        "3": ["missing_component"],
+    }
+    assert report["large_latency_s"] is not None
+    assert report["large_only_basis"] == (
+        "extrapolated linearly from 2 escalated of 3 steps"
+    )
+    assert report["estimated_large_only_cost_units"] > report["estimated_cost_units"]
+    assert report["estimated_cost_saved_pct"] > 0
+
+
+def test_cascade_skips_large_model_when_small_is_confident():
+    small_client = ScriptedLLMClient(
+        "small",
+        [
+            {
+                "step_number": "1",
+                "atomic_actions": [make_action("1,1", "OPEN_FOLDER", path="X:")],
+            }
+        ],
+    )
+    large_client = ScriptedLLMClient("large", [])
+    cascade = CascadeTransformer(
+        small=SopToAtomicTransformer(model="small", llm_client=small_client),
+        large=SopToAtomicTransformer(model="large", llm_client=large_client),
+    )
+    sop = {"sop_card": {}, "steps": SOP_DATA["steps"][:1]}
+
+    cascade.transform(sop, CATALOGUE)
+
+    assert large_client.prompts == []
+    report = cascade.last_report
+    assert report["steps_escalated"] == 0
+    # Nothing was observed of the large model: no savings are claimed
+    assert report["large_only_basis"] == "unmeasured"
+    assert report["large_latency_s"] is None
+    assert report["estimated_large_only_latency_s"] is None
+    assert report["estimated_latency_saved_s"] is None
+    assert report["estimated_large_only_cost_units"] is None
+    assert report["estimated_cost_saved_pct"] is None
+    assert report["estimated_cost_units"] > 0
+
+
+def test_cascade_passes_structured_output_to_both_tiers(monkeypatch):
+    monkeypatch.setattr(tr_mod, "LLMClient", lambda model: object())
+
+    cascade = CascadeTransformer(structured_output=True)
+    assert cascade.small.structured_output and cascade.large.structured_output
+
+    # ...and the CLI hands --structured-output to the cascade
+    built = {}
+
+    class Stop(Exception):
+        pass
+
+    def recording_cascade(**kwargs):
+        built.update(kwargs)
+        raise Stop
+
+    monkeypatch.setattr(cli_main, "CascadeTransformer", recording_cascade)
+    with pytest.raises(Stop):
+        cli_main.main(
+            [
+                str(FIXTURES_DIR / "sample_sop_simple.docx"),
+                str(SHIPPED_CATALOGUE),
+                "--cascade-small-model",
+                "m",
+                "--structured-output",
+            ]
+        )
+    assert built["structured_output"] is True
+
+
+def test_cli_rejects_deadline_with_the_cascade():
+    with pytest.raises(SystemExit):
+        cli_main.main(
+            ["sop.docx", "cat.xlsx", "--cascade-small-model", "m", "--deadline", "5"]
+        )
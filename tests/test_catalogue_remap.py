@@ -0,0 +1,208 @@
+import json
+import shutil
+from pathlib import Path
+
+from sop2atomic.batch.catalogue_remap import mapping_versions, run_catalogue_remap
+from sop2atomic.catalogue.catalogue_diff import diff_catalogues, find_affected_steps
+from tests.helpers import make_action
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+OLD_CATALOGUE = [
+    {
+        "id": "1,1",
+        "id_name": "OPEN_FOLDER",
+        "category": "Files & Folders",
+        "description": "Open a local or network folder",
+        "parameters": ["path"],
+    },
+    {
+        "id": "2,1",
+        "id_name": "SEND_EMAIL",
+        "category": "Email Operations",
+        "description": "Send an e-mail",
+        "parameters": ["to"],
+    },
+]
+
+NEW_CATALOGUE = [
+    OLD_CATALOGUE[0],
+    {**OLD_CATALOGUE[1], "parameters": ["to", "subject"]},
+    {
+        "id": "3,1",
+        "id_name": "DOWNLOAD_ATTACHMENT",
+        "category": "Email Operations",
+        "description": "Download an instruction file attachment and save it",
+        "parameters": ["path"],
+    },
+]
+
+
+# Mapping of the simple SOP fixture (steps 1-3) made with OLD_CATALOGUE
+STORED = {
+    "sop_id": "TEST001",
+    "steps": [
+        {
+            "step_number": "1",
+            "original_action": "Open the shared mailbox and locate the latest "
+            "client instruction.",
+            "notes": "",
+            "atomic_actions": [make_action("1,1", "OPEN_FOLDER", path="X:\\Mailbox")],
+        },
+        {
+            "step_number": "2",
+            "original_action": "Download the instruction file and save it to the "
+            "working directory.",
+            "notes": "",
+            "atomic_actions": [make_action(None, "MISSING_COMPONENT", description="d")],
+        },
+        {
+            "step_number": "3",
+            "original_action": "Notify the operations team that the instruction "
+            "has been received.",
+            "notes": "",
+            "atomic_actions": [make_action("2,1", "SEND_EMAIL", to="ops")],
+        },
+    ],
+}
+
+
+class RecordingTransformer:
+    def __init__(self):
+        self.calls = []
+
+    def transform(self, sop_data, catalogue):
+        self.calls.append([s["step_number"] for s in sop_data["steps"]])
+        return {
+            "sop_id": "TEST001",
+            "steps": [
+                {
+                    "step_number": s["step_number"],
+                    "original_action": s["action"],
+                    "notes": s["notes"],
+                    "atomic_actions": [make_action("3,1", "DOWNLOAD_ATTACHMENT")],
+                }
+                for s in sop_data["steps"]
+            ],
+        }
+
+
+def test_diff_and_affected_steps():
+    diff = diff_catalogues(OLD_CATALOGUE, NEW_CATALOGUE)
+    assert diff == {
+        "added": ["3,1"],
+        "removed": [],
+        "changed": {"2,1": ["parameters"]},
+        "shared_ids": [],
+    }
+
+    sop_data = {
+        "sop_card": {},
+        "steps": [
+            {"step_number": s["step_number"], "action": s["original_action"]}
+            for s in STORED["steps"]
+        ],
+    }
+    affected = find_affected_steps(STORED, sop_data, diff, NEW_CATALOGUE)
+
+    # Step 1 uses an unchanged component and is unrelated to the new one
+    assert affected == {
+        "2": ["missing_component", "close_to_new_component"],
+        "3": ["changed_component"],
+    }
+
+
+def test_diff_tells_apart_components_sharing_an_id():
+    template = {
+        "id": "4.1",
+        "id_name": "OPEN_EMAIL_TEMPLATE",
+        "category": "Email Operations",
+        "description": "Open an e-mail template",
+        "parameters": ["template"],
+    }
+    footer = {**template, "id_name": "COPY_EMAIL_FOOTER", "parameters": []}
+    old = [template, footer]
+    new = [template, {**footer, "description": "Copy the standard footer"}]
+
+    diff = diff_catalogues(old, new)
+    assert diff == {
+        "added": [],
+        "removed": [],
+        "changed": {"4.1 (COPY_EMAIL_FOOTER)": ["description"]},
+        "shared_ids": ["4.1"],
+    }
+
+    result = {
+        "steps": [
+            {
+                "step_number": "1",
+                "atomic_actions": [make_action("4.1", "OPEN_EMAIL_TEMPLATE")],
+            },
+            {
+                "step_number": "2",
+                "atomic_actions": [make_action("4.1", "COPY_EMAIL_FOOTER")],
+            },
+        ]
+    }
+    sop_data = {
+        "steps": [
+            {"step_number": "1", "action": "Open the client template."},
+            {"step_number": "2", "action": "Add the signature block."},
+        ]
+    }
+    assert find_affected_steps(result, sop_data, diff, new) == {
+        "2": ["changed_component"]
+    }
+
+
+def test_remap_sends_affected_steps_only_and_writes_new_version(tmp_path):
+    sop_file = tmp_path / "sample_sop_simple.docx"
+    shutil.copy(FIXTURES_DIR / "sample_sop_simple.docx", sop_file)
+    results_dir = tmp_path / "out"
+    results_dir.mkdir()
+    (results_dir / "sample_sop_simple.json").write_text(json.dumps(STORED))
+
+    transformer = RecordingTransformer()
+    report = run_catalogue_remap(
+        [str(sop_file)],
+        str(results_dir),
+        OLD_CATALOGUE,
+        NEW_CATALOGUE,
+        lambda: transformer,
+    )
+
+    assert transformer.calls == [["2", "3"]]
+    assert report["steps_total"] == 3
+    assert report["steps_remapped"] == 2
+    assert [v for v, _ in mapping_versions(str(results_dir), "sample_sop_simple")] == [
+        1,
+        2,
+    ]
+    v2 = json.loads((results_dir / "sample_sop_simple.v2.json").read_text())
+    # The result keeps the transformer schema; the fingerprint is a sidecar
+    assert set(v2) == {"sop_id", "steps"}
+    meta = json.loads((results_dir / "sample_sop_simple.v2.meta.json").read_text())
+    assert set(meta) == {"catalogue_fingerprint"}
+    assert [s["step_number"] for s in v2["steps"]] == ["1", "2", "3"]
+    assert v2["steps"][0] == STORED["steps"][0]
+    assert v2["steps"][1]["atomic_actions"][0]["component_name"] == (
+        "DOWNLOAD_ATTACHMENT"
+    )
+
+    # Unchanged catalogue: nothing to do, no transformer built
+    def must_not_build():
+        raise AssertionError("no LLM call expected")
+
+    # Re-running the same remap: v2 already reflects NEW_CATALOGUE
+    report = run_catalogue_remap(
+        [str(sop_file)], str(results_dir), OLD_CATALOGUE, NEW_CATALOGUE, must_not_build
+    )
+    assert report["sops_up_to_date"] == 1
+    assert report["sops_affected"] == 0
+    assert len(mapping_versions(str(results_dir), "sample_sop_simple")) == 2
+
+    report = run_catalogue_remap(
+        [str(sop_file)], str(results_dir), NEW_CATALOGUE, NEW_CATALOGUE, must_not_build
+    )
+    assert report["steps_remapped"] == 0
+    assert len(mapping_versions(str(results_dir), "sample_sop_simple")) == 2
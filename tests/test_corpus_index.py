@@ -0,0 +1,122 @@
+import json
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from sop2atomic.cli.index_cli import index_main, query_main
+from sop2atomic.index.corpus_index import CorpusIndex
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def _mapping(sop_id, component_name, step_number="1"):
+    return {
+        "sop_id": sop_id,
+        "steps": [
+            {
+                "step_number": step_number,
+                "original_action": "",
+                "notes": "",
+                "atomic_actions": [
+                    {
+                        "component_id": "9,1",
+                        "component_name": component_name,
+                        "category": "Clipboard",
+                        "parameters": {},
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def test_index_answers_component_text_and_card_lookups(tmp_path):
+    sop_file = tmp_path / "sample_sop_simple.docx"
+    shutil.copy(FIXTURES_DIR / "sample_sop_simple.docx", sop_file)
+    mapping_file = tmp_path / "sample_sop_simple.json"
+    mapping_file.write_text(json.dumps(_mapping("TEST001", "CLIPBOARD_PASTE", "2")))
+
+    index = CorpusIndex(str(tmp_path / "corpus.sqlite"))
+    assert index.index_file(str(sop_file), str(mapping_file))
+    assert not index.index_file(str(sop_file), str(mapping_file))
+
+    uses = index.steps_using_component("clipboard_paste")
+    assert [(u["sop_id"], u["step_number"]) for u in uses] == [("TEST001", "2")]
+    assert index.steps_using_component("9,1") == uses
+
+    hits = index.search_steps("shared mailbox")
+    assert [h["step_number"] for h in hits] == ["1"]
+    assert index.search_steps("bloomberg") == []
+
+    cards = index.sops_by_card("client", "test")
+    assert [c["sop_id"] for c in cards] == ["TEST001"]
+    assert index.sops_by_card("REPORT_NAME", "client") == []
+
+    # A changed mapping is picked up and replaces the old actions
+    mapping_file.write_text(json.dumps(_mapping("TEST001", "CLIPBOARD_COPY")))
+    assert index.index_file(str(sop_file), str(mapping_file))
+    assert index.steps_using_component("CLIPBOARD_PASTE") == []
+    assert index.stats() == {"sops": 1, "steps": 3, "actions": 1}
+
+    index.remove(str(sop_file.resolve()))
+    assert index.search_steps("shared mailbox") == []
+    assert index.stats() == {"sops": 0, "steps": 0, "actions": 0}
+
+
+def test_lookups_stay_fast_on_a_large_corpus(tmp_path):
+    index = CorpusIndex(str(tmp_path / "corpus.sqlite"))
+    for i in range(2000):
+        sop_data = {
+            "sop_card": {"SCHRODERS_ID": f"S{i}", "CLIENT": f"Client {i % 40}"},
+            "steps": [
+                {
+                    "step_number": str(n),
+                    "action": (
+                        f"Export the report {n} from Bloomberg"
+                        if (i + n) % 97 == 0
+                        else f"Open the folder for run {n}"
+                    ),
+                    "notes": "",
+                }
+                for n in range(1, 11)
+            ],
+        }
+        component = "CLIPBOARD_PASTE" if i % 500 == 0 else "OPEN_FOLDER"
+        index.index_document(f"sop{i}", "h", sop_data, _mapping(f"S{i}", component))
+
+    started = time.perf_counter()
+    uses = index.steps_using_component("CLIPBOARD_PASTE")
+    hits = index.search_steps("bloomberg", limit=1000)
+    cards = index.sops_by_card("CLIENT", "Client 7")
+    elapsed = time.perf_counter() - started
+
+    assert len(uses) == 4
+    assert len(hits) == sum(
+        1 for i in range(2000) for n in range(1, 11) if (i + n) % 97 == 0
+    )
+    assert len(cards) == 50
+    assert elapsed < 1.0
+
+
+@pytest.mark.parametrize(
+    "lookup", [["--text", ""], ["--text", "  "], ["--card", "CLIENT="], ["--card", "x"]]
+)
+def test_query_rejects_empty_search_text(tmp_path, capsys, lookup):
+    with pytest.raises(SystemExit) as exc_info:
+        query_main(["--db", str(tmp_path / "index.sqlite")] + lookup)
+    assert exc_info.value.code == 2
+    assert "usage:" in capsys.readouterr().err
+
+
+def test_index_skips_unparsable_sops_and_indexes_the_rest(tmp_path, capsys):
+    broken = tmp_path / "broken.docx"
+    broken.write_text("not a docx")
+    db = str(tmp_path / "index.sqlite")
+
+    index_main(["--db", db, str(broken), str(FIXTURES_DIR / "sample_sop_simple.docx")])
+
+    err = capsys.readouterr().err
+    assert f"Skipping {broken}" in err
+    assert "Indexed 1 SOP(s), 0 unchanged, 1 failed." in err
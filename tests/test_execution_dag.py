@@ -0,0 +1,88 @@
+import time
+
+from sop2atomic.analysis.execution_dag import build_execution_dag
+from tests.helpers import make_action
+
+
+def _result(*steps):
+    return {
+        "sop_id": "TEST001",
+        "steps": [
+            {
+                "step_number": str(i),
+                "original_action": "",
+                "notes": "",
+                "atomic_actions": actions,
+            }
+            for i, actions in enumerate(steps, start=1)
+        ],
+    }
+
+
+def test_independent_folders_run_in_parallel_and_shared_paths_chain():
+    result = _result(
+        [make_action("x", "OPEN_FOLDER", "Files & Folders", path="X:\\Reports\\A")],
+        [make_action("x", "OPEN_FOLDER", "Files & Folders", path="X:\\Reports\\B")],
+        [
+            make_action(
+                "x", "OPEN_FILE", "Files & Folders", path="X:\\Reports\\A\\pack.xlsx"
+            )
+        ],
+    )
+
+    dag = build_execution_dag(result, category_durations={"files": 2.0})
+
+    by_id = {n["id"]: n for n in dag["nodes"]}
+    assert by_id["2.1"]["depends_on"] == []
+    # The file lives in folder A, so it waits for step 1 only
+    assert by_id["3.1"]["depends_on"] == ["1.1"]
+    assert sorted(map(sorted, dag["branches"])) == [["1.1", "3.1"], ["2.1"]]
+    assert dag["critical_path"] == ["1.1", "3.1"]
+    assert dag["critical_path_s"] == 4.0
+    assert dag["total_duration_s"] == 6.0
+    assert dag["theoretical_speedup"] == 1.5
+
+
+def test_stateful_categories_and_missing_components_serialise():
+    result = _result(
+        [
+            make_action("x", "SET_EMAIL_RECIPIENTS", "Email Operations", to="a@x.com"),
+            make_action("x", "OPEN_FOLDER", "Files & Folders", path="X:\\Out"),
+            make_action("x", "SEND_EMAIL", "Email Operations"),
+        ],
+        [make_action("x", "MISSING_COMPONENT", None, description="Print the pack")],
+        [make_action("x", "OPEN_FOLDER", "Files & Folders", path="X:\\Other")],
+    )
+
+    dag = build_execution_dag(result)
+
+    by_id = {n["id"]: n for n in dag["nodes"]}
+    # Same e-mail draft: send waits for recipients; the folder is unrelated
+    assert by_id["1.3"]["depends_on"] == ["1.1"]
+    assert by_id["1.2"]["depends_on"] == []
+    # The unknown action is a barrier for everything around it
+    assert by_id["2.1"]["depends_on"] == ["1.1", "1.2", "1.3"]
+    assert by_id["3.1"]["depends_on"] == ["2.1"]
+    assert len(dag["branches"]) == 1
+
+
+def test_large_sop_is_analysed_quickly():
+    """Thousands of actions on a few shared resources must stay linear."""
+    steps = [
+        [
+            make_action(
+                "x", "OPEN_FILE", "Files & Folders", path=f"X:\\Data\\f{i % 50}.csv"
+            ),
+            make_action(
+                "x", "SET_EMAIL_RECIPIENTS", "Email Operations", to="ops@x.com"
+            ),
+        ]
+        for i in range(5000)
+    ]
+
+    started = time.perf_counter()
+    dag = build_execution_dag(_result(*steps))
+    elapsed = time.perf_counter() - started
+
+    assert len(dag["nodes"]) == 10000
+    assert elapsed < 5.0
@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import sop2atomic.llm.llm_client as llm_client_mod
+from sop2atomic.cli import main as cli_main
+from sop2atomic.llm.hedging import HedgedExecutor, HedgingPolicy
+from sop2atomic.llm.request_scheduler import (
+    RequestScheduler,
+    configure_default_scheduler,
+    get_default_scheduler,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+SHIPPED_CATALOGUE = (
+    Path(__file__).parent.parent / "examples" / "Atomic_Components_List_v1.xlsx"
+)
+
+
+def _warm_up(hedger: HedgedExecutor, samples: int, latency: float = 0.0) -> None:
+    """Feed the latency window with fast, successful requests."""
+    for _ in range(samples):
+        hedger.run(lambda: time.sleep(latency) or "ok")
+
+
+def test_no_hedge_before_enough_samples():
+    hedger = HedgedExecutor(HedgingPolicy(min_samples=5, max_hedge_fraction=1.0))
+
+    assert hedger.hedge_delay() is None
+    assert hedger.run(lambda: "fast") == "fast"
+    assert hedger.stats()["hedges"] == 0
+
+
+def test_slow_request_is_hedged_and_hedge_wins():
+    hedger = HedgedExecutor(
+        HedgingPolicy(percentile=90, min_samples=5, max_hedge_fraction=1.0)
+    )
+    _warm_up(hedger, 5)
+
+    calls = []
+    release = threading.Event()
+
+    def request():
+        calls.append(None)
+        if len(calls) == 1:
+            # The primary stalls until the test is over
+            release.wait(timeout=5)
+            return "slow"
+        return "hedged"
+
+    try:
+        assert hedger.run(request) == "hedged"
+    finally:
+        release.set()
+
+    stats = hedger.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    assert stats["win_rate"] == 1.0
+    assert stats["hedge_rate"] == pytest.approx(1 / 6)
+
+
+def test_invalid_hedge_result_does_not_win():
+    hedger = HedgedExecutor(
+        HedgingPolicy(percentile=50, min_samples=3, max_hedge_fraction=1.0)
+    )
+    _warm_up(hedger, 3)
+
+    calls = []
+
+    def request():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            return '{"steps": []}'
+        return "not json"
+
+    result = hedger.run(request, is_valid=lambda text: text.startswith("{"))
+
+    assert result == '{"steps": []}'
+    assert hedger.stats()["hedge_wins"] == 0
+
+
+def test_hedge_budget_caps_hedged_traffic():
+    hedger = HedgedExecutor(
+        HedgingPolicy(percentile=50, min_samples=3, max_hedge_fraction=0.0)
+    )
+    _warm_up(hedger, 3)
+
+    assert hedger.run(lambda: time.sleep(0.02) or "primary") == "primary"
+    assert hedger.stats()["hedges"] == 0
+
+
+def test_latency_is_end_to_end_and_stalled_losers_cap_hedging():
+    hedger = HedgedExecutor(
+        HedgingPolicy(
+            percentile=50, min_samples=3, max_hedge_fraction=1.0, max_in_flight=2
+        )
+    )
+    _warm_up(hedger, 3, latency=0.02)
+
+    calls = []
+    release = threading.Event()
+
+    def request():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(timeout=5)
+            return "slow"
+        return "hedged"
+
+    try:
+        assert hedger.run(request) == "hedged"
+        # The winning hedge is recorded with the wait before it was fired,
+        # not with its own (near-zero) duration
+        assert hedger._latencies[-1] >= 0.02
+        losers = [t for t in threading.enumerate() if t.name == "llm-hedge"]
+        assert losers and all(t.daemon for t in losers)
+        assert hedger.stats()["in_flight"] == 1
+
+        # A new request is not held up by the stalled loser, but with the
+        # in-flight cap reached it is not hedged either
+        assert hedger.run(lambda: time.sleep(0.1) or "primary") == "primary"
+        assert hedger.stats()["hedges"] == 1
+    finally:
+        release.set()
+
+
+def test_fixed_trigger_hedges_before_any_latency_is_known():
+    hedger = HedgedExecutor(HedgingPolicy(hedge_after_s=0.02, max_hedge_fraction=1.0))
+    release = threading.Event()
+    calls = []
+
+    def request():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(timeout=5)
+            return "slow"
+        return "hedged"
+
+    try:
+        assert hedger.run(request) == "hedged"
+    finally:
+        release.set()
+    assert hedger.stats()["hedges"] == 1
+
+
+def test_hedge_without_a_free_slot_is_dropped():
+    scheduler = RequestScheduler(max_concurrency=1)
+    hedger = HedgedExecutor(HedgingPolicy(hedge_after_s=0.01, max_hedge_fraction=1.0))
+    calls = []
+
+    def send():
+        calls.append(None)
+        time.sleep(0.1)
+        return "primary"
+
+    result = hedger.run(send, slot=lambda request: scheduler.run(request))
+
+    # The original holds the only slot: the hedge waits for it, then finds
+    # the original done and is never sent
+    assert result == "primary"
+    assert hedger.stats()["hedges"] == 1
+    deadline = time.monotonic() + 2
+    while hedger.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+    assert scheduler.stats()["normal"]["in_flight"] == 0
+
+
+class StallingOpenAI:
+    """Fake OpenAI SDK whose first request stalls until released."""
+
+    def __init__(self, api_key=None):
+        self.release = threading.Event()
+        self.calls = 0
+        self.responses = SimpleNamespace(create=self.create)
+        StallingOpenAI.last = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(timeout=5)
+        text = json.dumps({"sop_id": None, "steps": []})
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(text=text)])]
+        )
+
+
+def test_cli_hedges_a_slow_request_in_a_scheduler_slot(monkeypatch, capsys):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_client_mod, "OpenAI", StallingOpenAI)
+
+    try:
+        cli_main.main(
+            [
+                str(FIXTURES_DIR / "sample_sop_simple.docx"),
+                str(SHIPPED_CATALOGUE),
+                "--hedge-after-s",
+                "0.05",
+            ]
+        )
+        # The stalled original still holds its slot after the hedge won
+        assert get_default_scheduler().stats()["interactive"]["in_flight"] == 1
+    finally:
+        StallingOpenAI.last.release.set()
+
+    err = capsys.readouterr().err
+    stats = json.loads(err.split("LLM hedging: ", 1)[1].splitlines()[0])
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    assert StallingOpenAI.last.calls == 2
+    configure_default_scheduler()
+
+
+def test_cli_rejects_a_percentile_without_a_fixed_trigger(capsys):
+    with pytest.raises(SystemExit):
+        cli_main.main(["sop.docx", "cat.xlsx", "--hedge-percentile", "95"])
+    assert "--hedge-percentile requires --hedge-after-s" in capsys.readouterr().err
@@ -0,0 +1,174 @@
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from sop2atomic.batch.job_queue import JobQueue
+from sop2atomic.batch.queue_worker import run_worker
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+PARAMS = {"model": "gpt-5.1", "output_format": "full"}
+
+
+class EchoTransformer:
+    """Fake transformer returning the SOP id and step numbers only."""
+
+    def transform(self, sop_data, catalogue):
+        return {
+            "sop_id": sop_data["sop_card"].get("SCHRODERS_ID"),
+            "steps": [{"step_number": s["step_number"]} for s in sop_data["steps"]],
+        }
+
+
+def test_lease_is_exclusive_and_expires(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    job_id = queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h1")
+
+    # Re-enqueueing the same inputs is a no-op
+    assert queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h1") == job_id
+    assert queue.stats() == {"queued": 1}
+
+    job = queue.lease("w1", lease_seconds=60)
+    assert job["job_id"] == job_id
+    assert queue.lease("w2", lease_seconds=60) is None
+
+    # w1 "crashes": once its lease expires, w2 picks the job up
+    queue.conn.execute("UPDATE jobs SET lease_expires = 0")
+    assert queue.lease("w2", lease_seconds=60)["job_id"] == job_id
+
+    # The stale holder can neither renew nor complete
+    assert not queue.heartbeat(job_id, "w1", 60)
+    assert not queue.complete(job_id, "w1")
+    assert queue.complete(job_id, "w2")
+    assert queue.stats() == {"done": 1}
+
+    # A done job is not re-queued unless its inputs change
+    queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h1")
+    assert queue.stats() == {"done": 1}
+    queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h2")
+    assert queue.stats() == {"queued": 1}
+
+
+def test_new_inputs_never_reset_a_leased_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    job_id = queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h1")
+    job = queue.lease("w1", lease_seconds=60)
+
+    # Re-enqueued with new inputs while w1 converts the old ones
+    queue.enqueue("a.docx", "cat2.xlsx", "out/a.json", PARAMS, "h2")
+    assert queue.stats() == {"leased": 1}
+    assert queue.lease("w2", lease_seconds=60) is None
+    assert queue.holds_lease(job_id, "w1")
+    assert not queue.holds_lease(job_id, "w1", job["input_hash"])
+
+    # w1's stale result does not mark the job done: it is queued again
+    assert not queue.complete(job_id, "w1", job["input_hash"])
+    assert queue.stats() == {"queued": 1}
+    job = queue.lease("w2", lease_seconds=60)
+    assert (job["input_hash"], job["catalogue_file"]) == ("h2", "cat2.xlsx")
+    assert queue.complete(job_id, "w2", job["input_hash"])
+    assert queue.stats() == {"done": 1}
+
+
+def test_two_sops_cannot_share_an_output_path(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    queue.enqueue("a/sop.docx", "cat.xlsx", "out/sop.json", PARAMS, "h1")
+
+    with pytest.raises(ValueError, match="already the output of a/sop.docx"):
+        queue.enqueue("b/sop.docx", "cat.xlsx", "out/sop.json", PARAMS, "h2")
+    assert queue.stats() == {"queued": 1}
+
+
+def test_failed_job_is_retried_then_marked_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"), max_attempts=2)
+    job_id = queue.enqueue("a.docx", "cat.xlsx", "out/a.json", PARAMS, "h1")
+
+    queue.lease("w1", 60)
+    queue.fail(job_id, "w1", "boom")
+    assert queue.stats() == {"queued": 1}
+
+    queue.lease("w1", 60)
+    queue.fail(job_id, "w1", "boom")
+    assert queue.stats() == {"failed": 1}
+    assert queue.lease("w1", 60) is None
+
+
+def test_concurrent_workers_process_each_job_once(tmp_path):
+    catalogue = tmp_path / "catalogue.xlsx"
+    pd.DataFrame(
+        {
+            "Category": ["Files & Folders"],
+            "ID": ["1,1"],
+            "ID_NAME": ["OPEN_FOLDER"],
+            "Description": ["Open a local or network folder"],
+            "Parameters": ["path"],
+        }
+    ).to_excel(catalogue, index=False)
+
+    queue_path = str(tmp_path / "queue.sqlite")
+    queue = JobQueue(queue_path)
+    fixtures = ["sample_sop_simple.docx", "sample_sop_complex.docx"]
+    for i in range(6):
+        sop = str(FIXTURES_DIR / fixtures[i % 2])
+        out = str(tmp_path / "out" / f"sop{i}.json")
+        queue.enqueue(sop, str(catalogue), out, PARAMS, f"h{i}")
+
+    reports = []
+
+    def work(name):
+        worker_queue = JobQueue(queue_path)
+        reports.append(
+            run_worker(worker_queue, lambda params: EchoTransformer(), worker_id=name)
+        )
+        worker_queue.close()
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(r["done"] for r in reports) == 6
+    assert queue.stats() == {"done": 6}
+    written = json.loads((tmp_path / "out" / "sop0.json").read_text())
+    assert written["sop_id"] == "TEST001"
+
+
+def test_worker_reloads_an_edited_catalogue(tmp_path):
+    catalogue = tmp_path / "catalogue.xlsx"
+
+    def write_catalogue(name):
+        pd.DataFrame(
+            {
+                "Category": ["Files & Folders"],
+                "ID": ["1,1"],
+                "ID_NAME": [name],
+                "Description": ["Open a local or network folder"],
+                "Parameters": ["path"],
+            }
+        ).to_excel(catalogue, index=False)
+
+    class EditingTransformer(EchoTransformer):
+        """Records the catalogue seen by each job, then edits the file."""
+
+        def __init__(self):
+            self.seen = []
+
+        def transform(self, sop_data, catalogue_data):
+            self.seen.append(catalogue_data[0]["id_name"])
+            write_catalogue("OPEN_DIRECTORY")
+            return super().transform(sop_data, catalogue_data)
+
+    write_catalogue("OPEN_FOLDER")
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    for i in range(2):
+        sop = str(FIXTURES_DIR / "sample_sop_simple.docx")
+        out = str(tmp_path / "out" / f"sop{i}.json")
+        queue.enqueue(sop, str(catalogue), out, PARAMS, f"h{i}")
+    transformer = EditingTransformer()
+
+    run_worker(queue, lambda params: transformer)
+
+    assert transformer.seen == ["OPEN_FOLDER", "OPEN_DIRECTORY"]
@@ -0,0 +1,152 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from sop2atomic.catalogue.atomic_catalogue_loader import (
+    duplicate_component_ids,
+    load_atomic_catalogue,
+)
+from sop2atomic.cli import main as cli_main
+from sop2atomic.llm.output_schema import build_output_schema, get_response_format
+from sop2atomic.llm.response_interpreter import expand_compact_result
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+CATALOGUE = [
+    {
+        "category": "Files & Folders",
+        "id": "1,1",
+        "id_name": "OPEN_FOLDER",
+        "description": "Open a local or network folder",
+        "parameters": ["path"],
+    },
+    {
+        "category": "Email Operations",
+        "id": "2,1",
+        "id_name": "SEND_EMAIL",
+        "description": "Send the current e-mail draft",
+        "parameters": [],
+    },
+]
+
+
+def _action_branches(schema):
+    step = schema["properties"]["steps"]["items"]
+    return step["properties"]["atomic_actions"]["items"]["anyOf"]
+
+
+def test_schema_pins_components_to_catalogue_entries():
+    schema = build_output_schema(CATALOGUE)
+
+    branches = _action_branches(schema)
+    assert len(branches) == 3
+    open_folder = branches[0]
+    assert open_folder["properties"]["component_id"]["enum"] == ["1,1"]
+    assert open_folder["properties"]["component_name"]["enum"] == ["OPEN_FOLDER"]
+    assert open_folder["properties"]["parameters"]["required"] == ["path"]
+    assert branches[2]["properties"]["component_name"]["enum"] == ["MISSING_COMPONENT"]
+
+    # Strict mode: every object is closed and lists all its properties
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("type") == "object":
+                assert node["additionalProperties"] is False
+                assert sorted(node["required"]) == sorted(node["properties"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(schema)
+
+
+def test_response_format_is_cached_per_catalogue():
+    first = get_response_format(CATALOGUE)
+    second = get_response_format([dict(c) for c in CATALOGUE])
+    other = get_response_format(CATALOGUE[:1])
+
+    assert first["strict"] is True
+    assert first["schema"] is second["schema"]
+    assert other["schema"] is not first["schema"]
+
+
+class RecordingLLMClient:
+    def __init__(self):
+        self.kwargs = None
+
+    def call(self, user_prompt, **kwargs):
+        self.kwargs = kwargs
+        return json.dumps({"sop_id": None, "steps": []})
+
+
+def test_transformer_passes_schema_in_structured_mode():
+    llm = RecordingLLMClient()
+    transformer = SopToAtomicTransformer(llm_client=llm, structured_output=True)
+    sop_data = {"sop_card": {"SCHRODERS_ID": "TEST001"}, "steps": []}
+
+    result = transformer.transform(sop_data, CATALOGUE)
+
+    assert result["sop_id"] == "TEST001"
+    assert llm.kwargs["text_format"] == get_response_format(CATALOGUE)
+
+    with pytest.raises(ValueError):
+        SopToAtomicTransformer(
+            llm_client=llm, output_format="compact", structured_output=True
+        )
+
+
+def test_cli_rejects_structured_output_with_compact_format(capsys):
+    with pytest.raises(SystemExit):
+        cli_main.main(
+            [
+                "sop.docx",
+                "cat.xlsx",
+                "--structured-output",
+                "--output-format",
+                "compact",
+            ]
+        )
+    assert "--structured-output requires --output-format full" in (
+        capsys.readouterr().err
+    )
+
+
+SHIPPED_CATALOGUE = (
+    Path(__file__).parent.parent / "examples" / "Atomic_Components_List_v1.xlsx"
+)
+
+
+def test_components_sharing_an_id_keep_their_own_schema_branch():
+    catalogue = load_atomic_catalogue(str(SHIPPED_CATALOGUE))
+    assert duplicate_component_ids(catalogue) == {
+        "4.1": ["OPEN_EMAIL_TEMPLATE", "COPY_EMAIL_FOOTER"]
+    }
+
+    branches = build_output_schema(catalogue)["properties"]["steps"]["items"][
+        "properties"
+    ]["atomic_actions"]["items"]["anyOf"]
+    names = [b["properties"]["component_name"].get("enum", [None])[0] for b in branches]
+
+    assert "OPEN_EMAIL_TEMPLATE" in names and "COPY_EMAIL_FOOTER" in names
+    assert len(branches) == len(catalogue) + 1
+
+
+def test_compact_mode_refuses_ambiguous_component_ids():
+    catalogue = load_atomic_catalogue(str(SHIPPED_CATALOGUE))
+    sop_data = {"sop_card": {}, "steps": [{"step_number": "1", "action": "x"}]}
+    compact = {"steps": [{"n": "1", "a": [["4.1", "tpl.oft", "X:\\\\"]]}]}
+
+    # Never expanded as the wrong component sharing the id
+    with pytest.raises(ValueError, match="4.1 \\(OPEN_EMAIL_TEMPLATE, COPY"):
+        expand_compact_result(compact, sop_data, catalogue)
+
+    class NeverCalled:
+        def call(self, *args, **kwargs):
+            raise AssertionError("no LLM call expected")
+
+    transformer = SopToAtomicTransformer(
+        llm_client=NeverCalled(), output_format="compact"
+    )
+    with pytest.raises(ValueError, match="unique component ids"):
+        transformer.transform(sop_data, catalogue)
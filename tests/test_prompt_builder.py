@@ -1,4 +1,8 @@
-from sop2atomic.llm.prompt_builder import build_system_prompt, build_user_prompt
+from sop2atomic.llm.prompt_builder import (
+    build_compact_system_prompt,
+    build_system_prompt,
+    build_user_prompt,
+)
 
 
 def test_build_system_prompt_contains_json_schema_keywords():
@@ -63,3 +67,15 @@ def test_build_user_prompt_includes_sop_card_and_steps():
     assert "OPEN_FOLDER" in user_prompt
     assert "Files & Folders" in user_prompt
     assert "params=['path']" in user_prompt
+
+
+def test_build_compact_system_prompt_shares_rules_but_not_full_schema():
+    """The compact contract keeps the mapping rules but drops echoed fields."""
+    compact_prompt = build_compact_system_prompt()
+
+    assert "RULES FOR LOW-LEVEL COMPONENTS" in compact_prompt
+    assert "REQUIRED OUTPUT FORMAT (COMPACT)" in compact_prompt
+    assert '"n"' in compact_prompt
+    assert '"a"' in compact_prompt
+    assert '"original_action"' not in compact_prompt
+    assert '"category"' not in compact_prompt
@@ -0,0 +1,165 @@
+import argparse
+import json
+import threading
+import time
+
+import pytest
+
+from sop2atomic.cli.scheduler_options import (
+    add_scheduler_arguments,
+    configure_scheduler,
+)
+from sop2atomic.llm.request_scheduler import (
+    RequestScheduler,
+    configure_default_scheduler,
+    get_default_scheduler,
+)
+from sop2atomic.llm.shared_slots import SharedSlotTable
+from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _start(scheduler, order, name, priority, tenant=None, gate=None):
+    def request():
+        order.append(name)
+        if gate is not None:
+            gate.wait()
+
+    thread = threading.Thread(
+        target=scheduler.run,
+        args=(request,),
+        kwargs={"priority": priority, "tenant": tenant},
+    )
+    thread.start()
+    return thread
+
+
+def test_interactive_request_jumps_the_bulk_backlog():
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = []
+    gate = threading.Event()
+
+    threads = [_start(scheduler, order, "bulk0", "bulk", gate=gate)]
+    _wait_for(lambda: order == ["bulk0"])
+    for i in range(1, 6):
+        threads.append(_start(scheduler, order, f"bulk{i}", "bulk"))
+    _wait_for(lambda: scheduler.stats()["bulk"]["queued"] == 5)
+    threads.append(_start(scheduler, order, "interactive", "interactive"))
+    _wait_for(lambda: scheduler.stats()["interactive"]["queued"] == 1)
+
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert order[:2] == ["bulk0", "interactive"]
+    assert sorted(order[2:]) == [f"bulk{i}" for i in range(1, 6)]
+    stats = scheduler.stats()
+    assert stats["bulk"]["completed"] == 6
+    assert stats["interactive"]["completed"] == 1
+    assert stats["bulk"]["queued"] == stats["bulk"]["in_flight"] == 0
+    assert stats["interactive"]["wait_max_s"] is not None
+
+
+def test_tenant_quota_caps_in_flight_requests():
+    scheduler = RequestScheduler(max_concurrency=2, tenant_quotas={"backfill": 1})
+    order = []
+    gate = threading.Event()
+
+    threads = [_start(scheduler, order, "a1", "bulk", "backfill", gate)]
+    _wait_for(lambda: order == ["a1"])
+    threads.append(_start(scheduler, order, "a2", "bulk", "backfill", gate))
+    _wait_for(lambda: scheduler.stats()["bulk"]["queued"] == 1)
+    # A free slot remains, but only another tenant may use it
+    threads.append(_start(scheduler, order, "b1", "bulk", "analyst", gate))
+    _wait_for(lambda: order == ["a1", "b1"])
+    assert scheduler.stats()["bulk"]["in_flight"] == 2
+
+    gate.set()
+    for t in threads:
+        t.join()
+    assert order == ["a1", "b1", "a2"]
+
+
+class FakeLLMClient:
+    def call(self, user_prompt):
+        return json.dumps({"sop_id": None, "steps": []})
+
+
+def test_transformer_calls_go_through_the_scheduler():
+    scheduler = RequestScheduler()
+    transformer = SopToAtomicTransformer(
+        llm_client=FakeLLMClient(), priority="interactive", scheduler=scheduler
+    )
+
+    transformer.transform({"sop_card": {"SCHRODERS_ID": "T1"}, "steps": []}, [])
+
+    assert scheduler.stats()["interactive"]["completed"] == 1
+    with pytest.raises(ValueError):
+        SopToAtomicTransformer(llm_client=FakeLLMClient(), priority="urgent")
+
+
+def test_shared_slots_rank_requests_across_processes(tmp_path):
+    """
+    Two schedulers stand for two processes (a bulk batch run and an
+    interactive CLI) sharing one slot table: the interactive request is
+    admitted ahead of the batch's waiting bulk requests.
+    """
+    path = str(tmp_path / "slots.sqlite")
+    batch = RequestScheduler(
+        shared_slots=SharedSlotTable(path, max_concurrency=1, poll_interval=0.01)
+    )
+    cli = RequestScheduler(
+        shared_slots=SharedSlotTable(path, max_concurrency=1, poll_interval=0.01)
+    )
+    order = []
+    gate = threading.Event()
+
+    threads = [_start(batch, order, "bulk0", "bulk", gate=gate)]
+    _wait_for(lambda: order == ["bulk0"])
+    threads += [_start(batch, order, f"bulk{i}", "bulk") for i in (1, 2)]
+    _wait_for(lambda: batch.shared_slots.waiting() == 2)
+    threads.append(_start(cli, order, "interactive", "interactive"))
+    _wait_for(lambda: batch.shared_slots.waiting() == 3)
+    assert batch.shared_slots.in_use() == 1
+
+    gate.set()
+    for t in threads:
+        t.join()
+    assert order[:2] == ["bulk0", "interactive"]
+    assert batch.shared_slots.in_use() == 0
+
+
+def test_scheduler_cli_options_configure_the_default_scheduler(tmp_path):
+    parser = argparse.ArgumentParser()
+    add_scheduler_arguments(parser)
+    args = parser.parse_args(
+        [
+            "--max-concurrency",
+            "3",
+            "--priority-weight",
+            "bulk=2",
+            "--tenant-quota",
+            "backfill=1",
+            "--scheduler-db",
+            str(tmp_path / "slots.sqlite"),
+        ]
+    )
+
+    scheduler = configure_scheduler(parser, args)
+
+    assert scheduler is get_default_scheduler()
+    assert scheduler.max_concurrency == scheduler.shared_slots.max_concurrency == 3
+    assert scheduler.weights["bulk"] == 2.0
+    assert scheduler.tenant_quotas == {"backfill": 1}
+    with pytest.raises(SystemExit):
+        configure_scheduler(
+            parser, parser.parse_args(["--priority-weight", "urgent=3"])
+        )
+    configure_default_scheduler()
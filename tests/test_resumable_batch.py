@@ -0,0 +1,169 @@
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from sop2atomic.batch.resumable_batch import run_resumable_batch, start_batch_run
+from sop2atomic.batch.run_journal import RunJournal
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+class FlakyTransformer:
+    """Fake transformer that fails the first time it sees a given SOP id."""
+
+    def __init__(self, fail_once_for: str):
+        self.fail_once_for = fail_once_for
+        self.calls = []
+
+    def transform(self, sop_data, catalogue):
+        sop_id = sop_data["sop_card"].get("SCHRODERS_ID")
+        self.calls.append(sop_id)
+        if sop_id == self.fail_once_for:
+            self.fail_once_for = None
+            raise RuntimeError("LLM returned invalid JSON")
+        return {
+            "sop_id": sop_id,
+            "steps": [
+                {
+                    "step_number": s["step_number"],
+                    "original_action": s["action"],
+                    "notes": s["notes"],
+                    "atomic_actions": [],
+                }
+                for s in sop_data["steps"]
+            ],
+        }
+
+
+def _setup(tmp_path):
+    catalogue = tmp_path / "catalogue.xlsx"
+    pd.DataFrame(
+        {
+            "Category": ["Files & Folders"],
+            "ID": ["1,1"],
+            "ID_NAME": ["OPEN_FOLDER"],
+            "Description": ["Open a local or network folder"],
+            "Parameters": ["path"],
+        }
+    ).to_excel(catalogue, index=False)
+
+    sops = []
+    for name in ("sample_sop_simple.docx", "sample_sop_complex.docx"):
+        shutil.copy(FIXTURES_DIR / name, tmp_path / name)
+        sops.append(str(tmp_path / name))
+    return str(catalogue), sops
+
+
+def test_resume_skips_completed_and_retries_failed(tmp_path):
+    catalogue, sops = _setup(tmp_path)
+    journal = RunJournal(str(tmp_path / "runs.sqlite"))
+    run_id = start_batch_run(
+        journal, catalogue, sops, str(tmp_path / "out"), dedup=False
+    )
+    failing_id = "TEST001"  # SCHRODERS_ID of the simple SOP fixture
+
+    # First run: one SOP fails, the other is written
+    flaky = FlakyTransformer(fail_once_for=failing_id)
+    report = run_resumable_batch(journal, run_id, lambda params: flaky)
+
+    assert report["converted"] == 1
+    assert report["failed"] == 1
+    assert journal.summary(run_id) == {"done": 1, "failed": 1}
+    assert not (tmp_path / "out" / "sample_sop_simple.json").exists()
+
+    # Resume: only the failed SOP is sent again
+    retry = FlakyTransformer(fail_once_for=None)
+    report = run_resumable_batch(journal, run_id, lambda params: retry)
+
+    assert retry.calls == [failing_id]
+    assert report["skipped_done"] == 1
+    assert report["converted"] == 1
+    written = json.loads((tmp_path / "out" / "sample_sop_simple.json").read_text())
+    assert written["sop_id"] == failing_id
+
+    # Re-running a finished run does nothing, not even build a transformer
+    def must_not_build(params):
+        raise AssertionError("no work expected")
+
+    report = run_resumable_batch(journal, run_id, must_not_build)
+    assert report["skipped_done"] == 2
+    assert report["batch"] is None
+
+
+def test_failed_sop_is_not_retried_past_max_attempts(tmp_path):
+    catalogue, sops = _setup(tmp_path)
+    journal = RunJournal(str(tmp_path / "runs.sqlite"))
+    run_id = start_batch_run(
+        journal, catalogue, sops[:1], str(tmp_path / "out"), dedup=False
+    )
+
+    class AlwaysFails:
+        def transform(self, sop_data, catalogue):
+            raise RuntimeError("LLM returned invalid JSON")
+
+    for _ in range(2):
+        run_resumable_batch(journal, run_id, lambda p: AlwaysFails(), max_attempts=2)
+    report = run_resumable_batch(
+        journal, run_id, lambda p: AlwaysFails(), max_attempts=2
+    )
+
+    assert report["gave_up"] == 1
+    assert journal.items(run_id)[0]["attempts"] == 2
+
+
+def test_attempts_that_crash_the_batch_count_towards_max_attempts(tmp_path):
+    catalogue, sops = _setup(tmp_path)
+    journal = RunJournal(str(tmp_path / "runs.sqlite"))
+    # The output "directory" is a file: writing the result aborts the batch
+    out = tmp_path / "out"
+    out.write_text("")
+    run_id = start_batch_run(journal, catalogue, sops[:1], str(out), dedup=False)
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            run_resumable_batch(
+                journal, run_id, lambda p: FlakyTransformer(None), max_attempts=2
+            )
+    report = run_resumable_batch(
+        journal, run_id, lambda p: FlakyTransformer(None), max_attempts=2
+    )
+
+    assert report["gave_up"] == 1
+    assert journal.items(run_id)[0]["status"] == "running"
+
+
+def test_options_changing_the_requests_invalidate_completed_sops(tmp_path):
+    catalogue, sops = _setup(tmp_path)
+    journal = RunJournal(str(tmp_path / "runs.sqlite"))
+    out = str(tmp_path / "out")
+    first = start_batch_run(journal, catalogue, sops, out, dedup=False)
+    run_resumable_batch(journal, first, lambda p: FlakyTransformer(None))
+    item_ids = [item["item_id"] for item in journal.items(first)]
+    hashes = {item["input_hash"] for item in journal.items(first)}
+
+    # Same SOPs under a new run id with another packing budget: the recorded
+    # input hashes must differ
+    second = start_batch_run(
+        journal, catalogue, sops, out, dedup=False, pack_token_budget=4000
+    )
+    run_resumable_batch(journal, second, lambda p: FlakyTransformer(None))
+    assert [item["item_id"] for item in journal.items(second)] == item_ids
+    assert not hashes & {item["input_hash"] for item in journal.items(second)}
+
+
+def test_sop_files_with_the_same_name_are_rejected(tmp_path):
+    catalogue, sops = _setup(tmp_path)
+    (tmp_path / "other").mkdir()
+    twin = tmp_path / "other" / "sample_sop_simple.docx"
+    shutil.copy(sops[0], twin)
+    journal = RunJournal(str(tmp_path / "runs.sqlite"))
+
+    with pytest.raises(ValueError, match="same name"):
+        start_batch_run(journal, catalogue, sops + [str(twin)], str(tmp_path / "out"))
+
+    # The same file listed twice is fine
+    assert start_batch_run(journal, catalogue, sops + sops[:1], str(tmp_path / "out"))
+    journal.close()
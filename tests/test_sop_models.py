@@ -0,0 +1,84 @@
+import json
+
+from sop2atomic.models.sop_models import (
+    AtomicComponent,
+    MappedStep,
+    SopDocument,
+)
+
+
+def test_sop_document_round_trip_and_defaults():
+    """Missing keys are defaulted once; to_dict matches the parser schema."""
+    data = {
+        "sop_card": {"SCHRODERS_ID": "TEST001"},
+        "steps": [{"step_number": 1, "action": "Open the shared mailbox."}],
+    }
+
+    doc = SopDocument.from_dict(data)
+
+    assert doc.sop_id == "TEST001"
+    assert doc.steps[0].step_number == "1"
+    assert doc.steps[0].notes == ""
+    assert doc.to_dict() == {
+        "sop_card": {"SCHRODERS_ID": "TEST001"},
+        "steps": [
+            {"step_number": "1", "action": "Open the shared mailbox.", "notes": ""}
+        ],
+    }
+
+
+def test_atomic_component_round_trip():
+    data = {
+        "id": "4,4",
+        "id_name": "SET_EMAIL_RECIPIENTS",
+        "category": "Email Operations",
+        "description": "Define To/Cc/Bcc addresses",
+        "parameters": ["to", "cc", "bcc"],
+    }
+
+    component = AtomicComponent.from_dict(data)
+
+    assert component.parameters == ("to", "cc", "bcc")
+    assert component.to_dict() == data
+
+
+def test_mapped_step_round_trip_interns_repeated_strings():
+    """
+    Records must serialise back to the transformer schema, and repeated
+    category/name strings parsed from JSON must share one object.
+    """
+    raw = json.dumps(
+        {
+            "step_number": "2",
+            "original_action": "Send the pack.",
+            "notes": "",
+            "atomic_actions": [
+                {
+                    "component_id": "4,4",
+                    "component_name": "SET_EMAIL_RECIPIENTS",
+                    "category": "Email Operations",
+                    "parameters": {"to": "client@example.com"},
+                },
+                {
+                    "component_id": "4,4",
+                    "component_name": "SET_EMAIL_RECIPIENTS",
+                    "category": "Email Operations",
+                    "parameters": None,
+                },
+            ],
+        }
+    )
+    data = json.loads(raw)
+
+    step = MappedStep.from_dict(data)
+    first, second = step.atomic_actions
+
+    assert first.category is second.category
+    assert first.component_name is second.component_name
+    assert second.parameters == {}
+    assert not first.is_missing
+
+    expected = json.loads(raw)
+    expected["atomic_actions"][1]["parameters"] = {}
+    assert step.to_dict() == expected
+    assert not hasattr(step, "__dict__")
@@ -1,6 +1,10 @@
 import json
+import threading
+import time
+from collections import OrderedDict
 
 import sop2atomic.transformers.sop_to_atomic_transformer as tr_mod
+from sop2atomic.llm.hedging import HedgingPolicy
 from sop2atomic.transformers.sop_to_atomic_transformer import SopToAtomicTransformer
 
 
@@ -109,3 +113,333 @@ def test_transformer_uses_llm_and_injects_sop_id(monkeypatch):
     assert "TEST001" in transformer.llm.last_prompt
     assert "Open the shared mailbox." in transformer.llm.last_prompt
     assert "OPEN_FOLDER" in transformer.llm.last_prompt
+
+
+class FakeCompactLLMClient:
+    """Fake client that answers in the compact output contract."""
+
+    def __init__(self, model: str = "gpt-5.1"):
+        self.model = model
+        self.last_instructions: str | None = None
+
+    def call(self, user_prompt: str, instructions: str | None = None) -> str:
+        self.last_instructions = instructions
+        fake_response = {
+            "steps": [
+                {"n": "1", "a": [["1,1", r"X:\\SharedMailbox"]]},
+                {"n": "2", "a": [["9,9"], [None, "No component to print"]]},
+            ]
+        }
+        return json.dumps(fake_response)
+
+
+def test_transformer_compact_format_expands_to_full_schema(monkeypatch):
+    """
+    In compact mode the transformer should rebuild wording, notes, component
+    names, categories and parameter names locally from the SOP + catalogue.
+    """
+    sop_data = {
+        "sop_card": {"SCHRODERS_ID": "TEST001"},
+        "steps": [
+            {"step_number": "1", "action": "Open the shared mailbox.", "notes": ""},
+            {"step_number": "2", "action": "Print the pack.", "notes": "Colour"},
+        ],
+    }
+    catalogue = [
+        {
+            "id": "1,1",
+            "id_name": "OPEN_FOLDER",
+            "category": "Files & Folders",
+            "description": "Open a local or network folder",
+            "parameters": ["path", "mode"],
+        }
+    ]
+
+    monkeypatch.setattr(tr_mod, "LLMClient", FakeCompactLLMClient)
+    transformer = SopToAtomicTransformer(model="gpt-5.1", output_format="compact")
+
+    result = transformer.transform(sop_data, catalogue)
+
+    assert "COMPACT" in transformer.llm.last_instructions
+    assert result["sop_id"] == "TEST001"
+
+    first = result["steps"][0]
+    assert first["original_action"] == "Open the shared mailbox."
+    assert first["notes"] == ""
+    assert first["atomic_actions"] == [
+        {
+            "component_id": "1,1",
+            "component_name": "OPEN_FOLDER",
+            "category": "Files & Folders",
+            "parameters": {"path": r"X:\\SharedMailbox", "mode": None},
+        }
+    ]
+
+    second = result["steps"][1]
+    assert second["notes"] == "Colour"
+    # Unknown catalogue IDs and explicit nulls both become MISSING_COMPONENT
+    assert [a["component_name"] for a in second["atomic_actions"]] == [
+        "MISSING_COMPONENT",
+        "MISSING_COMPONENT",
+    ]
+    assert second["atomic_actions"][1]["parameters"] == {
+        "description": "No component to print"
+    }
+
+
+class FakePackingLLMClient:
+    """
+    Fake client answering packed requests per SOP section, leaving out the
+    SOPs listed in drop; single-SOP requests get a plain result.
+    """
+
+    def __init__(self, drop=(), broken=False):
+        self.drop = set(drop)
+        self.broken = broken
+        self.calls = []
+
+    @staticmethod
+    def _steps(text):
+        return [
+            {
+                "step_number": line[len("Step ") :].split(": ", 1)[0],
+                "original_action": line.split(": ", 1)[1],
+                "atomic_actions": [],
+            }
+            for line in text.splitlines()
+            if line.startswith("Step ")
+        ]
+
+    def call(self, user_prompt, instructions=None):
+        packed = "=== BEGIN SOP " in user_prompt
+        self.calls.append("pack" if packed else "single")
+        if not packed:
+            return json.dumps({"sop_id": None, "steps": self._steps(user_prompt)})
+        if self.broken:
+            return "not json"
+
+        entries = []
+        for section in user_prompt.split("=== BEGIN SOP ")[1:]:
+            key = section.split(" ===", 1)[0]
+            if key not in self.drop:
+                entries.append({"sop_id": key, "steps": self._steps(section)})
+        return json.dumps({"sops": entries})
+
+
+def _small_sops():
+    return [
+        {
+            "sop_card": {"SCHRODERS_ID": sop_id} if sop_id else {},
+            "steps": [
+                {"step_number": str(n), "action": f"{label} step {n}", "notes": ""}
+                for n in (1, 2)
+            ],
+        }
+        for sop_id, label in (("S1", "alpha"), (None, "beta"), ("S3", "gamma"))
+    ]
+
+
+def test_transform_packed_splits_results_and_falls_back_per_sop():
+    llm = FakePackingLLMClient(drop={"S3"})
+    transformer = SopToAtomicTransformer(llm_client=llm)
+
+    results = transformer.transform_packed(_small_sops(), [], token_budget=10_000)
+
+    # One pack for all three SOPs, then S3 alone because it was left out
+    assert llm.calls == ["pack", "single"]
+    assert [r["sop_id"] for r in results] == ["S1", None, "S3"]
+    assert results[1]["steps"][0]["original_action"] == "beta step 1"
+    assert results[1]["steps"][0]["notes"] == ""
+    assert transformer.last_pack_report == {
+        "sops": 3,
+        "packs": 1,
+        "llm_calls": 2,
+        "fallback_sops": 1,
+    }
+
+    # An unusable pack response degrades to one request per SOP
+    llm = FakePackingLLMClient(broken=True)
+    transformer = SopToAtomicTransformer(llm_client=llm)
+    results = transformer.transform_packed(_small_sops(), [], token_budget=10_000)
+    assert llm.calls == ["pack", "single", "single", "single"]
+    assert [r["sop_id"] for r in results] == ["S1", None, "S3"]
+
+    # A budget smaller than one SOP disables packing
+    llm = FakePackingLLMClient()
+    transformer = SopToAtomicTransformer(llm_client=llm)
+    transformer.transform_packed(_small_sops(), [], token_budget=1)
+    assert llm.calls == ["single", "single", "single"]
+
+
+class SlowLLMClient:
+    """Fake client that answers after a delay, mapping step 1 only."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def call(self, user_prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        return json.dumps(
+            {
+                "sop_id": None,
+                "steps": [
+                    {
+                        "step_number": "1",
+                        "original_action": "Open the deadline folder.",
+                        "notes": "",
+                        "atomic_actions": [],
+                    }
+                ],
+            }
+        )
+
+
+def test_transform_with_deadline_falls_back_then_uses_late_response():
+    sop_data = {
+        "sop_card": {"SCHRODERS_ID": "DEADLINE001"},
+        "steps": [
+            {"step_number": "1", "action": "Open the deadline folder.", "notes": ""},
+            {"step_number": "2", "action": "Print the pack.", "notes": ""},
+        ],
+    }
+    catalogue = [
+        {
+            "id": "1,1",
+            "id_name": "OPEN_FOLDER",
+            "category": "Files & Folders",
+            "description": "Open a local or network folder",
+            "parameters": ["path"],
+        }
+    ]
+    llm = SlowLLMClient(delay=0.5)
+    transformer = SopToAtomicTransformer(llm_client=llm)
+
+    started = time.monotonic()
+    result = transformer.transform(sop_data, catalogue, deadline=0.2)
+    assert time.monotonic() - started < 0.4
+
+    first, second = result["steps"]
+    assert result["sop_id"] == "DEADLINE001"
+    assert first["provenance"] == "fallback"
+    assert first["fallback_reason"] == "deadline_exceeded"
+    assert first["atomic_actions"][0]["component_name"] == "OPEN_FOLDER"
+    assert first["atomic_actions"][0]["parameters"] == {"path": None}
+    assert second["atomic_actions"][0]["component_name"] == "MISSING_COMPONENT"
+
+    # The late response is reused by the next identical call; the step the
+    # model did not return still gets a fallback
+    time.sleep(0.7)
+    result = transformer.transform(sop_data, catalogue, deadline=0.2)
+    assert llm.calls == 1
+    assert [s["provenance"] for s in result["steps"]] == ["cached", "fallback"]
+    assert result["steps"][1]["fallback_reason"] == "step_not_returned"
+
+    # A fast enough model is used directly
+    llm = SlowLLMClient(delay=0.0)
+    other = dict(sop_data, sop_card={"SCHRODERS_ID": "DEADLINE002"})
+    result = SopToAtomicTransformer(llm_client=llm).transform(
+        other, catalogue, deadline=5.0
+    )
+    assert result["steps"][0]["provenance"] == "llm"
+
+
+def test_deadline_calls_are_bounded_daemon_and_persist_late_responses(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(tr_mod, "_DEADLINE_SLOTS", threading.Semaphore(1))
+    monkeypatch.setattr(tr_mod, "_LATE_RESPONSES", OrderedDict())
+    sop_data = {
+        "sop_card": {"SCHRODERS_ID": "DEADLINE003"},
+        "steps": [
+            {"step_number": "1", "action": "Open the deadline folder.", "notes": ""}
+        ],
+    }
+    llm = SlowLLMClient(delay=0.5)
+    transformer = SopToAtomicTransformer(llm_client=llm, late_cache_dir=str(tmp_path))
+
+    result = transformer.transform(sop_data, [], deadline=0.2)
+    assert result["steps"][0]["fallback_reason"] == "deadline_exceeded"
+    waiting = [t for t in threading.enumerate() if t.name == "sop2atomic-deadline"]
+    assert waiting and all(t.daemon for t in waiting)
+
+    # The only slot is held by the hung call: fall back without calling
+    other = dict(sop_data, sop_card={"SCHRODERS_ID": "DEADLINE004"})
+    result = transformer.transform(other, [], deadline=0.2)
+    assert result["steps"][0]["fallback_reason"] == "llm_saturated"
+    assert llm.calls == 1
+
+    assert tr_mod.wait_for_late_responses(2.0) == 0
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    # A new process (empty in-memory cache) reads the stored response
+    monkeypatch.setattr(tr_mod, "_LATE_RESPONSES", OrderedDict())
+    fresh = SopToAtomicTransformer(llm_client=llm, late_cache_dir=str(tmp_path))
+    result = fresh.transform(sop_data, [], deadline=0.2)
+    assert result["steps"][0]["provenance"] == "cached"
+    assert llm.calls == 1
+
+
+def test_late_responses_are_not_reused_after_prompt_or_catalogue_changes(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(tr_mod, "_LATE_RESPONSES", OrderedDict())
+    sop_data = {
+        "sop_card": {"SCHRODERS_ID": "DEADLINE005"},
+        "steps": [
+            {"step_number": "1", "action": "Open the deadline folder.", "notes": ""}
+        ],
+    }
+    catalogue = [
+        {
+            "id": "1,1",
+            "id_name": "OPEN_FOLDER",
+            "category": "Files & Folders",
+            "description": "Open a local or network folder",
+            "parameters": ["path"],
+        }
+    ]
+    llm = SlowLLMClient(delay=0.3)
+    transformer = SopToAtomicTransformer(llm_client=llm, late_cache_dir=str(tmp_path))
+    transformer.transform(sop_data, catalogue, deadline=0.1)
+    assert tr_mod.wait_for_late_responses(2.0) == 0
+
+    # New system prompt: the stored response is not served
+    monkeypatch.setattr(tr_mod, "build_system_prompt", lambda: "new contract")
+    result = transformer.transform(sop_data, catalogue, deadline=0.1)
+    assert result["steps"][0]["fallback_reason"] == "deadline_exceeded"
+    monkeypatch.undo()
+    monkeypatch.setattr(tr_mod, "_LATE_RESPONSES", OrderedDict())
+
+    # Edited catalogue entry: not served either
+    edited = [dict(catalogue[0], category="Folders")]
+    result = transformer.transform(sop_data, edited, deadline=0.1)
+    assert result["steps"][0]["fallback_reason"] == "deadline_exceeded"
+
+    # Unchanged inputs still hit the cache written by the first call
+    result = transformer.transform(sop_data, catalogue, deadline=0.1)
+    assert result["steps"][0]["provenance"] == "cached"
+    assert llm.calls == 3
+    assert tr_mod.wait_for_late_responses(2.0) == 0
+
+
+def test_hedging_policy_reaches_the_default_client(monkeypatch):
+    class HedgingFakeClient(FakeLLMClient):
+        def __init__(self, model="gpt-5.1", hedging=None, slot=None):
+            super().__init__(model)
+            self.hedging = hedging
+            self.slot = slot
+
+        def hedging_stats(self):
+            return {"hedges": 0} if self.hedging is not None else None
+
+    monkeypatch.setattr(tr_mod, "LLMClient", HedgingFakeClient)
+    policy = HedgingPolicy(percentile=90)
+
+    transformer = SopToAtomicTransformer(hedging=policy)
+
+    assert transformer.llm.hedging is policy
+    assert transformer.llm.slot(lambda: "sent") == "sent"
+    assert transformer.hedging_stats() == {"hedges": 0}
+    assert SopToAtomicTransformer().hedging_stats() is None